@@ -0,0 +1,152 @@
+"""
+Load-test harness for the query API: requests/sec and latency percentiles per
+endpoint, for the sync (psycopg2 + threadpool) and async (asyncpg) DB modes.
+
+By default one uvicorn worker is started per mode against DATABASE_URL, with
+the response cache off so every request reaches PostgreSQL:
+
+    python load_test.py --modes sync,async --concurrency 64 --duration 15
+    python load_test.py --url http://127.0.0.1:8000      # an already running server
+
+Pool / timeout knobs (DB_POOL_SIZE, DB_STATEMENT_CACHE_SIZE, DB_QUERY_TIMEOUT,
+API_THREADPOOL_SIZE, ...) are passed through from the environment.
+"""
+
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# endpoint name -> (path, parameter sets cycled through by the workers)
+ENDPOINTS: Dict[str, tuple] = {
+    "year-country": ("/api/v1/projects/summary/year-country", [
+        {"start_year": 2000 + i, "end_year": 2010 + i} for i in range(10)
+    ]),
+    "by-group": ("/api/v1/funding/summary/by-group", [
+        {}, {"year": 2020}, {"year": 2015, "fund_col": "funding_amount_usd"},
+    ]),
+    "title-description": ("/api/v1/projects/title-description", [
+        {"limit": 100}, {"year": 2020, "limit": 100}, {"search": "health", "limit": 50},
+    ]),
+    "title-description-cursor": ("/api/v1/projects/title-description", [
+        {"cursor": "", "limit": 100},
+    ]),
+    "fulltext": ("/api/v1/projects/title-description", [
+        {"search": "health", "search_mode": "fulltext", "limit": 20},
+    ]),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (values need not be sorted)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+async def hammer(base_url: str, path: str, param_sets: List[dict], concurrency: int, duration: float) -> dict:
+    """*concurrency* workers issuing back-to-back requests for *duration* seconds."""
+    latencies: List[float] = []
+    errors = 0
+    params = itertools.cycle(param_sets)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    resp = await client.get(path, params=next(params))
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def start_server(mode: str, port: int, cache: bool) -> subprocess.Popen:
+    env = dict(os.environ, API_DB_MODE=mode, RESPONSE_CACHE_ENABLED="1" if cache else "0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"API did not start in {mode} mode")
+
+
+def run(base_url: str, endpoints: List[str], concurrency: int, duration: float, warmup: float) -> Dict[str, dict]:
+    results = {}
+    for name in endpoints:
+        path, param_sets = ENDPOINTS[name]
+        if warmup:
+            asyncio.run(hammer(base_url, path, param_sets, concurrency, warmup))
+        results[name] = asyncio.run(hammer(base_url, path, param_sets, concurrency, duration))
+    return results
+
+
+def report(mode: str, results: Dict[str, dict]) -> None:
+    for name, r in results.items():
+        print(f"{mode:6} {name:26} {r['rps']:9.1f} req/s  p50 {r['p50_ms']:8.1f} ms  "
+              f"p99 {r['p99_ms']:8.1f} ms  ({r['requests']} ok, {r['errors']} errors)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", help="test a running server instead of starting one per mode")
+    p.add_argument("--modes", default="sync,async")
+    p.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    p.add_argument("--warmup", type=float, default=2)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--cache", action="store_true", help="leave the response cache on")
+    a = p.parse_args()
+
+    names = a.endpoints.split(",")
+    if a.url:
+        report("-", run(a.url, names, a.concurrency, a.duration, a.warmup))
+    else:
+        for mode in a.modes.split(","):
+            server: Optional[subprocess.Popen] = start_server(mode, a.port, a.cache)
+            try:
+                report(mode, run(f"http://127.0.0.1:{a.port}", names, a.concurrency, a.duration, a.warmup))
+            finally:
+                server.terminate()
+                server.wait()
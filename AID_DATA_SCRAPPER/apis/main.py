@@ -1,14 +1,31 @@
-from fastapi import FastAPI, Query, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, Session
+import asyncio
+import base64
+import binascii
+import decimal
+import inspect
+import json
 import os
 import re
+import time
 
-"""Merged FastAPI application implementing four endpoints:
+import response_cache
+from export_formats import EXPORT_FORMATS, arrow_ipc, dumps_json, make_encoder
+
+"""Merged FastAPI application implementing five endpoints:
 1. year_country_funding_summary   – /api/v1/projects/summary/year-country
 2. project_title_description_list – /api/v1/projects/title-description
 3. age_group_beneficiary_summary  – /api/v1/beneficiaries/summary/age-group
 4. funding_group_breakdown        – /api/v1/funding/summary/by-group
+5. project_export                 – /api/v1/projects/export (streamed NDJSON / CSV / Arrow / Parquet)
 
 Assumed tables
 ---------------
@@ -44,16 +61,78 @@ TABLE_NAME = "project_data"
 
 DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 DATABASE_URL = os.getenv("DATABASE_URL", DB_URL)
-engine = create_engine(DATABASE_URL)
+
+# "sync"  – psycopg2 sessions, each query runs on the threadpool (API_THREADPOOL_SIZE threads)
+# "async" – asyncpg through SQLAlchemy's asyncio extension, queries never hold a thread
+API_DB_MODE = os.getenv("API_DB_MODE", "sync")
+API_THREADPOOL_SIZE = int(os.getenv("API_THREADPOOL_SIZE", "40"))           # anyio's default
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))                # seconds waiting for a connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))  # prepared statements per asyncpg connection
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "30"))              # seconds, per statement, 0 = none
+
+_POOL_ARGS = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+_TIMEOUT_MS = str(int(DB_QUERY_TIMEOUT * 1000))
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL rewritten for asyncpg, with its prepared-statement cache size."""
+    return make_url(url).set(drivername="postgresql+asyncpg").update_query_dict(
+        {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+    ).render_as_string(hide_password=False)
+
+# statement_timeout is enforced by the server in both modes; a cancelled query becomes a 504
+engine = create_engine(DATABASE_URL, connect_args={"options": f"-c statement_timeout={_TIMEOUT_MS}"}, **_POOL_ARGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+async_engine = AsyncSessionLocal = None
+if API_DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL),
+        # cached prepared statements, but always planned for the actual parameters – the
+        # optional `:param IS NULL OR ...` filters only hit the indexes with custom plans
+        connect_args={"server_settings": {"statement_timeout": _TIMEOUT_MS, "plan_cache_mode": "force_custom_plan"}},
+        **_POOL_ARGS,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db = SessionLocal()
     try:
         yield db
+    finally:
+        db.close()          # connections are already back in the pool (see fetch_all)
+
+QUERY_CANCELED = "57014"        # SQLSTATE of statement_timeout
+
+def _fetch_and_release(db: Session, sql, params) -> list:
+    # a sync session must not keep its connection while the request waits for the
+    # next threadpool slot – with every thread waiting for a connection that would
+    # deadlock until DB_POOL_TIMEOUT
+    try:
+        return db.execute(sql, params).fetchall()
     finally:
         db.close()
 
+async def fetch_all(db, sql, params=None) -> list:
+    """Rows of *sql* on either kind of session; sync sessions run on the threadpool."""
+    try:
+        if inspect.iscoroutinefunction(db.execute):
+            return (await db.execute(sql, params or {})).fetchall()
+        return await run_in_threadpool(_fetch_and_release, db, sql, params or {})
+    except DBAPIError as e:
+        if getattr(e.orig, "pgcode", None) == QUERY_CANCELED or getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+            raise HTTPException(504, detail=f"query exceeded DB_QUERY_TIMEOUT ({DB_QUERY_TIMEOUT:g}s)")
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(504, detail=f"query exceeded DB_QUERY_TIMEOUT ({DB_QUERY_TIMEOUT:g}s)")
+
 # ---------------------------------------------------------------------------
 # Constants & validation helpers
 # ---------------------------------------------------------------------------
@@ -63,25 +142,321 @@ ALLOWED_FUND_COLS = {
     "funding_amount_usd",
 }
 
+SEARCH_MODES = {"substring", "fulltext"}
+
+# summaries: json = list of row objects (default), columnar = {column: [values]}, arrow = Arrow IPC stream
+AGGREGATE_FORMATS = {"json", "columnar", "arrow"}
+
+# Summaries read the rollup tables (rollups.py, migration 005) when they exist
+USE_ROLLUPS = os.getenv("USE_ROLLUPS", "1") == "1"
+ROLLUP_CHECK_SECONDS = 300
+
+# Summary responses are cached per data version (data_versions.py, migration 006);
+# the version itself is re-read at most every DATA_VERSION_CHECK_SECONDS
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+
+# /export fetches this many rows per server-side cursor round-trip (and per Parquet row group)
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
 DEFAULT_BINS = "0-5,6-17,18-35,36-60,61-120"
 BIN_RE = re.compile(r"^\d+-\d+(,\d+-\d+)*$")
 
+# ---------------------------------------------------------------------------
+# SQL – kept at module level so the EXPLAIN regression test (testing_explain.py)
+# plans exactly what the endpoints run. {fund_col} is validated before use.
+# Optional parameters are CAST: asyncpg prepares statements server-side and
+# cannot infer the type of a bare `:param IS NULL`.
+# ---------------------------------------------------------------------------
+YEAR_COUNTRY_SUMMARY_SQL = """
+    SELECT
+        year_active                 AS year,
+        country,
+        COUNT(*)                    AS project_count,
+        SUM(COALESCE({fund_col}, 0)) AS total_funding_usd
+    FROM   project_data
+    WHERE  year_active BETWEEN :start_year AND :end_year
+    GROUP  BY year_active, country
+    ORDER  BY year_active, country;
+"""
+
+YEAR_COUNTRY_ROLLUP_SQL = """
+    SELECT
+        year_active                 AS year,
+        country,
+        project_count,
+        {fund_col}                  AS total_funding_usd
+    FROM   rollup_year_country
+    WHERE  year_active BETWEEN :start_year AND :end_year
+    ORDER  BY year_active, country;
+"""
+
+TITLE_DESCRIPTION_SQL = """
+    SELECT
+        project_id,
+        project_title,
+        project_description,
+        country,
+        year_active
+    FROM project_data
+    WHERE
+        (CAST(:country AS TEXT) IS NULL OR country = :country)
+        AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+        AND (
+            CAST(:search AS TEXT) IS NULL OR
+            project_title ILIKE '%' || :search || '%' OR
+            project_description ILIKE '%' || :search || '%'
+        )
+    ORDER BY year_active DESC, country
+    LIMIT :limit OFFSET :offset;
+"""
+
+# cursor pagination: one row-value comparison on the keyset index (migrations.py,
+# KEYSET_ORDER) – every page costs the same, however deep. Fetches limit + 1 rows
+# to know whether there is a next page.
+TITLE_DESCRIPTION_KEYSET_SQL = """
+    SELECT
+        id,
+        project_id,
+        project_title,
+        project_description,
+        country,
+        year_active
+    FROM project_data
+    WHERE
+        (CAST(:country AS TEXT) IS NULL OR country = :country)
+        AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+        AND (
+            CAST(:search AS TEXT) IS NULL OR
+            project_title ILIKE '%' || :search || '%' OR
+            project_description ILIKE '%' || :search || '%'
+        )
+        AND (
+            CAST(:after_id AS BIGINT) IS NULL OR
+            (-COALESCE(year_active, 0), COALESCE(country, ''), COALESCE(project_id, ''), id)
+                > (:after_year, :after_country, :after_project, :after_id)
+        )
+    ORDER BY -COALESCE(year_active, 0), COALESCE(country, ''), COALESCE(project_id, ''), id
+    LIMIT :limit + 1;
+"""
+
+# search_mode=fulltext: GIN-indexed search_tsv (migrations.py), ranked; snippets are
+# only built for the page that is returned. Reads project_details directly: it carries
+# copies of project_id / country / year_active (vertical_split.py), so the search never
+# has to look rows up by id in every year partition of project_facts.
+TITLE_DESCRIPTION_FTS_SQL = """
+    SELECT
+        page.*,
+        ts_headline('english', coalesce(page.project_description, page.project_title, ''), page.query,
+                    'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=25, MinWords=8') AS snippet
+    FROM (
+        SELECT
+            project_id,
+            project_title,
+            project_description,
+            country,
+            year_active,
+            ts_rank_cd(search_tsv, query) AS rank,
+            query
+        FROM project_details, websearch_to_tsquery('english', :search) AS query
+        WHERE
+            search_tsv @@ query
+            AND (CAST(:country AS TEXT) IS NULL OR country = :country)
+            AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+        ORDER BY rank DESC, year_active DESC, country
+        LIMIT :limit OFFSET :offset
+    ) AS page
+    ORDER BY page.rank DESC, page.year_active DESC, page.country;
+"""
+
+FUNDING_GROUP_SQL = """
+    SELECT
+        donor,
+        SUM(COALESCE({fund_col}, 0)) AS total_funding_usd
+    FROM   project_data
+    WHERE
+        (CAST(:country AS TEXT) IS NULL OR country = :country)
+        AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+    GROUP BY donor
+    ORDER BY total_funding_usd DESC
+    LIMIT :limit;
+"""
+
+FUNDING_GROUP_ROLLUP_SQL = """
+    SELECT
+        donor,
+        SUM({fund_col}) AS total_funding_usd
+    FROM   rollup_year_country_donor
+    WHERE
+        (CAST(:country AS TEXT) IS NULL OR country = :country)
+        AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+    GROUP BY donor
+    ORDER BY total_funding_usd DESC
+    LIMIT :limit;
+"""
+
+# bulk export: no ORDER BY, rows leave in physical order without a server-side sort
+EXPORT_SQL = """
+    SELECT {columns}
+    FROM   project_data
+    WHERE
+        (CAST(:country AS TEXT) IS NULL OR country = :country)
+        AND (CAST(:year AS INTEGER) IS NULL OR year_active = :year)
+        AND (CAST(:source AS TEXT) IS NULL OR source = :source);
+"""
+
+EXPORT_COLUMNS_SQL = """
+    SELECT column_name, data_type
+    FROM   information_schema.columns
+    WHERE  table_name = 'project_data'
+       AND table_schema = current_schema()
+       AND column_name <> 'search_tsv'
+    ORDER  BY ordinal_position;
+"""
+
+ROLLUPS_EXIST_SQL = """
+    SELECT to_regclass('rollup_year_country') IS NOT NULL
+       AND to_regclass('rollup_year_country_donor') IS NOT NULL
+       AND to_regclass('rollup_state') IS NOT NULL;
+"""
+
+# a row per failed refresh since the last full rebuild (rollups.py)
+ROLLUPS_STALE_SQL = """
+    SELECT EXISTS (SELECT 1 FROM rollup_state);
+"""
+
+DATA_VERSIONS_EXIST_SQL = """
+    SELECT to_regclass('data_versions') IS NOT NULL;
+"""
+
+# country-scoped summaries depend on that country's counters, the rest on all of them;
+# the ('*', '') row (lake rebuilds) is part of every version
+DATA_VERSION_SQL = """
+    SELECT COALESCE(SUM(version), 0)
+    FROM   data_versions
+    WHERE  CAST(:country AS TEXT) IS NULL OR country = :country OR source = '*';
+"""
+
+_exists_checked = {}
+
+async def _table_exists(db: Session, sql: str) -> bool:
+    """Cached result of an existence probe (re-checked every ROLLUP_CHECK_SECONDS)."""
+    now = time.monotonic()
+    at, available = _exists_checked.get(sql, (0.0, False))
+    if now - at > ROLLUP_CHECK_SECONDS:
+        rows = await fetch_all(db, text(sql))
+        available = bool(rows and rows[0][0])
+        _exists_checked[sql] = (now, available)
+    return available
+
+async def rollups_available(db: Session) -> bool:
+    """Whether the rollup tables exist and no refresh has failed since the last rebuild."""
+    return (USE_ROLLUPS and await _table_exists(db, ROLLUPS_EXIST_SQL)
+            and not await _table_exists(db, ROLLUPS_STALE_SQL))
+
+_versions_checked = {}
+
+async def data_version(db: Session, country: str = None) -> str:
+    """Version of the rows behind a summary; changes whenever an ingest touches them."""
+    now = time.monotonic()
+    at, version = _versions_checked.get(country, (0.0, "0"))
+    if now - at > DATA_VERSION_CHECK_SECONDS:
+        version = "0"
+        if await _table_exists(db, DATA_VERSIONS_EXIST_SQL):
+            rows = await fetch_all(db, text(DATA_VERSION_SQL), {"country": country})
+            version = str(rows[0][0]) if rows else "0"
+        _versions_checked[country] = (now, version)
+    return version
+
+def columns_of(rows) -> dict:
+    """{column: [values]} straight from result rows – no per-row dicts; NUMERIC as FastAPI encodes it."""
+    if not rows:
+        return {}
+    return {
+        name: [decimal_encoder(v) if isinstance(v, decimal.Decimal) else v for v in values]
+        for name, values in zip(rows[0]._fields, zip(*rows))
+    }
+
+def render_aggregate(columns: dict, fmt: str, response: Response, headers: dict):
+    if fmt == "columnar":
+        return Response(dumps_json(columns), media_type="application/json", headers=headers)
+    if fmt == "arrow":
+        try:
+            body = arrow_ipc(columns)
+        except ImportError:
+            raise HTTPException(400, detail="format=arrow needs pyarrow on the API server")
+        return Response(body, media_type=EXPORT_FORMATS["arrow"][0], headers=headers)
+    response.headers.update(headers)
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+async def cached_response(request: Request, response: Response, db: Session, endpoint: str, params: dict,
+                          compute, country: str = None, fmt: str = "json"):
+    """
+    Serve the columns of *await compute()* through the response cache in
+    *fmt*, with a weak ETag over the parameters + format + data version; a
+    matching If-None-Match gets an empty 304.
+    """
+    if fmt not in AGGREGATE_FORMATS:
+        raise HTTPException(400, detail=f"format must be one of {AGGREGATE_FORMATS}")
+    key = response_cache.cache_key(endpoint + ":columns", params)     # one cache entry serves every format
+    version = await data_version(db, country)
+    etag = response_cache.make_etag(f"{key}|{fmt}", version)
+    if response_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def compute_columns():
+        return columns_of(await compute())
+
+    columns, hit = await response_cache.get_or_compute(key, version, compute_columns)
+    return render_aggregate(columns, fmt, response, {"ETag": etag, "X-Cache": "HIT" if hit else "MISS"})
+
+# ---------------------------------------------------------------------------
+# Cursor tokens – opaque to clients: base64url(JSON keyset of the last row)
+# ---------------------------------------------------------------------------
+def encode_cursor(row) -> str:
+    key = [-(row["year_active"] or 0), row["country"] or "", row["project_id"] or "", row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        year, country, project_id, row_id = json.loads(raw)
+        if not (isinstance(year, int) and isinstance(country, str)
+                and isinstance(project_id, str) and isinstance(row_id, int)):
+            raise ValueError
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(400, detail="invalid cursor")
+    return {"after_year": year, "after_country": country, "after_project": project_id, "after_id": row_id}
+
 # ---------------------------------------------------------------------------
 # Application
 # ---------------------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+    yield
+    if async_engine is not None:
+        await async_engine.dispose()
+
 app = FastAPI(
     title="Project Funding & Beneficiary API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ---------------------------------------------------------------------------
 # API 1 – Year‑Country Funding Summary
 # ---------------------------------------------------------------------------
 @app.get("/api/v1/projects/summary/year-country", tags=["Project APIs"], name="year_country_funding_summary")
-def year_country_funding_summary(
+async def year_country_funding_summary(
+    request: Request,
+    response: Response,
     start_year: int = Query(..., description="Inclusive start year"),
     end_year: int = Query(..., description="Inclusive end year"),
     fund_col: str = Query("total_commitment_usd", description="Funding column to sum"),
+    fmt: str = Query("json", alias="format", description="json, columnar ({column: [values]}) or arrow (IPC stream)"),
     db: Session = Depends(get_db),
 ):
     if start_year > end_year:
@@ -89,54 +464,53 @@ def year_country_funding_summary(
     if fund_col not in ALLOWED_FUND_COLS:
         raise HTTPException(400, detail=f"fund_col must be one of {ALLOWED_FUND_COLS}")
 
-    sql = text(f"""
-        SELECT
-            year_active                 AS year,
-            country,
-            COUNT(*)                    AS project_count,
-            SUM(COALESCE({fund_col}, 0)) AS total_funding_usd
-        FROM   project_data
-        WHERE  year_active BETWEEN :start_year AND :end_year
-        GROUP  BY year_active, country
-        ORDER  BY year_active, country;
-    """)
-
-    rows = db.execute(sql, {"start_year": start_year, "end_year": end_year}).fetchall()
-    return [dict(row._mapping) for row in rows]
+    async def compute():
+        template = YEAR_COUNTRY_ROLLUP_SQL if await rollups_available(db) else YEAR_COUNTRY_SUMMARY_SQL
+        sql = text(template.format(fund_col=fund_col))
+        return await fetch_all(db, sql, {"start_year": start_year, "end_year": end_year})
+
+    params = {"start_year": start_year, "end_year": end_year, "fund_col": fund_col}
+    return await cached_response(request, response, db, "year-country", params, compute, fmt=fmt)
 
 # ---------------------------------------------------------------------------
 # API 2 – Project Title & Description List
 # ---------------------------------------------------------------------------
 @app.get("/api/v1/projects/title-description", tags=["Project APIs"], name="project_title_description_list")
-def project_title_description_list(
+async def project_title_description_list(
     country: str = Query(None, description="Filter by country"),
     year: int = Query(None, description="Filter by year_active"),
     search: str = Query(None, description="Keyword search in title or description"),
+    search_mode: str = Query("substring", description="'substring' (ILIKE) or 'fulltext' (ranked, with snippets)"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum rows to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: str = Query(None, description="Keyset pagination: empty for the first page, then the previous next_cursor"),
     db: Session = Depends(get_db),
 ):
-    sql = text("""
-        SELECT
-            project_id,
-            project_title,
-            project_description,
-            country,
-            year_active
-        FROM project_data
-        WHERE
-            (:country IS NULL OR country = :country)
-            AND (:year IS NULL OR year_active = :year)
-            AND (
-                :search IS NULL OR
-                project_title ILIKE '%' || :search || '%' OR
-                project_description ILIKE '%' || :search || '%'
-            )
-        ORDER BY year_active DESC, country
-        LIMIT :limit OFFSET :offset;
-    """)
-
-    rows = db.execute(
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(400, detail=f"search_mode must be one of {SEARCH_MODES}")
+    if search_mode == "fulltext" and not search:
+        raise HTTPException(400, detail="search is required when search_mode=fulltext")
+
+    if cursor is not None:
+        if search_mode == "fulltext":
+            raise HTTPException(400, detail="cursor pagination is not available with search_mode=fulltext")
+        after = decode_cursor(cursor) if cursor else dict.fromkeys(
+            ("after_year", "after_country", "after_project", "after_id"))
+        rows = await fetch_all(
+            db,
+            text(TITLE_DESCRIPTION_KEYSET_SQL),
+            {"country": country, "year": year, "search": search, "limit": limit, **after},
+        )
+        page = [dict(row._mapping) for row in rows[:limit]]
+        next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+        for item in page:
+            item.pop("id")
+        return {"data": page, "next_cursor": next_cursor}
+
+    sql = text(TITLE_DESCRIPTION_FTS_SQL if search_mode == "fulltext" else TITLE_DESCRIPTION_SQL)
+
+    rows = await fetch_all(
+        db,
         sql,
         {
             "country": country,
@@ -145,7 +519,9 @@ def project_title_description_list(
             "limit": limit,
             "offset": offset,
         },
-    ).fetchall()
+    )
+    if search_mode == "fulltext":
+        return [{k: v for k, v in row._mapping.items() if k != "query"} for row in rows]
     return [dict(row._mapping) for row in rows]
 
 # ---------------------------------------------------------------------------
@@ -210,38 +586,113 @@ def project_title_description_list(
 # API 4 – Funding Breakdown by Group
 # ---------------------------------------------------------------------------
 @app.get("/api/v1/funding/summary/by-group", tags=["Funding APIs"], name="funding_group_breakdown")
-def funding_group_breakdown(
+async def funding_group_breakdown(
+    request: Request,
+    response: Response,
     country: str = Query(None, description="Filter by country"),
     year: int = Query(None, description="Filter by year"),
     fund_col: str = Query("total_commitment_usd", description="Funding column to sum"),
     limit: int = Query(20, ge=1, le=1000, description="Top N groups"),
+    fmt: str = Query("json", alias="format", description="json, columnar ({column: [values]}) or arrow (IPC stream)"),
     db: Session = Depends(get_db),
 ):
     if fund_col not in ALLOWED_FUND_COLS:
         raise HTTPException(400, detail=f"fund_col must be one of {ALLOWED_FUND_COLS}")
 
-    sql = text(f"""
-        SELECT
-            donor,
-            SUM(COALESCE({fund_col}, 0)) AS total_funding_usd
-        FROM   project_data
-        WHERE
-            (:country IS NULL OR country = :country)
-            AND (:year IS NULL OR year_active = :year)
-        GROUP BY donor
-        ORDER BY total_funding_usd DESC
-        LIMIT :limit;
-    """)
-
-    rows = db.execute(
-        sql,
-        {
-            "country": country,
-            "year": year,
-            "limit": limit,
-        },
-    ).fetchall()
-    return [dict(row._mapping) for row in rows]
+    async def compute():
+        template = FUNDING_GROUP_ROLLUP_SQL if await rollups_available(db) else FUNDING_GROUP_SQL
+        sql = text(template.format(fund_col=fund_col))
+        return await fetch_all(
+            db,
+            sql,
+            {
+                "country": country,
+                "year": year,
+                "limit": limit,
+            },
+        )
+
+    params = {"country": country, "year": year, "fund_col": fund_col, "limit": limit}
+    return await cached_response(request, response, db, "by-group", params, compute, country=country, fmt=fmt)
+
+# ---------------------------------------------------------------------------
+# API 5 – Bulk Export (streamed)
+# ---------------------------------------------------------------------------
+_export_columns = {"at": 0.0, "columns": []}
+
+async def export_columns(db: Session) -> list:
+    """[(name, data_type), ...] of project_data (re-read every ROLLUP_CHECK_SECONDS)."""
+    now = time.monotonic()
+    if not _export_columns["columns"] or now - _export_columns["at"] > ROLLUP_CHECK_SECONDS:
+        rows = await fetch_all(db, text(EXPORT_COLUMNS_SQL))
+        _export_columns.update(at=now, columns=[(r[0], r[1]) for r in rows])
+    return _export_columns["columns"]
+
+def _stream_sync(sql, params: dict, encoder):
+    # iterated on the threadpool by StreamingResponse; stream_results ⇒ named (server-side) cursor.
+    # Own session: get_db's teardown runs before the body is sent, so the request's is closed by now
+    yield encoder.begin()
+    db = SessionLocal()
+    try:
+        result = db.execute(sql, params, execution_options={"stream_results": True, "yield_per": EXPORT_BATCH_ROWS})
+        try:
+            for rows in result.partitions(EXPORT_BATCH_ROWS):
+                yield encoder.encode(rows)
+        finally:
+            result.close()
+    finally:
+        db.close()
+    yield encoder.end()
+
+async def _stream_async(sql, params: dict, encoder):
+    yield encoder.begin()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(sql, params, execution_options={"yield_per": EXPORT_BATCH_ROWS})
+        try:
+            async for rows in result.partitions(EXPORT_BATCH_ROWS):
+                yield await run_in_threadpool(encoder.encode, rows)      # keep encoding off the event loop
+        finally:
+            await result.close()
+    yield encoder.end()
+
+@app.get("/api/v1/projects/export", tags=["Project APIs"], name="project_export")
+async def project_export(
+    fmt: str = Query("ndjson", alias="format", description="ndjson, csv, arrow (IPC stream) or parquet"),
+    country: str = Query(None, description="Filter by country"),
+    year: int = Query(None, description="Filter by year_active"),
+    source: str = Query(None, description="Filter by source"),
+    columns: str = Query(None, description="Comma-separated columns (default: all)"),
+    db: Session = Depends(get_db),
+):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(400, detail=f"format must be one of {set(EXPORT_FORMATS)}")
+
+    available = await export_columns(db)
+    if not available:
+        raise HTTPException(503, detail="project_data is not available")
+    selected = available
+    if columns:
+        types = dict(available)
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in names if c not in types]
+        if unknown:
+            raise HTTPException(400, detail=f"unknown columns: {unknown}")
+        selected = [(c, types[c]) for c in names]
+
+    try:
+        encoder = make_encoder(fmt, selected)
+    except ImportError:
+        raise HTTPException(400, detail=f"format={fmt} needs pyarrow on the API server")
+
+    sql = text(EXPORT_SQL.format(columns=", ".join(f'"{name}"' for name, _ in selected)))
+    params = {"country": country, "year": year, "source": source}
+    stream = _stream_sync if AsyncSessionLocal is None else _stream_async
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream(sql, params, encoder),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="project_data.{extension}"'},
+    )
 
 # ---------------------------------------------------------------------------
 # Health check endpoint (optional)
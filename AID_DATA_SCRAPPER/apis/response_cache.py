@@ -0,0 +1,130 @@
+"""Response cache for the read API.
+
+Entries are keyed by endpoint + normalised query parameters + the data
+version of the rows involved (the `data_versions` counters that
+`ingest_data` bumps per source/country). A finished scrape run therefore
+invalidates exactly the cached responses it could have changed – nothing
+has to be purged explicitly, stale keys simply age out of the LRU.
+
+Backends
+--------
+* in-process LRU with TTL (default, per worker);
+* Redis-compatible, when RESPONSE_CACHE_URL is set and the `redis` package
+  is installed – shared by every worker. Falls back to the local cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))          # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")                       # e.g. redis://localhost:6379/0
+
+MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: int = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Same interface over any Redis-protocol server; values stored as JSON."""
+
+    def __init__(self, url: str, ttl: int = RESPONSE_CACHE_TTL, prefix: str = "aid-api:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(self.prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self._client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(key)
+
+
+def _make_backend():
+    if RESPONSE_CACHE_URL:
+        try:
+            return RedisCache(RESPONSE_CACHE_URL)
+        except ImportError:
+            pass
+    return LocalCache()
+
+
+cache = _make_backend()
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Endpoint + parameters with defaults/None dropped and keys sorted."""
+    normalised = {k: v for k, v in sorted(params.items()) if v is not None}
+    return endpoint + "?" + json.dumps(normalised, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def make_etag(key: str, version: str) -> str:
+    return 'W/"' + hashlib.sha1(f"{key}|{version}".encode()).hexdigest()[:24] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # weak comparison: W/"x" and "x" are the same representation for us
+    strip = lambda t: t[2:] if t.startswith("W/") else t
+    return "*" in candidates or strip(etag) in {strip(t) for t in candidates}
+
+
+async def get_or_compute(key: str, version: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+    """(JSON-ready value, served from cache?) for *key* at data *version*."""
+    if not RESPONSE_CACHE_ENABLED:
+        return jsonable_encoder(await compute()), False
+    versioned = f"{key}@{version}"
+    value = cache.get(versioned)
+    if value is not MISSING:
+        return value, True
+    value = jsonable_encoder(await compute())
+    cache.set(versioned, value)
+    return value, False
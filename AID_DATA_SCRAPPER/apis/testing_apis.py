@@ -1,8 +1,15 @@
+import io
+import json
+from collections import namedtuple
+from decimal import Decimal
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import DBAPIError
 
 # Import the FastAPI app and the DB dependency from the merged API file
-from main import app, get_db
+from main import app, get_db, encode_cursor, decode_cursor, async_database_url
+from response_cache import MISSING, LocalCache, cache_key
 
 
 class FakeResult:
@@ -62,6 +69,69 @@ def test_year_country_funding_summary_success():
     assert isinstance(resp.json(), list)
 
 
+SummaryRow = namedtuple("SummaryRow", "year country project_count total_funding_usd")
+
+
+class SummarySession(FakeSession):
+    def execute(self, *args, **kwargs):
+        return FakeResult([SummaryRow(1950, "Kenya", 3, Decimal("1.5")), SummaryRow(1951, "Chad", 1, None)])
+
+
+@pytest.fixture
+def summary_db():
+    def _get_db():
+        yield SummarySession()
+
+    app.dependency_overrides[get_db] = _get_db
+
+
+def test_year_country_funding_summary_formats(summary_db):
+    c = client()
+    params = {"start_year": 1950, "end_year": 1951}
+    rows = c.get("/api/v1/projects/summary/year-country", params=params).json()
+    assert rows[0] == {"year": 1950, "country": "Kenya", "project_count": 3, "total_funding_usd": 1.5}
+
+    columnar = c.get("/api/v1/projects/summary/year-country", params={**params, "format": "columnar"})
+    assert columnar.json() == {
+        "year": [1950, 1951], "country": ["Kenya", "Chad"], "project_count": [3, 1], "total_funding_usd": [1.5, None],
+    }
+    assert columnar.headers["ETag"] != c.get("/api/v1/projects/summary/year-country", params=params).headers["ETag"]
+
+
+def test_year_country_funding_summary_arrow(summary_db):
+    pa = pytest.importorskip("pyarrow")
+    resp = client().get("/api/v1/projects/summary/year-country",
+                        params={"start_year": 1950, "end_year": 1951, "format": "arrow"})
+    table = pa.ipc.open_stream(resp.content).read_all()
+    assert table.column("total_funding_usd").to_pylist() == [1.5, None]
+    assert resp.headers["X-Cache"] in ("HIT", "MISS")
+
+
+class ProbeSession(FakeSession):
+    def __init__(self, stale):
+        self.stale = stale
+
+    def execute(self, sql, *args, **kwargs):
+        return FakeResult([(self.stale if "FROM rollup_state" in str(sql) else True,)])
+
+
+@pytest.mark.parametrize("stale", [False, True])
+def test_stale_rollups_fall_back_to_project_data(stale, monkeypatch):
+    import asyncio
+
+    import main
+
+    monkeypatch.setattr(main, "USE_ROLLUPS", True)
+    monkeypatch.setattr(main, "_exists_checked", {})
+    assert asyncio.run(main.rollups_available(ProbeSession(stale))) is not stale
+
+
+def test_year_country_funding_summary_invalid_format():
+    resp = client().get("/api/v1/projects/summary/year-country",
+                        params={"start_year": 2015, "end_year": 2020, "format": "xml"})
+    assert resp.status_code == 400
+
+
 def test_year_country_funding_summary_invalid_fund_col():
     c = client()
     resp = c.get(
@@ -86,6 +156,42 @@ def test_project_title_description_list_defaults():
     assert isinstance(resp.json(), list)
 
 
+def test_project_title_description_list_fulltext():
+    c = client()
+    resp = c.get(
+        "/api/v1/projects/title-description",
+        params={"search": "maternal health", "search_mode": "fulltext"},
+    )
+    assert resp.status_code == 200
+    assert isinstance(resp.json(), list)
+
+
+def test_project_title_description_list_fulltext_requires_search():
+    c = client()
+    resp = c.get("/api/v1/projects/title-description", params={"search_mode": "fulltext"})
+    assert resp.status_code == 400
+
+
+def test_project_title_description_list_cursor_first_page():
+    c = client()
+    resp = c.get("/api/v1/projects/title-description", params={"cursor": ""})
+    assert resp.status_code == 200
+    assert resp.json() == {"data": [], "next_cursor": None}
+
+
+def test_project_title_description_list_invalid_cursor():
+    c = client()
+    resp = c.get("/api/v1/projects/title-description", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_cursor_round_trip():
+    row = {"year_active": 2021, "country": "Kenya", "project_id": "GB-1-123", "id": 42}
+    assert decode_cursor(encode_cursor(row)) == {
+        "after_year": -2021, "after_country": "Kenya", "after_project": "GB-1-123", "after_id": 42,
+    }
+
+
 # ---------------------------------------------------------------------------
 # API 3: age_group_beneficiary_summary
 # ---------------------------------------------------------------------------
@@ -124,3 +230,162 @@ def test_funding_group_breakdown_invalid_fund_col():
         params={"fund_col": "not_a_column"},
     )
     assert resp.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# API 5: project_export
+# ---------------------------------------------------------------------------
+
+EXPORT_CATALOG = [("project_id", "text"), ("year_active", "integer"), ("total_commitment_usd", "numeric")]
+EXPORT_ROWS = [("P1", 2020, Decimal("1.5")), ("P2", None, None), ("P3", 2021, Decimal("10"))]
+
+
+class ExportResult(FakeResult):
+    def partitions(self, size=None):
+        yield self._data[:2]
+        yield self._data[2:]
+
+    def close(self):
+        pass
+
+
+class ExportSession(FakeSession):
+    opened = []
+
+    def __init__(self):
+        self.closed = False
+        self.opened.append(self)
+
+    def execute(self, sql, *args, **kwargs):
+        if "information_schema" in str(sql):
+            return FakeResult(EXPORT_CATALOG)
+        return ExportResult(EXPORT_ROWS)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def export_db(monkeypatch):
+    import main
+
+    def _get_db():
+        yield ExportSession()
+
+    ExportSession.opened = []
+    app.dependency_overrides[get_db] = _get_db
+    monkeypatch.setattr(main, "SessionLocal", ExportSession)      # the stream's own session
+
+
+def test_project_export_ndjson(export_db):
+    resp = client().get("/api/v1/projects/export")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines[0] == {"project_id": "P1", "year_active": 2020, "total_commitment_usd": 1.5}
+    assert len(lines) == 3
+
+
+def test_project_export_streams_on_its_own_session_and_closes_it(export_db):
+    assert client().get("/api/v1/projects/export").status_code == 200
+    request_db, stream_db = ExportSession.opened
+    assert stream_db is not request_db and stream_db.closed
+
+
+def test_project_export_csv(export_db):
+    resp = client().get("/api/v1/projects/export", params={"format": "csv"})
+    assert resp.text.splitlines() == [
+        "project_id,year_active,total_commitment_usd", "P1,2020,1.5", "P2,,", "P3,2021,10",
+    ]
+
+
+def test_project_export_parquet(export_db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    resp = client().get("/api/v1/projects/export", params={"format": "parquet"})
+    table = pq.read_table(io.BytesIO(resp.content))
+    assert table.column("year_active").to_pylist() == [2020, None, 2021]
+    assert str(table.schema.field("year_active").type) == "int32"
+    assert pq.ParquetFile(io.BytesIO(resp.content)).num_row_groups == 2
+
+
+def test_project_export_rejects_unknown_format_and_columns(export_db):
+    c = client()
+    assert c.get("/api/v1/projects/export", params={"format": "xml"}).status_code == 400
+    assert c.get("/api/v1/projects/export", params={"columns": "project_id,nope"}).status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# Response cache
+# ---------------------------------------------------------------------------
+
+def test_summary_sets_etag_and_cache_header():
+    c = client()
+    params = {"start_year": 2001, "end_year": 2002}
+    first = c.get("/api/v1/projects/summary/year-country", params=params)
+    second = c.get("/api/v1/projects/summary/year-country", params=params)
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+
+
+def test_summary_if_none_match_returns_304():
+    c = client()
+    etag = c.get("/api/v1/funding/summary/by-group", params={"country": "Kenya"}).headers["ETag"]
+    resp = c.get(
+        "/api/v1/funding/summary/by-group",
+        params={"country": "Kenya"},
+        headers={"If-None-Match": etag},
+    )
+    assert resp.status_code == 304
+    assert resp.content == b""
+    other = c.get("/api/v1/funding/summary/by-group", params={"country": "Ghana"})
+    assert other.headers["ETag"] != etag
+
+
+def test_cache_key_ignores_order_and_none():
+    assert cache_key("x", {"a": 1, "b": None, "c": "z"}) == cache_key("x", {"c": "z", "a": 1})
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("b") is MISSING
+
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(max_entries=2, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is MISSING
+
+
+# ---------------------------------------------------------------------------
+# Database layer
+# ---------------------------------------------------------------------------
+
+class CanceledQuery(Exception):
+    pgcode = "57014"
+
+
+class TimingOutSession(FakeSession):
+    def execute(self, *args, **kwargs):
+        raise DBAPIError("SELECT ...", {}, CanceledQuery("canceling statement due to statement timeout"))
+
+
+def test_statement_timeout_returns_504():
+    def _get_db():
+        yield TimingOutSession()
+
+    app.dependency_overrides[get_db] = _get_db
+    resp = client().get("/api/v1/projects/title-description", params={"search": "x"})
+    assert resp.status_code == 504
+
+
+def test_async_database_url():
+    url = async_database_url("postgresql+psycopg2://u:pw@db:5432/aid")
+    assert url.startswith("postgresql+asyncpg://u:pw@db:5432/aid?")
+    assert "prepared_statement_cache_size=" in url
@@ -0,0 +1,192 @@
+"""
+EXPLAIN regression test: the filtered endpoints must stay index-backed.
+
+Needs a real PostgreSQL; skipped unless TEST_DATABASE_URL is set, e.g.
+
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres:pw@localhost/aid_test pytest testing_explain.py
+
+Everything happens in a throw-away schema, so any database will do.
+EXPLAIN_TEST_ROWS controls the synthetic table size (default 200 000).
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import (  # noqa: E402
+    EXPORT_SQL, FUNDING_GROUP_ROLLUP_SQL, FUNDING_GROUP_SQL, TITLE_DESCRIPTION_FTS_SQL, TITLE_DESCRIPTION_KEYSET_SQL,
+    TITLE_DESCRIPTION_SQL, YEAR_COUNTRY_ROLLUP_SQL, YEAR_COUNTRY_SUMMARY_SQL,
+)
+
+from partitions import DEFAULT_PARTITION, partition_name  # noqa: E402
+from vertical_split import DETAILS_TABLE, FACTS_TABLE  # noqa: E402
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = "explain_test"
+ROWS = int(os.getenv("EXPLAIN_TEST_ROWS", "200000"))
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    from db_setup_and_ingest_org import CREATE_TABLE_SQL
+    from migrations import apply_migrations
+
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    eng = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    with eng.begin() as conn:
+        conn.execute(text(CREATE_TABLE_SQL))
+        conn.execute(text("""
+            INSERT INTO project_data (project_id, country, year_active, donor, project_title,
+                                      total_commitment_usd, funding_amount_usd)
+            SELECT 'P' || g,
+                   'Country ' || (g % 60),
+                   1990 + (g % 36),
+                   'Donor ' || (g % 250),
+                   'Project ' || g || CASE WHEN g % 1000 = 0 THEN ' maternal health' ELSE ' roads' END,
+                   g % 100000,
+                   g % 5000
+            FROM generate_series(1, :rows) AS g
+        """), {"rows": ROWS})
+    apply_migrations(eng)                   # indexes, vertical split, year partitions + ANALYZE
+    yield eng
+
+    eng.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    admin.dispose()
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def plan_nodes(engine, sql, params):
+    with engine.connect() as conn:
+        result = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+    return list(_nodes((json.loads(result) if isinstance(result, str) else result)[0]["Plan"]))
+
+
+def seq_scanned(engine, sql, params):
+    return [n.get("Relation Name") for n in plan_nodes(engine, sql, params) if n["Node Type"] == "Seq Scan"]
+
+
+def partition_tree(engine, relation):
+    with engine.connect() as conn:
+        return {r[0] for r in conn.execute(text(f"SELECT relid::text FROM pg_partition_tree('{relation}')"))}
+
+
+def requested_years(params):
+    if params.get("year") is not None:
+        return {params["year"]}
+    if "start_year" in params:
+        return set(range(params["start_year"], params["end_year"] + 1))
+    return set()
+
+
+CASES = {
+    "year-country summary, one year": (
+        YEAR_COUNTRY_SUMMARY_SQL.format(fund_col="total_commitment_usd"),
+        {"start_year": 2020, "end_year": 2020},
+    ),
+    "funding by group, country": (
+        FUNDING_GROUP_SQL.format(fund_col="total_commitment_usd"),
+        {"country": "Country 7", "year": None, "limit": 20},
+    ),
+    "funding by group, year": (
+        FUNDING_GROUP_SQL.format(fund_col="funding_amount_usd"),
+        {"country": None, "year": 2020, "limit": 20},
+    ),
+    "title-description, country + year": (
+        TITLE_DESCRIPTION_SQL,
+        {"country": "Country 7", "year": 2020, "search": None, "limit": 100, "offset": 0},
+    ),
+    "title-description, country": (
+        TITLE_DESCRIPTION_SQL,
+        {"country": "Country 7", "year": None, "search": None, "limit": 100, "offset": 0},
+    ),
+    "title-description, full-text search": (
+        TITLE_DESCRIPTION_FTS_SQL,
+        {"country": None, "year": None, "search": "maternal", "limit": 100, "offset": 0},
+    ),
+    "export, country": (
+        EXPORT_SQL.format(columns="project_id, project_title"),
+        {"country": "Country 7", "year": None, "source": None},
+    ),
+}
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_filtered_endpoint_is_index_backed(engine, case):
+    sql, params = CASES[case]
+    scanned = set(seq_scanned(engine, sql, params))
+    # the partition a year filter was pruned to may be read whole – every row of it matches;
+    # the default one only holds undated rows
+    allowed = {partition_name(year) for year in requested_years(params)} | {DEFAULT_PARTITION}
+    assert not (scanned & partition_tree(engine, FACTS_TABLE)) - allowed
+    if "search_tsv" in sql:                 # the full-text filter lives on the details table
+        assert DETAILS_TABLE not in scanned
+
+
+@pytest.mark.parametrize("sql, params", [
+    (YEAR_COUNTRY_SUMMARY_SQL.format(fund_col="total_commitment_usd"), {"start_year": 2020, "end_year": 2021}),
+    (FUNDING_GROUP_SQL.format(fund_col="funding_amount_usd"), {"country": None, "year": 2020, "limit": 20}),
+    (TITLE_DESCRIPTION_SQL, {"country": "Country 7", "year": 2020, "search": None, "limit": 100, "offset": 0}),
+])
+def test_year_filters_prune_partitions(engine, sql, params):
+    relations = {n.get("Relation Name") for n in plan_nodes(engine, sql, params)}
+    assert relations & partition_tree(engine, FACTS_TABLE) == {partition_name(y) for y in requested_years(params)}
+
+
+def test_deep_keyset_page_walks_the_index(engine):
+    params = {"country": None, "year": None, "search": None, "limit": 100,
+              "after_year": -2005, "after_country": "Country 30", "after_project": "P5000", "after_id": ROWS // 2}
+    nodes = plan_nodes(engine, TITLE_DESCRIPTION_KEYSET_SQL, params)
+    assert [n for n in nodes if n["Node Type"] in ("Seq Scan", "Sort")] == []
+    keyset_indexes = partition_tree(engine, "ix_project_data_keyset")
+    assert any(n.get("Index Name") in keyset_indexes for n in nodes)
+
+
+@pytest.mark.parametrize("sql, params", [
+    (YEAR_COUNTRY_ROLLUP_SQL.format(fund_col="total_commitment_usd"), {"start_year": 1990, "end_year": 2025}),
+    (FUNDING_GROUP_ROLLUP_SQL.format(fund_col="funding_amount_usd"), {"country": None, "year": None, "limit": 20}),
+])
+def test_summaries_read_rollups_not_the_fact_table(engine, sql, params):
+    relations = {n.get("Relation Name") for n in plan_nodes(engine, sql, params)}
+    assert not (partition_tree(engine, FACTS_TABLE) | {DETAILS_TABLE}) & relations
+
+
+@pytest.mark.parametrize("sql, params", [
+    (YEAR_COUNTRY_SUMMARY_SQL.format(fund_col="total_commitment_usd"), {"start_year": 1990, "end_year": 2025}),
+    (FUNDING_GROUP_SQL.format(fund_col="funding_amount_usd"), {"country": None, "year": None, "limit": 20}),
+])
+def test_aggregates_over_the_view_only_read_the_fact_table(engine, sql, params):
+    relations = {n.get("Relation Name") for n in plan_nodes(engine, sql, params)} - {None}
+    assert relations and relations <= partition_tree(engine, FACTS_TABLE)
+
+
+def test_migrations_are_recorded_once(engine):
+    from migrations import MIGRATIONS, apply_migrations
+
+    assert apply_migrations(engine) == []
+    with engine.connect() as conn:
+        versions = [r[0] for r in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+        kind = conn.execute(text(f"SELECT relkind FROM pg_class WHERE oid = '{FACTS_TABLE}'::regclass")).scalar()
+        pk = conn.execute(text(
+            f"SELECT 1 FROM pg_constraint WHERE conrelid = '{DETAILS_TABLE}'::regclass AND contype = 'p'"
+        )).first()
+    assert versions == [v for v, _, _ in MIGRATIONS]
+    assert kind == "p"                      # partitioned
+    assert pk is not None
@@ -0,0 +1,317 @@
+# --- browser.py ---
+"""
+Chrome / chromedriver provisioning and the browser profile shared by the
+Selenium scrapers.
+
+The installed Chrome version is resolved once per process, and the matching
+chromedriver is kept in a shared cache keyed by Chrome's major version:
+
+    AID_DRIVER_CACHE/<major>/chromedriver[.exe]              plain driver (selenium)
+    AID_DRIVER_CACHE/<major>/undetected/chromedriver[.exe]   copy patched by undetected-chromedriver
+
+A scraper start is a lookup in that directory: no version check over the
+network, and the undetected copy is patched on its first use only.
+
+    driver = webdriver.Chrome(service=chrome_service(), options=options)
+    driver = uc.Chrome(options=opts, **undetected_driver_args())
+
+A missing driver is fetched once with webdriver-manager. With
+AID_DRIVER_OFFLINE=1 nothing is downloaded: put the binary in place on the
+machine beforehand,
+
+    python browser.py provision                        # download for the installed Chrome
+    python browser.py provision --from ./chromedriver  # copy a binary fetched elsewhere
+    python browser.py status
+
+or point AID_CHROMEDRIVER at one. AID_CHROME_VERSION overrides the detected
+Chrome version (e.g. "137" or "137.0.7151.69").
+
+Profile: a scraper builds its options as before, then opts in with
+
+    apply_profile(options, "oecd")      # before launch
+    prepare_driver(driver)              # after launch
+
+The "fast" profile (AID_BROWSER_PROFILE, default) runs headless, blocks
+images, fonts, media and trackers (prefs + CDP Network.setBlockedURLs),
+disables extensions, returns from get() at DOMContentLoaded (eager page-load
+strategy) and keeps a disk cache per source under AID_BROWSER_CACHE. "full"
+leaves the scraper's own options untouched – the baseline to compare with.
+Either way every driver.get() is a "page" span (telemetry.py) with the bytes
+the page transferred, so
+
+    AID_TRACE_FILE=t.jsonl AID_BROWSER_PROFILE=full python replay.py run oecd ...
+    AID_TRACE_FILE=t.jsonl AID_BROWSER_PROFILE=fast python replay.py run oecd ...
+    python telemetry.py summary t.jsonl
+
+gives the page-load time per source under both profiles.
+AID_BROWSER_HEADLESS=0 keeps the window visible for debugging.
+"""
+
+import logging
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("ingestion")
+
+DRIVER_CACHE_DIR = os.getenv("AID_DRIVER_CACHE",
+                             os.path.join(os.path.expanduser("~"), ".cache", "aid_drivers"))
+OFFLINE = os.getenv("AID_DRIVER_OFFLINE", "0") == "1"
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+
+PROFILE = os.getenv("AID_BROWSER_PROFILE", "fast")              # "fast" | "full"
+HEADLESS = os.getenv("AID_BROWSER_HEADLESS", "1") == "1"
+BROWSER_CACHE_DIR = os.getenv("AID_BROWSER_CACHE",
+                              os.path.join(os.path.expanduser("~"), ".cache", "aid_browser"))
+# Network.setBlockedURLs patterns ("*" wildcards). SVG stays allowed: the
+# sites draw buttons and dropdown arrows with it, and a blocked icon can leave
+# an element without a size Selenium will click.
+BLOCKED_URLS = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+    "*facebook.net*", "*connect.facebook.com*", "*clarity.ms*", "*linkedin.com/px*", "*matomo*",
+    "*siteimproveanalytics*", "*newrelic.com*", "*nr-data.net*", "*youtube.com/embed*",
+)
+# bytes of the document plus every subresource, read after a page load
+_TRANSFERRED_JS = (
+    "return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))"
+    ".reduce(function (n, e) { return n + (e.transferSize || 0); }, 0);"
+)
+
+# Chrome binaries tried in order when the version is not in the Windows registry
+CHROME_BINARIES = (
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+)
+_VERSION_RE = re.compile(r"(\d+)\.\d+\.\d+\.\d+")
+
+_lock = threading.RLock()             # undetected_driver_path() nests chromedriver_path()
+_chrome_version: Optional[str] = None
+_resolved: Dict[str, str] = {}          # flavour ("plain" | "undetected") → driver path
+
+
+class DriverUnavailable(RuntimeError):
+    """No chromedriver for the installed Chrome, and it may not be downloaded."""
+
+
+# ---------------------------------------------------------------------------
+# Chrome version
+# ---------------------------------------------------------------------------
+def _registry_version() -> Optional[str]:
+    try:
+        import winreg
+    except ImportError:
+        return None
+    for hive in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(hive, r"Software\Google\Chrome\BLBeacon") as key:
+                return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            continue
+    return None
+
+
+def _binary_version() -> Optional[str]:
+    for binary in CHROME_BINARIES:
+        if os.path.sep not in binary and shutil.which(binary) is None:
+            continue
+        if os.path.sep in binary and not os.path.exists(binary):
+            continue
+        try:
+            out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = _VERSION_RE.search(out)
+        if match:
+            return match.group(0)
+    return None
+
+
+def chrome_version() -> str:
+    """Installed Chrome version ("137.0.7151.69"), resolved once per process."""
+    global _chrome_version
+    if _chrome_version is None:
+        version = os.getenv("AID_CHROME_VERSION") or _registry_version() or _binary_version()
+        if not version:
+            raise DriverUnavailable("Chrome not found; set AID_CHROME_VERSION to its version")
+        _chrome_version = version
+        logger.info(f"🌐 Chrome {version}")
+    return _chrome_version
+
+
+def chrome_major() -> int:
+    return int(chrome_version().split(".")[0])
+
+
+# ---------------------------------------------------------------------------
+# Driver cache
+# ---------------------------------------------------------------------------
+def cached_driver_path(major: Optional[int] = None, flavour: str = "plain") -> str:
+    """Where the driver for Chrome *major* lives in the cache (whether or not it exists yet)."""
+    folder = os.path.join(DRIVER_CACHE_DIR, str(major or chrome_major()))
+    if flavour == "undetected":
+        folder = os.path.join(folder, "undetected")
+    return os.path.join(folder, DRIVER_NAME)
+
+
+def _install(source: str, dest: str) -> str:
+    """Copy *source* to *dest* atomically and make it executable."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    shutil.copy2(source, tmp)
+    os.chmod(tmp, os.stat(tmp).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.replace(tmp, dest)
+    return dest
+
+
+def _download() -> str:
+    """Fetch the driver for the installed Chrome with webdriver-manager; returns its path."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+def provision(source: Optional[str] = None, major: Optional[int] = None) -> str:
+    """
+    Put the chromedriver for Chrome *major* into the cache – copied from
+    *source*, or downloaded – and return its path.
+    """
+    dest = cached_driver_path(major)
+    if source is None:
+        if OFFLINE:
+            raise DriverUnavailable(
+                f"no chromedriver in {os.path.dirname(dest)} and AID_DRIVER_OFFLINE=1; "
+                f"run `python browser.py provision --from <chromedriver>` or set AID_CHROMEDRIVER"
+            )
+        source = _download()
+    _install(source, dest)
+    logger.info(f"🚗 chromedriver for Chrome {major or chrome_major()} cached: {dest}")
+    return dest
+
+
+def chromedriver_path() -> str:
+    """Path of a chromedriver matching the installed Chrome; downloads it at most once."""
+    explicit = os.getenv("AID_CHROMEDRIVER")
+    if explicit:
+        return explicit
+    with _lock:
+        if "plain" not in _resolved:
+            path = cached_driver_path()
+            _resolved["plain"] = path if os.path.exists(path) else provision()
+        return _resolved["plain"]
+
+
+def undetected_driver_path() -> str:
+    """
+    The undetected-chromedriver copy of the driver. uc patches it in place on
+    the first start and recognises it as patched afterwards.
+    """
+    with _lock:
+        if "undetected" not in _resolved:
+            path = cached_driver_path(flavour="undetected")
+            if not os.path.exists(path):
+                _install(chromedriver_path(), path)
+            _resolved["undetected"] = path
+        return _resolved["undetected"]
+
+
+def chrome_service(**kwargs):
+    """selenium Service for the cached driver (instead of ChromeDriverManager().install())."""
+    from selenium.webdriver.chrome.service import Service
+
+    return Service(chromedriver_path(), **kwargs)
+
+
+def undetected_driver_args() -> dict:
+    """Keyword arguments for uc.Chrome: the cached, pre-patched driver of the installed Chrome."""
+    return {"driver_executable_path": undetected_driver_path(), "version_main": chrome_major()}
+
+
+# ---------------------------------------------------------------------------
+# Browser profile
+# ---------------------------------------------------------------------------
+def apply_profile(options, source: str):
+    """
+    Add the fast profile to *options* (selenium or uc ChromeOptions) for
+    *source*; returns them. No-op under AID_BROWSER_PROFILE=full.
+    """
+    if PROFILE != "fast":
+        return options
+    if HEADLESS and not any(a.startswith("--headless") for a in options.arguments):
+        options.add_argument("--headless=new")
+    if not any(a.startswith("--window-size=") and "," in a for a in options.arguments):
+        options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    options.add_argument(f"--disk-cache-dir={os.path.join(BROWSER_CACHE_DIR, source)}")
+    options.page_load_strategy = "eager"
+    # images are also switched off in prefs: covers <img> URLs without an extension
+    prefs = dict(options.experimental_options.get("prefs", {}))
+    prefs["profile.managed_default_content_settings.images"] = 2
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def prepare_driver(driver):
+    """
+    Block BLOCKED_URLS for *driver* (fast profile) and time its get() calls
+    as "page" spans; returns the driver.
+    """
+    from telemetry import span
+
+    if PROFILE == "fast":
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URLS)})
+        except Exception as e:
+            logger.warning(f"⚠️ could not block resources over CDP: {e}")
+
+    get = driver.get
+
+    def timed_get(url):
+        with span("page", profile=PROFILE, host=urlsplit(url).hostname or "") as s:
+            get(url)
+            try:
+                s.add(bytes=driver.execute_script(_TRANSFERRED_JS) or 0)
+            except Exception:
+                pass                       # chrome-error pages, downloads
+
+    driver.get = timed_get
+    return driver
+
+
+def reset() -> None:
+    """Forget the resolved version and drivers (tests, or after a Chrome update)."""
+    global _chrome_version
+    with _lock:
+        _chrome_version = None
+        _resolved.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("command", choices=("provision", "status"))
+    p.add_argument("--from", dest="source", help="chromedriver binary to copy instead of downloading")
+    p.add_argument("--major", type=int, help="Chrome major version (default: installed Chrome)")
+    a = p.parse_args()
+
+    if a.command == "provision":
+        print(provision(a.source, a.major))
+    else:
+        major = a.major or chrome_major()
+        print(f"Chrome {a.major or chrome_version()}  cache {DRIVER_CACHE_DIR}")
+        for flavour in ("plain", "undetected"):
+            path = cached_driver_path(major, flavour)
+            print(f"  {flavour:10} {'ok     ' if os.path.exists(path) else 'missing'} {path}")
@@ -0,0 +1,65 @@
+# --- data_versions.py ---
+"""
+Data-version counters for cache invalidation in the read API.
+
+ingest_data() bumps one counter per (source, country) it wrote; apis/main.py
+folds the counters into its response-cache keys and ETags, so a cached
+summary is served until a scrape run actually changes the rows behind it.
+Bulk operations that touch everything (lake rebuilds) bump the ('*', '')
+row, which every lookup includes.
+"""
+
+import logging
+from typing import Iterable, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger("ingestion")
+
+DATA_VERSIONS_TABLE = "data_versions"
+ALL_SOURCES = "*"
+
+CREATE_DATA_VERSIONS_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DATA_VERSIONS_TABLE} (
+    source      TEXT NOT NULL,
+    country     TEXT NOT NULL DEFAULT '',
+    version     BIGINT NOT NULL DEFAULT 1,
+    updated_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (source, country)
+);
+"""
+
+BUMP_SQL = f"""
+INSERT INTO {DATA_VERSIONS_TABLE} (source, country) VALUES (:source, :country)
+ON CONFLICT (source, country) DO UPDATE
+SET version = {DATA_VERSIONS_TABLE}.version + 1, updated_at = now();
+"""
+
+
+def changed_pairs(df: pd.DataFrame) -> Set[Tuple[str, str]]:
+    """Distinct (source, country) of a batch; missing values become ''."""
+    if df is None or df.empty:
+        return set()
+    def column(name):
+        if name not in df.columns:
+            return [""] * len(df)
+        return ["" if pd.isna(v) else str(v) for v in df[name]]
+    return set(zip(column("source"), column("country")))
+
+
+def bump_data_versions(engine, pairs: Optional[Iterable[Tuple[str, str]]] = None) -> None:
+    """Bump the given (source, country) counters, or the global one when *pairs* is None."""
+    pairs = sorted(pairs) if pairs is not None else [(ALL_SOURCES, "")]
+    if not pairs:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(BUMP_SQL), [{"source": s, "country": c} for s, c in pairs])
+
+
+def bump_after_ingest(engine, df: pd.DataFrame) -> None:
+    """ingest_data() hook – never fails the ingest."""
+    try:
+        bump_data_versions(engine, changed_pairs(df))
+    except Exception as e:
+        logger.error(f"❌ Could not bump data versions (API caches may serve stale data): {e}")
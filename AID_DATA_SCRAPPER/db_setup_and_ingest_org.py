@@ -2,14 +2,14 @@
 
 import os
 import glob
+import io
 import json
+import numpy as np
 import pandas as pd
 import requests
 from sqlalchemy import create_engine
 from sqlalchemy_utils import database_exists, create_database
 from datetime import datetime
-from scrappers.foreign_assistance_scraper import run_foreign_assistance_scraper
-from scrappers.who_ghed_scraper import run_who_ghed_scraper 
 import logging
 import shutil
 from datetime import datetime
@@ -19,55 +19,27 @@ from datetime import datetime
 import shutil
 from sqlalchemy import text
 from pathlib import Path
+from typing import Dict, List
+from utils.logging_utils import get_logger
+from watermarks import (
+    WatermarkRun, delete_superseded, ensure_watermark_table, rows_changed_since, solr_since_filter,
+)
+import lake
+from migrations import apply_migrations, analyze_after_load
+from rollups import refresh_after_ingest
+from data_versions import bump_after_ingest
+from partitions import ensure_partitions, partition_years
+from schema_contract import encode_categories, enforce
+from telemetry import span
+from vertical_split import STAGE_TABLE, create_stage_sql, flush_stage_sql
 
 def sanitize_filename(text):
     return re.sub(r'[^A-Za-z0-9_\-]+', '_', text)
 # Set up logging (place at top of file if not already defined)
 # Configure logging
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "world_bank_scraper.log"
-
-logger_wb = logging.getLogger("world_bank_scraper")
-logger_wb.setLevel(logging.INFO)
-logger_wb.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger_wb.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger_wb.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger_wb.addHandler(file_h)
-
-log_file = "ingestion.log"
-
-logger = logging.getLogger("ingestion")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger_wb = get_logger("world_bank_scraper", "world_bank_scraper.log")
+
+logger = get_logger("ingestion", "ingestion.log")
 # --- Config ---
 from config import DB_URL, TABLE_NAME
 
@@ -265,6 +237,8 @@ def init_database():
 
     # ⬇️  🔄 run the migration here
     _ensure_text_columns(engine)
+    apply_migrations(engine)          # primary key + API indexes (migrations.py)
+    ensure_watermark_table(engine)
 
     return engine
 
@@ -284,6 +258,12 @@ def parse_date(val):
             return None
     return None
 
+def parse_timestamp(val):
+    """ISO timestamp (any offset) → naive UTC datetime, or None."""
+    val = safe_first(val)
+    ts = pd.to_datetime(val, errors="coerce", utc=True) if val else pd.NaT
+    return None if pd.isna(ts) else ts.tz_localize(None).to_pydatetime()
+
 # --- Map CSV to Unified Schema ---
 def map_csv_to_standard(df: pd.DataFrame) -> pd.DataFrame:
     df.columns = [col.strip().lower() for col in df.columns]
@@ -342,12 +322,14 @@ def map_csv_to_standard(df: pd.DataFrame) -> pd.DataFrame:
     mapped["project_description"] = df.get("/description/narrative")
     mapped["document_links"] = df.get("/document-link@url")
     mapped["evaluation_docs"] = df.get("/result/document-link@url")
+    if "@last-updated-datetime" in df.columns:
+        mapped["last_updated"] = pd.to_datetime(df["@last-updated-datetime"], errors="coerce", utc=True).dt.tz_localize(None)
     mapped["source"] = "IATI"
     # Drop empty rows and ensure key identifiers are present
     mapped.dropna(how="all", inplace=True)
     mapped.dropna(subset=["project_id", "project_title", "country_code"], how="all", inplace=True)
 
-    return mapped.reset_index(drop=True)
+    return encode_categories(mapped.reset_index(drop=True))
 
 # --- Map JSON to Unified Schema ---
 def map_json_to_standard(data: dict) -> pd.DataFrame:
@@ -425,6 +407,7 @@ def map_json_to_standard(data: dict) -> pd.DataFrame:
             "top_donors": "UK - FCDO",
             "total_projects": len(doc.get("related_activity_ref", [])),
             "cluster_tags": ", ".join(doc.get("sector_narrative", []) + doc.get("policy_marker_narrative", [])),
+            "last_updated": parse_timestamp(doc.get("last_updated_datetime")),
             "source": "FCDO"
         }
 
@@ -433,58 +416,133 @@ def map_json_to_standard(data: dict) -> pd.DataFrame:
     return pd.DataFrame()
 
 # --- Ingest Data ---
-def ingest_data(df: pd.DataFrame):
+def _copy_to_stage(conn, df: pd.DataFrame) -> None:
+    """COPY *df* into the bulk-load staging table of *conn*'s transaction (CSV over STDIN)."""
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    buf.seek(0)
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY {STAGE_TABLE} ({cols}) FROM STDIN WITH (FORMAT csv, HEADER true)", buf)
+
+def ingest_data(df: pd.DataFrame, since=None):
+    """
+    Append *df* to project_data and return the rows actually ingested.
+    With *since* (a watermark), rows whose last_updated is not newer are dropped
+    and the rest replace the stored versions of their (source, project_id).
+    Every column is cast to its project_data type first; rows that do not cast
+    are quarantined instead of failing the batch (schema_contract.py).
+    The batch is COPYed into a staging table and split set-wise into
+    project_facts / project_details, like lake rebuilds (vertical_split.py).
+    Ingested rows are also landed as Parquet (see lake.py) for later replay.
+    """
     if df.empty:
         logger.warning("⚠️ Skipping ingestion: DataFrame is empty or invalid.")
         print("⚠️ Skipping ingestion: DataFrame is empty or invalid.")
-        return
+        return df
+
+    if since is not None:
+        changed = rows_changed_since(df, since)
+        if len(changed) < len(df):
+            logger.info(f"⏩ {len(df) - len(changed)} rows unchanged since {since}, skipped.")
+        df = changed
+        if df.empty:
+            return df
+
+    engine = init_database()
+    with span("coerce", rows_in=len(df)) as s:
+        df = enforce(df, engine)
+        s.add(rows_out=len(df))
+    if df.empty:
+        logger.warning("⚠️ Skipping ingestion: every row was rejected by the schema contract.")
+        return df
 
     print(f"📥 Ingesting {len(df)} rows into {TABLE_NAME}")
     logger.info(f"📥 Ingesting {len(df)} rows into {TABLE_NAME}")
 
-    engine = init_database()
+    replaced = None
     try:
-        df.to_sql(TABLE_NAME, engine, if_exists="append", index=False)
+        with span("load", rows_in=len(df)) as s:
+            ensure_partitions(engine, partition_years(df))      # year partitions of project_facts
+            with engine.begin() as conn:
+                if since is not None:
+                    replaced = delete_superseded(conn, df)
+                for statement in create_stage_sql():
+                    conn.execute(text(statement))
+                _copy_to_stage(conn, df)
+                for statement in flush_stage_sql():
+                    conn.execute(text(statement))
+            s.add(rows_out=len(df))
         logger.info(f"🚀 Ingested {len(df)} rows into {TABLE_NAME}.")
     except Exception as e:
         logger.error(f"❌ Ingestion failed: {e}")
         raise 
+    touched = df
+    if replaced is not None and not replaced.empty:
+        logger.info(f"♻️ {len(replaced)} stored rows replaced by their newer versions.")
+        # the old versions' (year, country) keys may differ from the new ones
+        touched = pd.concat([replaced, df[[c for c in replaced.columns if c in df.columns]].astype(object)],
+                            ignore_index=True)
+    analyze_after_load(engine, len(df))
+    refresh_after_ingest(engine, touched)
+    bump_after_ingest(engine, touched)    # after the rollups, so API caches never see the old rollup rows
+    lake.land(df, logger, replace=since is not None)
+    return df
 
 # --- Parse IATI CSV Files ---
 
-def parse_iati_csvs(folder="iati_downloads"):
+def parse_iati_csvs(folder="iati_downloads", watermark_key=None):
+    """
+    Ingest every activity CSV in *folder*. With a *watermark_key*, activities
+    already in the archive are re-read and only rows whose
+    @last-updated-datetime moved past the watermark are ingested.
+    """
     archive_folder = os.path.join(folder, "archive")
     os.makedirs(archive_folder, exist_ok=True)
 
     csv_paths = glob.glob(os.path.join(folder, "*.csv"))
-    for path in csv_paths:
-        filename = os.path.basename(path)
-        archive_path = os.path.join(archive_folder, filename)
-
-        logger.info(f"📄 Parsing CSV: {filename}")
-        if os.path.exists(archive_path):
-            logger.info(f"📁 File already in archive, skipping ingestion.")
-            os.remove(path)
-            logger.info(f"🗑️ Deleted duplicate: {path}")
-            continue
-
-        try:
-            df = pd.read_csv(path)
-            # logger.info("📌 CSV Columns:", df.columns.tolist())
-
-            mapped = map_csv_to_standard(df)
-            ingest_data(mapped)
-            logger.info(f"✅ Ingested: {filename}")
-
-            shutil.move(path, archive_path)
-            logger.info(f"📦 Moved to archive: {archive_path}")
+    with WatermarkRun(watermark_key, init_database) as wm:
+        for path in csv_paths:
+            filename = os.path.basename(path)
+            archive_path = os.path.join(archive_folder, filename)
+
+            logger.info(f"📄 Parsing CSV: {filename}")
+            already_archived = os.path.exists(archive_path)
+            if already_archived and wm.since is None:
+                logger.info(f"📁 File already in archive, skipping ingestion.")
+                os.remove(path)
+                logger.info(f"🗑️ Deleted duplicate: {path}")
+                continue
 
-        except Exception as e:
-            logger.info(f"❌ Error processing {filename}: {e}")
+            try:
+                with span("parse", bytes=os.path.getsize(path)) as s:
+                    df = pd.read_csv(path)
+                    mapped = map_csv_to_standard(df)
+                    s.add(rows_in=len(df), rows_out=len(mapped))
+                if already_archived and ("last_updated" not in mapped or mapped["last_updated"].isna().all()):
+                    # no modification dates → cannot tell what changed, keep the old behaviour
+                    logger.info(f"📁 Archived file has no last-updated dates, skipping ingestion.")
+                    os.remove(path)
+                    continue
+
+                wm.observe(ingest_data(mapped, since=wm.since))
+                logger.info(f"✅ Ingested: {filename}")
+
+                os.replace(path, archive_path)
+                logger.info(f"📦 Moved to archive: {archive_path}")
+
+            except Exception as e:
+                wm.failed = True          # keep the watermark: this file is retried next run
+                logger.info(f"❌ Error processing {filename}: {e}")
 
 # --- Parse FCDO JSON Links ---
 # --- Parse FCDO JSON Links from Saved File ---
-def parse_fcdo_jsons(file_path: str):
+def parse_fcdo_jsons(file_path: str, watermark_key=None):
+    """
+    Fetch and ingest every IATI.cloud JSON link in *file_path*. With a
+    *watermark_key* the Solr query only asks for activities modified after
+    the stored watermark.
+    """
     if not os.path.exists(file_path):
         logger.error(f"JSON links file not found: {file_path}")
         return
@@ -492,21 +550,27 @@ def parse_fcdo_jsons(file_path: str):
     with open(file_path) as f:
         urls = [line.strip() for line in f if line.strip()]
 
-    for url in urls:
-        try:
-            logger.info(f"Fetching JSON: {url}")
-            res = requests.get(url)
-            data = res.json()
-            mapped = map_json_to_standard(data)
+    with WatermarkRun(watermark_key, init_database) as wm:
+        since_fq = solr_since_filter(wm.since)
+        for url in urls:
+            try:
+                logger.info(f"Fetching JSON: {url}")
+                with span("download") as s:
+                    res = requests.get(url + since_fq)
+                    s.add(bytes=len(res.content))
+                with span("parse") as s:
+                    mapped = map_json_to_standard(res.json())
+                    s.add(rows_out=len(mapped))
 
-            if mapped.empty or mapped.isnull().all(axis=1).iloc[0]:
-                logger.warning(f"Skipping JSON with all-null fields: {url}")
-                continue
+                if mapped.empty or mapped.isnull().all(axis=1).iloc[0]:
+                    logger.warning(f"Skipping JSON with all-null fields: {url}")
+                    continue
 
-            ingest_data(mapped)
+                wm.observe(ingest_data(mapped, since=wm.since))
 
-        except Exception as e:
-            logger.warning(f"Failed to process {url}: {e}")
+            except Exception as e:
+                wm.failed = True          # keep the watermark: this activity is retried next run
+                logger.warning(f"Failed to process {url}: {e}")
 
     # Move processed file to archive subfolder
     try:
@@ -572,14 +636,22 @@ def parse_worldbank_data(country_code="NG", indicator_code="SP.POP.TOTL", date_r
 
     ingest_data(mapped)
 
-def parse_worldbank_projects(country, indicator_code, date_range):
+def parse_worldbank_projects(country, indicator_code, date_range, watermark_key=None):
+    """
+    Fetch, map and ingest World Bank projects for *country*. The projects API
+    has no modified-since filter, so with a *watermark_key* the full list is
+    fetched and only projects whose p2a_updated_date moved past the
+    watermark are ingested.
+    """
     # Handle ISO-to-name mapping
     
 
     
     
     url = f"https://search.worldbank.org/api/v2/projects?format=json&countrycode={country}"
-    res = requests.get(url)
+    with span("download") as s:
+        res = requests.get(url)
+        s.add(bytes=len(res.content))
     data = res.json()
 
     projects = data.get("projects", {})
@@ -587,35 +659,39 @@ def parse_worldbank_projects(country, indicator_code, date_range):
         logger_wb.info("⚠️ No projects found.")
         return
 
-    df = pd.DataFrame.from_dict(projects, orient="index")
-
-    mapped = pd.DataFrame()
-    mapped["project_id"] = df.get("id")
-    mapped["project_title"] = df.get("project_name")
-    mapped["donor_name"] = "World Bank"
-    mapped["donor_id"] = "WB"
-    mapped["donor"] = "World Bank"
-    mapped["country"] = df["countryname"].apply(lambda x: x[0] if isinstance(x, list) else x)
-    mapped["country_code"] = df["countrycode"].apply(lambda x: x[0] if isinstance(x, list) else x)
-    mapped["geography"] = df["countryname"].apply(lambda x: x[0] if isinstance(x, list) else x)
-    mapped["region"] = df.get("regionname")
-    mapped["start_date"] = pd.to_datetime(df.get("boardapprovaldate"), errors="coerce").dt.date
-    mapped["end_date"] = pd.to_datetime(df.get("closingdate"), errors="coerce").dt.date
-    mapped["project_status"] = df.get("status")
-    mapped["status"] = df.get("status")
-    mapped["funding_type"] = df.get("prodlinetext")
-    mapped["funding_modality"] = df.get("lendinginstr")
-    mapped["funding_amount_usd"] = pd.to_numeric(df.get("totalamt"), errors="coerce")
-    mapped["total_commitment_usd"] = pd.to_numeric(df.get("totalcommamt"), errors="coerce")
-    mapped["implementer_name"] = df.get("impagency")
-    mapped["implementing_partner"] = df.get("impagency")
-    mapped["sector"] = df["mjtheme_namecode"].apply(lambda x: x[0]["name"] if isinstance(x, list) and x else None)
-    mapped["subsector"] = df["sector1"].apply(lambda x: x.get("Name") if isinstance(x, dict) else None)
-    mapped["document_links"] = df.get("url")
-    mapped["project_description"] = df.get("project_abstract")
-    mapped["year_active"] = df.get("approvalfy")
-    mapped["last_updated"] = pd.to_datetime(df.get("p2a_updated_date"), errors="coerce").dt.date
-    mapped["source"] = "World Bank"
+    with span("parse", rows_in=len(projects)) as s:
+        df = pd.DataFrame.from_dict(projects, orient="index")
+
+        mapped = pd.DataFrame()
+        mapped["project_id"] = df.get("id")
+        mapped["project_title"] = df.get("project_name")
+        mapped["donor_name"] = "World Bank"
+        mapped["donor_id"] = "WB"
+        mapped["donor"] = "World Bank"
+        mapped["country"] = df["countryname"].apply(lambda x: x[0] if isinstance(x, list) else x)
+        mapped["country_code"] = df["countrycode"].apply(lambda x: x[0] if isinstance(x, list) else x)
+        mapped["geography"] = df["countryname"].apply(lambda x: x[0] if isinstance(x, list) else x)
+        mapped["region"] = df.get("regionname")
+        mapped["start_date"] = pd.to_datetime(df.get("boardapprovaldate"), errors="coerce").dt.date
+        mapped["end_date"] = pd.to_datetime(df.get("closingdate"), errors="coerce").dt.date
+        mapped["project_status"] = df.get("status")
+        mapped["status"] = df.get("status")
+        mapped["funding_type"] = df.get("prodlinetext")
+        mapped["funding_modality"] = df.get("lendinginstr")
+        mapped["funding_amount_usd"] = pd.to_numeric(df.get("totalamt"), errors="coerce")
+        mapped["total_commitment_usd"] = pd.to_numeric(df.get("totalcommamt"), errors="coerce")
+        mapped["implementer_name"] = df.get("impagency")
+        mapped["implementing_partner"] = df.get("impagency")
+        mapped["sector"] = df["mjtheme_namecode"].apply(lambda x: x[0]["name"] if isinstance(x, list) and x else None)
+        mapped["subsector"] = df["sector1"].apply(lambda x: x.get("Name") if isinstance(x, dict) else None)
+        mapped["document_links"] = df.get("url")
+        mapped["project_description"] = df.get("project_abstract")
+        mapped["year_active"] = df.get("approvalfy")
+        # full timestamp: it becomes the watermark, and a later update on the same day must still count
+        mapped["last_updated"] = pd.to_datetime(df.get("p2a_updated_date"), errors="coerce")
+        mapped["source"] = "World Bank"
+        encode_categories(mapped)
+        s.add(rows_out=len(mapped))
     # File and folder setup
     base_dir = "world_bank_downloads"
     archive_dir = os.path.join(base_dir, "archive")
@@ -629,19 +705,23 @@ def parse_worldbank_projects(country, indicator_code, date_range):
     filepath = os.path.join(base_dir, filename)
 
     # Check for archive version (without timestamp)
-    archive_prefix   = f"{base_country}_{base_indicator}_"
-    already_archived = any(f.startswith(archive_prefix) for f in os.listdir(archive_dir))
-
-    if already_archived:
-        logger.info(f"⏩ Skipping ingestion: archive for {country} / {indicator_code} already exists.")
-        return
-
-    # Save and ingest
-    mapped.to_csv(filepath, index=False)
-    logger_wb.info(f"✅ Saved World Bank data to {filepath}")
+    archive_prefix = f"{base_country}_{base_indicator}_"
+    archived = [f for f in os.listdir(archive_dir) if f.startswith(archive_prefix)]
 
     try:
-        ingest_data(mapped)
+        with WatermarkRun(watermark_key, init_database) as wm:
+            if archived and wm.since is None:
+                # these projects are in project_data already; with a key, start the watermark
+                # from the archived dates so the next run only ingests what changed after them
+                for name in archived:
+                    wm.observe(pd.read_csv(os.path.join(archive_dir, name), usecols=lambda c: c == "last_updated"))
+                logger.info(f"⏩ Skipping ingestion: archive for {country} / {indicator_code} already exists.")
+                return
+
+            # Save and ingest
+            mapped.to_csv(filepath, index=False)
+            logger_wb.info(f"✅ Saved World Bank data to {filepath}")
+            wm.observe(ingest_data(mapped, since=wm.since))
         logger.info("📥 Ingested data successfully.")
 
         # Move to archive
@@ -651,19 +731,8 @@ def parse_worldbank_projects(country, indicator_code, date_range):
     except Exception as e:
         logger.error(f"❌ Ingestion failed: {e}")
 
-def parse_foreign_assistance_data(filters):
-    # Modified scraper should return path to saved file (or None)
-    csv_file_path = run_foreign_assistance_scraper(filters)
-    # csv_file_path = r'E:\Portfolio\code_ver7\foreign_assistance_downloads\Country Name-Afghanistan_US Sector Name-Health_20250630_151449.csv'
-    try:
-        df = pd.read_csv(csv_file_path)
-        if df.empty:
-            logger.info("⚠️ No data extracted from CSV (empty file).")
-            return
-    except Exception as e:
-        logger.info(f"⚠️ Failed to load CSV: {e}")
-        return
-
+def map_foreign_assistance_to_standard(df: pd.DataFrame) -> pd.DataFrame:
+    """ForeignAssistance.gov CSV export → unified schema."""
     mapped = pd.DataFrame()
     mapped["project_id"] = df.get("Activity ID")
     mapped["project_title"] = df.get("Activity Name")
@@ -686,6 +755,28 @@ def parse_foreign_assistance_data(filters):
     mapped["source"] = "Foreign Assistance"
 
     mapped.dropna(subset=["project_id", "project_title", "country_code"], how="all", inplace=True)
+    return encode_categories(mapped)
+
+def parse_foreign_assistance_data(filters):
+    # Selenium-backed scraper – imported on demand so the API process stays light
+    from scrappers.foreign_assistance_scraper import run_foreign_assistance_scraper
+
+    # Modified scraper should return path to saved file (or None)
+    with span("scrape"):
+        csv_file_path = run_foreign_assistance_scraper(filters)
+    # csv_file_path = r'E:\Portfolio\code_ver7\foreign_assistance_downloads\Country Name-Afghanistan_US Sector Name-Health_20250630_151449.csv'
+    try:
+        df = pd.read_csv(csv_file_path)
+        if df.empty:
+            logger.info("⚠️ No data extracted from CSV (empty file).")
+            return
+    except Exception as e:
+        logger.info(f"⚠️ Failed to load CSV: {e}")
+        return
+
+    with span("parse", rows_in=len(df), bytes=os.path.getsize(csv_file_path)) as s:
+        mapped = map_foreign_assistance_to_standard(df)
+        s.add(rows_out=len(mapped))
 
     # Ingest the mapped DataFrame
     ingest_data(mapped)
@@ -702,7 +793,11 @@ def parse_foreign_assistance_data(filters):
 import shutil
 
 def parse_who_ghed_data(country: str, start_year: int, end_year: int, download_dir: str = "ghed_downloads"):
-    file_path = run_who_ghed_scraper(country, start_year, end_year, download_dir)
+    from scrappers.who_ghed_scraper import run_who_ghed_scraper
+    from utils.ghed_excel import load_ghed_frame
+
+    with span("scrape"):
+        file_path = run_who_ghed_scraper(country, start_year, end_year, download_dir)
     if not file_path or not os.path.exists(file_path):
         logger.info("❌ No file downloaded.")
         return
@@ -726,48 +821,11 @@ def parse_who_ghed_data(country: str, start_year: int, end_year: int, download_d
             return
 
         # --- Continue to ingest since no match was found ---
-        df = pd.read_excel(file_path, sheet_name="Data", engine="openpyxl", dtype=str)
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed', case=False)]
-
-        mapping = {
-            "code": "country_code",
-            "region": "region",
-            "location": "subnational_area",
-            "year": "year_active",
-            "che": "total_commitment_usd",
-            "gghed": "total_disbursed_usd",
-            "che_pc_usd": "cost_per_beneficiary",
-            "che_gdp": "impact_per_usd",
-            "gghed_che": "leverage_ratio",
-            "pvtd": "beneficiary_count",
-            "gghed_gdp": "impact_score",
-            "ext": "funding_amount_usd",
-            "gghed_pc_usd": "avg_impact_score",
-            "pvtd_pc_usd": "percent_outcomes_achieved",
-            "oop_pc_usd": "impact_per_dollar",
-            "ext_pc_usd": "avg_outcomes_achieved",
-            "source": "WHO"
-        }
-
-        df.rename(columns=mapping, inplace=True)
-        df.columns = df.columns.str.strip()
-        df = df[[col for col in mapping.values() if col in df.columns]]
-
-        numeric_cols = [
-            "total_commitment_usd", "total_disbursed_usd", "cost_per_beneficiary",
-            "impact_per_usd", "leverage_ratio", "beneficiary_count", "impact_score",
-            "funding_amount_usd", "avg_impact_score", "percent_outcomes_achieved",
-            "impact_per_dollar", "avg_outcomes_achieved"
-        ]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        if "beneficiary_count" in df.columns:
-            df["beneficiary_count"] = df["beneficiary_count"].round().dropna().astype("Int64")
-
-        df.dropna(subset=["country_code", "year_active"], how="any", inplace=True)
-        df["source"] = "GHED"
+        # only the "Data" sheet + mapped columns, native types, cached by file hash
+        with span("parse", bytes=os.path.getsize(file_path)) as s:
+            df = load_ghed_frame(file_path)
+            df["source"] = "GHED"
+            s.add(rows_out=len(df))
         ingest_data(df)
 
     except Exception as e:
@@ -832,31 +890,100 @@ def parse_un_sdg_data(indicator: str, area_code: int, start_year: int, end_year:
     except Exception as e:
         logger.info(f"❌ Error retrieving or processing UN SDG data: {e}")
 
+OECD_COLUMN_MAPPING = {
+    "STRUCTURE": "programme_id",
+    "STRUCTURE_ID": "project_id",
+    "STRUCTURE_NAME": "project_title",
+    "ACTION": "project_status",
+    "REF_AREA": "country_code",
+    "Reference area": "country",
+    "FREQ": "year_active",
+    "TIME_PERIOD": "year_active",
+    "MEASURE": "outcome_indicator_name",
+    "OBS_VALUE": "outcome_indicator_value",
+    "OBS_STATUS": "data_quality_score",
+    "DECIMALS": "indicator_values",
+    "RISK": "need_indicator_name",
+    "AGE": "beneficiary_disaggregation",
+    "SEX": "beneficiary_disaggregation",
+    "CONVERSION_TYPE": "data_standard",
+    "PRICE_BASE": "benchmark_comparison"
+}
+# everything but the observation is an SDMX dimension / attribute with a handful of distinct values
+OECD_CATEGORICAL = [c for c in OECD_COLUMN_MAPPING if c != "OBS_VALUE"]
+
+
+def read_oecd_csv(path: str) -> pd.DataFrame:
+    """The mapped columns of an OECD SDMX CSV; dimensions and attributes as categoricals."""
+    return pd.read_csv(path, usecols=lambda c: c in OECD_COLUMN_MAPPING,
+                       dtype={c: "category" for c in OECD_CATEGORICAL})
+
+
+def _join_categoricals(columns: List[pd.Series]) -> pd.Categorical:
+    """
+    Space-joined values of *columns*, missing parts skipped: each distinct
+    combination is joined once and the rows take its code.
+    """
+    cats = [c.astype("category").cat for c in columns]
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    for cat in cats:                                            # mixed radix, code -1 (NaN) → 0
+        key = key * (len(cat.categories) + 1) + (cat.codes.to_numpy(np.int64) + 1)
+    combos, inverse = np.unique(key, return_inverse=True)
+
+    labels = []
+    for combo in combos:
+        parts = []
+        for cat in reversed(cats):
+            combo, code = divmod(int(combo), len(cat.categories) + 1)
+            if code:
+                parts.append(str(cat.categories[code - 1]))
+        labels.append(" ".join(reversed(parts)).strip() or None)
+    codes, categories = pd.factorize(pd.Series(labels, dtype=object))
+    return pd.Categorical.from_codes(codes[inverse], categories)
+
+
+def _period_years(periods: pd.Series) -> pd.Series:
+    """Year of SDMX TIME_PERIOD values (2015, 2015-Q1, 2015-S2, 2015-01, 2015-W07 …), parsed per distinct period."""
+    cat = periods.astype("category").cat
+    years = pd.to_numeric(pd.Series(cat.categories.astype(str)).str[:4], errors="coerce").astype("Int32")
+    codes = cat.codes.to_numpy()
+    return pd.Series(years.array.take(codes, allow_fill=True), index=periods.index)
+
+
+def map_oecd_to_standard(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    OECD SDMX CSV export (read_oecd_csv) → unified schema. Source columns
+    mapped to the same target (AGE + SEX) are joined with spaces; year_active
+    comes from TIME_PERIOD, OBS_VALUE stays numeric.
+    """
+    mapped_data = pd.DataFrame(index=df.index)
+    targets: Dict[str, List[str]] = {}
+    for src_col, tgt_col in OECD_COLUMN_MAPPING.items():
+        if src_col in df.columns:
+            targets.setdefault(tgt_col, []).append(src_col)
+
+    for tgt_col, src_cols in targets.items():
+        if tgt_col == "year_active":
+            continue                                            # FREQ (A / Q / M) carries no year
+        if tgt_col == "outcome_indicator_value":
+            mapped_data[tgt_col] = pd.to_numeric(df[src_cols[0]], errors="coerce")
+        elif len(src_cols) == 1:
+            mapped_data[tgt_col] = df[src_cols[0]]
+        else:
+            mapped_data[tgt_col] = _join_categoricals([df[c] for c in src_cols])
+
+    if "project_id" not in mapped_data.columns:
+        mapped_data["project_id"] = range(1, len(mapped_data) + 1)
+    if "TIME_PERIOD" in df.columns:
+        mapped_data["year_active"] = _period_years(df["TIME_PERIOD"])
+    mapped_data["source"] = "OECD"
+    return encode_categories(mapped_data.reset_index(drop=True))
+
 def parse_oecd_csvs(folder="oecd_downloads"):
     archive_folder = os.path.join(folder, "archive")
     os.makedirs(archive_folder, exist_ok=True)
     logger.info(f"📄 Starting OECD CSV parsing in: {folder}")
 
-    COLUMN_MAPPING = {
-        "STRUCTURE": "programme_id",
-        "STRUCTURE_ID": "project_id",
-        "STRUCTURE_NAME": "project_title",
-        "ACTION": "project_status",
-        "REF_AREA": "country_code",
-        "Reference area": "country",
-        "FREQ": "year_active",
-        "TIME_PERIOD": "year_active",
-        "MEASURE": "outcome_indicator_name",
-        "OBS_VALUE": "outcome_indicator_value",
-        "OBS_STATUS": "data_quality_score",
-        "DECIMALS": "indicator_values",
-        "RISK": "need_indicator_name",
-        "AGE": "beneficiary_disaggregation",
-        "SEX": "beneficiary_disaggregation",
-        "CONVERSION_TYPE": "data_standard",
-        "PRICE_BASE": "benchmark_comparison"
-    }
-
     csv_paths = glob.glob(os.path.join(folder, "*.csv"))
     for path in csv_paths:
         filename = os.path.basename(path)
@@ -870,24 +997,11 @@ def parse_oecd_csvs(folder="oecd_downloads"):
             continue
 
         try:
-            df = pd.read_csv(path)
-            logger.info(f"🔍 Loaded {len(df)} rows from {filename}")
-
-            mapped_data = pd.DataFrame()
-            for src_col, tgt_col in COLUMN_MAPPING.items():
-                if src_col in df.columns:
-                    if tgt_col in mapped_data.columns:
-                        mapped_data[tgt_col] = (
-                            mapped_data[tgt_col].fillna('') + " " + df[src_col].fillna('').astype(str)
-                        ).str.strip()
-                    else:
-                        mapped_data[tgt_col] = df[src_col]
-
-            if "project_id" not in mapped_data.columns:
-                mapped_data["project_id"] = range(1, len(mapped_data) + 1)
-            if "year_active" in mapped_data.columns:
-                mapped_data["year_active"] = mapped_data["year_active"].astype(str).str.extract(r'(\d{4})').astype(float).astype("Int64")
-            mapped_data["source"] = "OECD"
+            with span("parse", bytes=os.path.getsize(path)) as s:
+                df = read_oecd_csv(path)
+                logger.info(f"🔍 Loaded {len(df)} rows from {filename}")
+                mapped_data = map_oecd_to_standard(df)
+                s.add(rows_in=len(df), rows_out=len(mapped_data))
             logger.info(f"✅ Mapped {len(mapped_data)} rows for ingestion from {filename}")
             logger.info(f"🧩 Columns in mapped data: {mapped_data.columns.tolist()}")
 
@@ -971,7 +1085,7 @@ def map_bii_direct_to_target(raw_df: pd.DataFrame) -> pd.DataFrame:
         tgt["project_status"]   = raw_df["Status"]
     tgt["source"]      = "BII"
     # any columns still missing in TARGET_COLS remain NaN/None
-    return tgt
+    return encode_categories(tgt)
 
 # ---------------------------------------------------------------------
 # Mapping for Funds CSV
@@ -1026,7 +1140,7 @@ def map_bii_fund_to_target(raw_df: pd.DataFrame) -> pd.DataFrame:
     if "Status" in raw_df.columns:
         tgt["project_status"]   = raw_df["Status"]
 
-    return tgt
+    return encode_categories(tgt)
 
 def map_bii_underlying_to_target(raw_df: pd.DataFrame) -> pd.DataFrame:
     """Convert simplified 'Underlying' CSV to unified target schema."""
@@ -1047,7 +1161,7 @@ def map_bii_underlying_to_target(raw_df: pd.DataFrame) -> pd.DataFrame:
     tgt["end_date"]           = pd.to_datetime(raw_df["End date"], errors="coerce").dt.date
     tgt["year_active"]        = pd.to_datetime(raw_df["Start Date"], errors="coerce").dt.year
     tgt["source"]      = "BII"
-    return tgt
+    return encode_categories(tgt)
 
 
 def parse_bii_csvs(folder="bii_downloads"):
@@ -1089,25 +1203,27 @@ def parse_bii_csvs(folder="bii_downloads"):
 
         # ── read & detect structure ──────────────────────────────────
         try:
-            raw = pd.read_csv(csv_path)
-            cols = set(raw.columns)
+            with span("parse", bytes=csv_path.stat().st_size) as s:
+                raw = pd.read_csv(csv_path)
+                cols = set(raw.columns)
             
-            if {"Project number", "Company", "USD Amount 1"}.issubset(cols):
-                mapped = map_bii_direct_to_target(raw)
-                label = "Direct"
-
-            elif {"Fund name", "USD Amount", "Investment type"}.issubset(cols):
-                mapped = map_bii_fund_to_target(raw)
-                label = "Fund"
-
-            elif {"Fund ID", "Company name", "Fossil fuel or renewable exposure"}.issubset(cols):
-                mapped = map_bii_underlying_to_target(raw)
-                label = "Underlying"
-
-            else:
-                logger.warning(f"⚠️ Unrecognised BII CSV layout: {csv_path.name}")
-                csv_path.rename(archive_target)
-                continue
+                if {"Project number", "Company", "USD Amount 1"}.issubset(cols):
+                    mapped = map_bii_direct_to_target(raw)
+                    label = "Direct"
+
+                elif {"Fund name", "USD Amount", "Investment type"}.issubset(cols):
+                    mapped = map_bii_fund_to_target(raw)
+                    label = "Fund"
+
+                elif {"Fund ID", "Company name", "Fossil fuel or renewable exposure"}.issubset(cols):
+                    mapped = map_bii_underlying_to_target(raw)
+                    label = "Underlying"
+
+                else:
+                    logger.warning(f"⚠️ Unrecognised BII CSV layout: {csv_path.name}")
+                    csv_path.rename(archive_target)
+                    continue
+                s.add(rows_in=len(raw), rows_out=len(mapped))
 
             # ── ingest into DB / target store ────────────────────────
             ingest_data(mapped)
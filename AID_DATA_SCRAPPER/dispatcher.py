@@ -0,0 +1,131 @@
+# --- dispatcher.py ---
+"""
+Runs the sources of one /get-data payload using the capabilities each
+plugin declares in source_registry:
+
+* browser sources share MAX_BROWSER_WORKERS Chrome instances across all
+  concurrent payloads; API sources run concurrently in their own pool
+  (MAX_API_WORKERS);
+* inside each pool the cheapest sources start first;
+* one run per source at a time, scrape and parse together: a scraper's
+  download folder is parsed wholesale, so two runs of it must not overlap;
+* rate-limited sources are spaced out across concurrent payloads;
+* cacheable sources that already ran with the same filters inside
+  SOURCE_CACHE_TTL seconds are skipped (checked once the source is free,
+  so identical concurrent payloads run it once).
+
+Each payload is traced as a "payload" span with one "source" span per
+source (telemetry.py); the stages below them are opened by the runners.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from source_registry import SourcePlugin, get_source
+from telemetry import span
+from utils.logging_utils import get_logger
+
+logger = get_logger("ingestion", "ingestion.log")
+
+MAX_BROWSER_WORKERS = int(os.getenv("MAX_BROWSER_WORKERS", "1"))
+MAX_API_WORKERS     = int(os.getenv("MAX_API_WORKERS", "4"))
+SOURCE_CACHE_TTL    = int(os.getenv("SOURCE_CACHE_TTL", "3600"))   # seconds
+
+_lock = threading.Lock()
+_completed_runs: Dict[Tuple[str, str], float] = {}   # (source, filter signature) → finished at
+_next_start: Dict[str, float] = {}                   # source → earliest allowed start
+_source_locks: Dict[str, threading.Lock] = {}        # source → held across one run (scrape + parse)
+_browser_slots = threading.BoundedSemaphore(MAX_BROWSER_WORKERS)   # Chrome instances, all payloads
+
+
+def filter_signature(filters: Dict[str, Any]) -> str:
+    return json.dumps(filters, sort_keys=True, default=str)
+
+
+def plan(sources: List[str]) -> Tuple[List[SourcePlugin], List[SourcePlugin], List[str]]:
+    """Split requested sources into (browser batch, API batch, unknown names)."""
+    browser, api, unknown = [], [], []
+    for name in dict.fromkeys(sources):          # de-duplicate, keep order
+        plugin = get_source(name)
+        if plugin is None:
+            unknown.append(name)
+        elif plugin.needs_browser:
+            browser.append(plugin)
+        else:
+            api.append(plugin)
+    by_cost = lambda p: p.expected_seconds
+    return sorted(browser, key=by_cost), sorted(api, key=by_cost), unknown
+
+
+def _wait_for_rate_limit(plugin: SourcePlugin) -> None:
+    if not plugin.rate_limit_per_minute:
+        return
+    interval = 60.0 / plugin.rate_limit_per_minute
+    with _lock:
+        now = time.monotonic()
+        start_at = max(now, _next_start.get(plugin.name, now))
+        _next_start[plugin.name] = start_at + interval
+    if start_at > now:
+        logger.info(f"⏳ {plugin.name}: rate limit, waiting {start_at - now:.1f}s")
+        time.sleep(start_at - now)
+
+
+def _source_lock(name: str) -> threading.Lock:
+    with _lock:
+        return _source_locks.setdefault(name, threading.Lock())
+
+
+def _run_plugin(plugin: SourcePlugin, filters: Dict[str, Any], use_cache: bool) -> Dict[str, Any]:
+    key = (plugin.name, filter_signature(filters))
+    with _source_lock(plugin.name):
+        if use_cache and plugin.cacheable:
+            with _lock:
+                finished_at = _completed_runs.get(key)
+            if finished_at and time.time() - finished_at < SOURCE_CACHE_TTL:
+                logger.info(f"♻️ {plugin.name}: same filters ran {time.time() - finished_at:.0f}s ago, skipping")
+                return {"status": "cached"}
+
+        _wait_for_rate_limit(plugin)
+        with _browser_slots if plugin.needs_browser else contextlib.nullcontext():
+            logger.info(f"Running scraper for: {plugin.name}")
+            started = time.perf_counter()
+            try:
+                with span("source", source=plugin.name):
+                    plugin.run(dict(filters))            # scrapers may mutate their filters
+            except Exception as e:
+                logger.error(f"❌ {plugin.name} failed: {e}")
+                return {"status": "error", "error": str(e), "seconds": round(time.perf_counter() - started, 1)}
+
+        if plugin.cacheable:
+            with _lock:
+                _completed_runs[key] = time.time()
+    return {"status": "ok", "seconds": round(time.perf_counter() - started, 1)}
+
+
+def dispatch(sources: List[str], filters: Dict[str, Any], use_cache: bool = True,
+             scrape_run_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Run every requested source; return {source → status dict} in request order."""
+    browser, api, unknown = plan(sources)
+    results: Dict[str, Dict[str, Any]] = {name: {"status": "unknown source"} for name in unknown}
+    for name in unknown:
+        logger.warning(f"⚠️ Unknown source requested: {name}")
+
+    def submit(pool, plugin):
+        # a context copy per task, so the source span is a child of this payload's span
+        return pool.submit(contextvars.copy_context().run, _run_plugin, plugin, filters, use_cache)
+
+    with span("payload", scrape_run_id=scrape_run_id, sources=",".join(dict.fromkeys(sources))), \
+         ThreadPoolExecutor(max_workers=MAX_BROWSER_WORKERS, thread_name_prefix="browser") as browser_pool, \
+         ThreadPoolExecutor(max_workers=MAX_API_WORKERS, thread_name_prefix="api") as api_pool:
+        futures = {p.name: submit(browser_pool, p) for p in browser}
+        futures.update({p.name: submit(api_pool, p) for p in api})
+        for name, future in futures.items():
+            results[name] = future.result()
+
+    return {name: results[name] for name in dict.fromkeys(sources)}
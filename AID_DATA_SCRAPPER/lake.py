@@ -0,0 +1,409 @@
+# --- lake.py ---
+"""
+Columnar landing zone for mapped batches.
+
+Every batch that goes through ingest_data() is also written as Parquet
+(zstd), typed with the project_data schema and hive-partitioned by
+source / country / year_active:
+
+    data_lake/source=World%20Bank/country=Nigeria/year_active=2019/<batch>-0.parquet
+
+The raw CSV / XLSX / TXT downloads stay in their *_downloads/archive folders,
+but nothing has to re-parse them any more: project_data can be replayed or
+rebuilt straight from the lake with COPY.
+
+    python lake.py backfill                    # export project_data into the lake (once per install)
+    python lake.py rebuild --truncate          # drop + reload project_data
+    python lake.py rebuild --source FCDO       # append one source (value of the `source` column)
+    python lake.py stats
+
+The lake only holds batches ingested since it was introduced. A replace
+(--truncate) would therefore drop every older row of project_data, so it is
+refused until `backfill` has exported the table into the lake. Backfill
+leaves a marker file in the lake; it is removed again when a batch fails to
+land or landing is switched off (AID_LAKE_ENABLED=0), because from then on
+the lake misses rows again. --allow-data-loss replaces anyway.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+LAKE_DIR          = os.getenv("AID_LAKE_DIR", "data_lake")
+LAKE_ENABLED      = os.getenv("AID_LAKE_ENABLED", "1") == "1"
+LAKE_COMPRESSION  = os.getenv("AID_LAKE_COMPRESSION", "zstd")
+PARTITION_COLUMNS = ["source", "country", "year_active"]
+REBUILD_BATCH_ROWS = 50_000
+BACKFILL_MARKER   = "_backfilled"     # "_" prefix: ignored by the Parquet dataset
+
+_SCHEMA = None
+
+
+class LakeIncomplete(RuntimeError):
+    """A replace from the lake would drop project_data rows the lake does not hold."""
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+def _arrow_type(sql_type: str, name: str = ""):
+    import pyarrow as pa
+    from schema_contract import LOW_CARDINALITY_COLUMNS
+
+    sql_type = sql_type.upper()
+    if sql_type.startswith("TIMESTAMP"):
+        return pa.timestamp("us")
+    if sql_type == "DATE":
+        return pa.date32()
+    if sql_type == "INTEGER":
+        return pa.int32()
+    if sql_type == "BIGINT":
+        return pa.int64()
+    if sql_type == "NUMERIC":
+        return pa.float64()
+    if name in LOW_CARDINALITY_COLUMNS and name not in PARTITION_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())      # categoricals stay encoded
+    return pa.string()                       # TEXT / CHARACTER VARYING
+
+
+def schema_from_ddl(create_sql: str):
+    """Arrow schema with the columns (and order) of a CREATE TABLE statement."""
+    import pyarrow as pa
+    from vertical_split import ddl_columns
+
+    return pa.schema([pa.field(name, _arrow_type(sql_type, name)) for name, sql_type in ddl_columns(create_sql)])
+
+
+def get_schema():
+    """project_data schema as Arrow (built once, on first use)."""
+    global _SCHEMA
+    if _SCHEMA is None:
+        from db_setup_and_ingest_org import CREATE_TABLE_SQL
+        _SCHEMA = schema_from_ddl(CREATE_TABLE_SQL)
+    return _SCHEMA
+
+
+def conform(df: pd.DataFrame, schema=None):
+    """
+    Mapped DataFrame → Arrow table with exactly the project_data columns:
+    unknown columns are dropped, missing ones become nulls and values are
+    cast by the schema contract (schema_contract.py); values that do not
+    cast become nulls.
+    """
+    import pyarrow as pa
+    from schema_contract import coerce
+
+    schema = schema or get_schema()
+    frame, _ = coerce(df, complete=True)
+    return pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False)
+
+
+def _partitioning(schema):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([schema.field(c) for c in PARTITION_COLUMNS]), flavor="hive")
+
+
+# ---------------------------------------------------------------------------
+# Write
+# ---------------------------------------------------------------------------
+def write_batch(df: pd.DataFrame, lake_dir: str = LAKE_DIR) -> List[str]:
+    """Append one mapped batch to the lake; returns the Parquet files written."""
+    import pyarrow.dataset as ds
+
+    if df is None or df.empty:
+        return []
+    # the dataset writer is slow on interleaved partitions – group them first
+    table = conform(df).sort_by([(c, "ascending") for c in PARTITION_COLUMNS])
+    written = []
+    ds.write_dataset(
+        table,
+        lake_dir,
+        format="parquet",
+        partitioning=_partitioning(table.schema),
+        basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=LAKE_COMPRESSION),
+        file_visitor=lambda f: written.append(f.path),
+    )
+    return written
+
+
+def drop_projects(df: pd.DataFrame, lake_dir: str = LAKE_DIR) -> int:
+    """
+    Remove the stored rows with a (source, project_id) of *df* – the versions
+    a delta batch replaces. Only the files of those sources are read; a file
+    that changes is rewritten atomically. Returns the number of rows removed.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    if df is None or df.empty or not os.path.isdir(lake_dir) or "project_id" not in df.columns:
+        return 0
+    removed = 0
+    data = dataset(lake_dir)
+    keys = df[["source", "project_id"]].dropna().astype(str).drop_duplicates()
+    for source, ids in keys.groupby("source")["project_id"]:
+        id_set = pa.array(sorted(ids), pa.string())
+        for fragment in data.get_fragments(filter=ds.field("source") == source):
+            table = pq.read_table(fragment.path)
+            stale = pc.is_in(table.column("project_id").cast(pa.string()), value_set=id_set)
+            n_stale = pc.sum(stale).as_py() or 0
+            if not n_stale:
+                continue
+            kept = table.filter(pc.invert(stale))
+            if kept.num_rows == 0:
+                os.remove(fragment.path)
+            else:
+                tmp = f"{fragment.path}.tmp"
+                pq.write_table(kept, tmp, compression=LAKE_COMPRESSION)
+                os.replace(tmp, fragment.path)
+            removed += n_stale
+    return removed
+
+
+def land(df: pd.DataFrame, logger=None, replace: bool = False) -> None:
+    """
+    ingest_data() hook: write the batch, never fail the ingest because of the
+    lake. With *replace* (delta batches) the stored versions of its projects
+    are dropped first.
+    """
+    if not LAKE_ENABLED:
+        _forget_backfill(LAKE_DIR)
+        return
+    try:
+        if replace:
+            removed = drop_projects(df)
+            if removed and logger:
+                logger.info(f"🗄️ Dropped {removed} superseded rows from {LAKE_DIR}")
+        files = write_batch(df)
+        if logger:
+            logger.info(f"🗄️ Landed {len(df)} rows in {len(files)} Parquet file(s) under {LAKE_DIR}")
+    except Exception as e:
+        _forget_backfill(LAKE_DIR)
+        if logger:
+            logger.warning(f"⚠️ Could not write batch to the lake: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Backfill: the lake as a complete copy of project_data
+# ---------------------------------------------------------------------------
+def is_backfilled(lake_dir: str = LAKE_DIR) -> bool:
+    """Whether the lake holds every project_data row (backfilled, nothing missed since)."""
+    return os.path.exists(os.path.join(lake_dir, BACKFILL_MARKER))
+
+
+def _forget_backfill(lake_dir: str) -> None:
+    try:
+        os.remove(os.path.join(lake_dir, BACKFILL_MARKER))
+    except FileNotFoundError:
+        pass
+
+
+def backfill(engine, lake_dir: str = LAKE_DIR) -> int:
+    """
+    Replace the lake with the current contents of project_data and mark it
+    complete. The export is written next to *lake_dir* and swapped in at the
+    end, so a failed export leaves the lake as it was; batches landed while
+    it runs are lost from the lake, so run it between scrapes. Returns the
+    number of rows exported.
+    """
+    from sqlalchemy import text
+
+    from config import TABLE_NAME
+
+    staging = f"{lake_dir.rstrip(os.sep)}.backfill"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    rows = 0
+    try:
+        with engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql_query(text(f"SELECT * FROM {TABLE_NAME}"), conn, chunksize=REBUILD_BATCH_ROWS):
+                write_batch(chunk, staging)
+                rows += len(chunk)
+        open(os.path.join(staging, BACKFILL_MARKER), "w").close()
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    previous = f"{lake_dir.rstrip(os.sep)}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.isdir(lake_dir):
+        os.replace(lake_dir, previous)
+    os.replace(staging, lake_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Read / replay
+# ---------------------------------------------------------------------------
+def dataset(lake_dir: str = LAKE_DIR):
+    import pyarrow.dataset as ds
+
+    schema = get_schema()
+    return ds.dataset(lake_dir, format="parquet", schema=schema, partitioning=_partitioning(schema))
+
+
+def _source_filter(sources: Optional[List[str]]):
+    import pyarrow.dataset as ds
+
+    return ds.field("source").isin(sources) if sources else None
+
+
+def scan(lake_dir: str = LAKE_DIR, sources: Optional[List[str]] = None,
+         batch_rows: int = REBUILD_BATCH_ROWS) -> Iterator:
+    """Record batches from the lake, optionally restricted to some sources."""
+    if not os.path.isdir(lake_dir):
+        return iter(())
+    return dataset(lake_dir).to_batches(filter=_source_filter(sources), batch_size=batch_rows)
+
+
+def read_lake(lake_dir: str = LAKE_DIR, sources: Optional[List[str]] = None) -> pd.DataFrame:
+    if not os.path.isdir(lake_dir):
+        return get_schema().empty_table().to_pandas()
+    return dataset(lake_dir).to_table(filter=_source_filter(sources)).to_pandas()
+
+
+def _copy_batch(cursor, table_name: str, batch) -> None:
+    """COPY one Arrow record batch into *table_name* (CSV over STDIN)."""
+    import pyarrow.csv as pacsv
+
+    buf = io.BytesIO()
+    pacsv.write_csv(batch, buf)
+    buf.seek(0)
+    cols = ", ".join(batch.schema.names)
+    cursor.copy_expert(f"COPY {table_name} ({cols}) FROM STDIN WITH (FORMAT csv, HEADER true)", buf)
+
+
+def rebuild_project_data(engine, lake_dir: str = LAKE_DIR, sources: Optional[List[str]] = None,
+                         truncate: bool = False, allow_data_loss: bool = False) -> int:
+    """
+    Load the lake into project_data in bulk. With *truncate* the table is
+    emptied first (or only the rows of *sources*, when given), all in one
+    transaction. Returns the number of rows loaded. *truncate* raises
+    LakeIncomplete unless the lake is backfilled or *allow_data_loss* is set.
+
+    Batches are COPYed into a staging table and split set-wise into
+    project_facts / project_details (vertical_split.py), not row by row
+    through the project_data view. A full replace (*truncate*, no *sources*)
+    fills shadow year partitions and swaps them in just before the commit
+    (partitions.py); otherwise the year partitions are created up front.
+    """
+    from migrations import analyze_after_load
+    from rollups import refresh_rollups
+    from data_versions import bump_data_versions
+    from partitions import (
+        LIVE_PARTITIONS_SQL, PARTITION_LOCK_SQL, SHADOW_TABLE, ensure_partitions, shadow_statements,
+        swap_statements,
+    )
+    from vertical_split import (
+        DELETE_SOURCES_SQL, FACTS_TABLE, STAGE_TABLE, create_stage_sql, flush_stage_sql,
+    )
+
+    if truncate and not allow_data_loss and not is_backfilled(lake_dir):
+        raise LakeIncomplete(
+            f"{lake_dir} only holds batches landed since it was introduced; replacing project_data from it "
+            f"would drop every older row. Run `python lake.py backfill` first (or pass --allow-data-loss)."
+        )
+    swap = truncate and not sources
+    lake_years = years(lake_dir, sources)
+    if not swap:
+        ensure_partitions(engine, lake_years)
+
+    rows = 0
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            if swap:
+                for statement in shadow_statements(lake_years):
+                    cur.execute(statement)
+            elif truncate:
+                for statement in DELETE_SOURCES_SQL:
+                    cur.execute(statement, (list(sources),))
+            for statement in create_stage_sql():
+                cur.execute(statement)
+            flush = flush_stage_sql(SHADOW_TABLE if swap else FACTS_TABLE)
+            for batch in scan(lake_dir, sources):
+                _copy_batch(cur, STAGE_TABLE, batch)
+                for statement in flush:
+                    cur.execute(statement)
+                rows += batch.num_rows
+            if swap:
+                cur.execute(PARTITION_LOCK_SQL)
+                cur.execute(LIVE_PARTITIONS_SQL)
+                live = [row[0] for row in cur.fetchall()]
+                for statement in swap_statements(live, lake_years):
+                    cur.execute(statement)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    analyze_after_load(engine, rows)
+    refresh_rollups(engine)
+    bump_data_versions(engine)
+    return rows
+
+
+def stats(lake_dir: str = LAKE_DIR) -> Dict[str, int]:
+    """Row count per source."""
+    if not os.path.isdir(lake_dir):
+        return {}
+    counts = dataset(lake_dir).to_table(columns=["source"]).column("source").value_counts()
+    return {str(c["values"]): int(c["counts"]) for c in counts.to_pylist()}
+
+
+def years(lake_dir: str = LAKE_DIR, sources: Optional[List[str]] = None) -> List[int]:
+    """Distinct non-null year_active values (read from the partition paths)."""
+    if not os.path.isdir(lake_dir):
+        return []
+    column = dataset(lake_dir).to_table(columns=["year_active"], filter=_source_filter(sources)).column("year_active")
+    return sorted(y for y in column.unique().to_pylist() if y is not None)
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Parquet landing zone for project_data")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="load the lake into project_data")
+    rebuild.add_argument("--source", action="append", help="only this source (repeatable)")
+    rebuild.add_argument("--truncate", action="store_true", help="replace instead of append")
+    rebuild.add_argument("--allow-data-loss", action="store_true",
+                         help="replace even if the lake was never backfilled: rows it does not hold are lost")
+    rebuild.add_argument("--lake-dir", default=LAKE_DIR)
+    fill = sub.add_parser("backfill", help="replace the lake with the current project_data")
+    fill.add_argument("--lake-dir", default=LAKE_DIR)
+    stat = sub.add_parser("stats", help="rows per source")
+    stat.add_argument("--lake-dir", default=LAKE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for source, n in sorted(stats(args.lake_dir).items()):
+            print(f"{n:>10,}  {source}")
+        print(f"backfilled: {'yes' if is_backfilled(args.lake_dir) else 'no'}")
+        return
+
+    from db_setup_and_ingest_org import init_database
+
+    if args.command == "backfill":
+        n = backfill(init_database(), args.lake_dir)
+        print(f"🗄️ Exported {n:,} rows of project_data to {args.lake_dir}")
+        return
+
+    try:
+        n = rebuild_project_data(init_database(), args.lake_dir, args.source, args.truncate, args.allow_data_loss)
+    except LakeIncomplete as e:
+        parser.error(str(e))
+    print(f"📦 Loaded {n:,} rows from {args.lake_dir}")
+
+
+if __name__ == "__main__":
+    _main()
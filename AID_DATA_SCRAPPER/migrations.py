@@ -0,0 +1,143 @@
+# --- migrations.py ---
+"""
+Versioned, idempotent schema migrations for project_data.
+
+init_database() calls apply_migrations() right after _ensure_text_columns();
+every migration runs once, in order, and is recorded in schema_migrations.
+Append new migrations to MIGRATIONS – never edit or reorder applied ones.
+Statements may also be a callable returning them, for SQL built from the
+project_data DDL (which lives in db_setup_and_ingest_org).
+
+Indexes follow the predicates of apis/main.py:
+    year_active BETWEEN … / = …          → (year_active, country)
+    country = … [AND year_active = …]    → (country, year_active)
+    GROUP BY donor                       → (donor)
+    search_mode=fulltext                 → GIN (search_tsv)
+    cursor pagination                    → keyset expression index (see KEYSET_ORDER)
+    summary endpoints                    → rollup tables (rollups.py)
+
+Since 007 project_data is a view over project_facts (hot) + project_details
+(cold); the indexes above live on whichever table holds their columns.
+Since 008 project_facts is partitioned by year_active (partitions.py).
+Since 009 rows rejected by the schema contract land in project_data_quarantine
+(schema_contract.py).
+Since 010 a failed rollup refresh is recorded in rollup_state (rollups.py).
+"""
+
+import logging
+import os
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy import text
+
+from config import TABLE_NAME
+from data_versions import CREATE_DATA_VERSIONS_SQL
+from partitions import partition_statements
+from rollups import CREATE_ROLLUP_STATE_SQL, CREATE_ROLLUP_TABLES_SQL, FULL_REFRESH_SQL
+from schema_contract import CREATE_QUARANTINE_TABLE_SQL
+from vertical_split import DETAILS_TABLE, FACTS_TABLE, split_statements
+
+logger = logging.getLogger("ingestion")
+
+MIGRATIONS_TABLE = "schema_migrations"
+ANALYZE_MIN_ROWS = int(os.getenv("ANALYZE_MIN_ROWS", "5000"))   # bulk load ⇒ refresh planner stats
+SEARCH_CONFIG    = "english"                                      # text-search configuration of search_tsv
+
+# Sort key of cursor pagination in apis/main.py: newest year first, then country,
+# project_id and the surrogate id as tie-breaker. All ascending, so a page is a
+# single row-value comparison that walks one index.
+KEYSET_ORDER = "-COALESCE(year_active, 0), COALESCE(country, ''), COALESCE(project_id, ''), id"
+
+# (version, description, statements)
+MIGRATIONS: List[Tuple[int, str, Union[List[str], Callable[[], List[str]]]]] = [
+    (1, "surrogate primary key", [
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS id BIGSERIAL",
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conrelid = '{TABLE_NAME}'::regclass AND contype = 'p'
+            ) THEN
+                ALTER TABLE {TABLE_NAME} ADD CONSTRAINT {TABLE_NAME}_pkey PRIMARY KEY (id);
+            END IF;
+        END $$;
+        """,
+    ]),
+    (2, "composite indexes for the query API", [
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE_NAME}_year_country ON {TABLE_NAME} (year_active, country)",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE_NAME}_country_year ON {TABLE_NAME} (country, year_active)",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE_NAME}_donor ON {TABLE_NAME} (donor)",
+        f"ANALYZE {TABLE_NAME}",
+    ]),
+    (3, "full-text search column + GIN index", [
+        # generated ⇒ Postgres keeps it current on every INSERT / UPDATE, ingest needs no changes
+        f"""
+        ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS search_tsv tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_title, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_description, '')), 'B')
+        ) STORED
+        """,
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE_NAME}_search ON {TABLE_NAME} USING GIN (search_tsv)",
+    ]),
+    (4, "keyset pagination index", [
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE_NAME}_keyset ON {TABLE_NAME} "
+        f"((-COALESCE(year_active, 0)), (COALESCE(country, '')), (COALESCE(project_id, '')), id)",
+    ]),
+    (5, "rollup tables for the summary endpoints", CREATE_ROLLUP_TABLES_SQL + FULL_REFRESH_SQL),
+    (6, "data-version counters for API cache invalidation", [CREATE_DATA_VERSIONS_SQL]),
+    (7, "vertical split into project_facts + project_details", split_statements),
+    (8, "partition project_facts by year_active", partition_statements),
+    (9, "quarantine table for rows rejected by the schema contract", [CREATE_QUARANTINE_TABLE_SQL]),
+    (10, "staleness marker for the rollup tables", [CREATE_ROLLUP_STATE_SQL]),
+]
+
+CREATE_MIGRATIONS_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+    version      INTEGER PRIMARY KEY,
+    description  TEXT NOT NULL,
+    applied_at   TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+);
+"""
+
+
+def applied_versions(engine) -> set:
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_MIGRATIONS_TABLE_SQL))
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+
+def apply_migrations(engine) -> List[int]:
+    """Run every pending migration (each in its own transaction); returns the versions applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            # one migrator at a time, even with several ingest workers starting together
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": MIGRATIONS_TABLE})
+            if conn.execute(text(f"SELECT 1 FROM {MIGRATIONS_TABLE} WHERE version = :v"), {"v": version}).first():
+                continue
+            for statement in (statements() if callable(statements) else statements):
+                conn.execute(text(statement))
+            conn.execute(
+                text(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (:v, :d)"),
+                {"v": version, "d": description},
+            )
+        logger.info(f"✅ Migration {version:03d} applied: {description}")
+        applied.append(version)
+    if not applied:
+        logger.info("ℹ️ Schema up to date – no migration needed.")
+    return applied
+
+
+def analyze_after_load(engine, rows: int) -> None:
+    """Refresh planner statistics after a bulk load so the new rows hit the indexes."""
+    if rows < ANALYZE_MIN_ROWS:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {FACTS_TABLE}"))
+        conn.execute(text(f"ANALYZE {DETAILS_TABLE}"))
+    logger.info(f"📊 ANALYZE {FACTS_TABLE}, {DETAILS_TABLE} after loading {rows} rows")
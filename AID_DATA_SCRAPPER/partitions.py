@@ -0,0 +1,208 @@
+# --- partitions.py ---
+"""
+Declarative partitioning of project_facts by year_active (migration 008).
+
+    project_facts              PARTITION BY RANGE (year_active)
+        project_facts_y1990    FOR VALUES FROM (1990) TO (1991)
+        …
+        project_facts_default  NULL and implausible years
+
+`year_active BETWEEN :start_year AND :end_year` / `= :year` only scan the
+matching partitions; every partition carries the indexes of FACTS_INDEX_SQL.
+
+Partitions are created on demand by the project_facts_partition(year) SQL
+function: ingest_data() and lake.rebuild_project_data() call it for the years
+of a batch before writing. A row written any other way for a year without a
+partition lands in project_facts_default and is moved out when that year's
+partition is created.
+
+A full lake rebuild (`--truncate`, no sources) loads into shadow partitions
+and swaps them in at the end (swap_statements), so the API keeps reading the
+old rows until the commit instead of queueing behind a TRUNCATE.
+
+One level (year), not source → year: with ~8 sources that is ~300 small
+partitions, and every query that cannot prune (country filters, keyset
+pages) pays for planning all of them.
+"""
+
+import logging
+from typing import Iterable, List, Set
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import TABLE_NAME
+from vertical_split import DETAILS_TABLE, FACTS_TABLE
+
+logger = logging.getLogger("ingestion")
+
+DEFAULT_PARTITION = f"{FACTS_TABLE}_default"
+SHADOW_TABLE = f"{FACTS_TABLE}_swap"
+PARTITION_FUNCTION = f"{FACTS_TABLE}_partition"
+MIN_PARTITION_YEAR = 1900          # years outside stay in the default partition
+MAX_PARTITION_YEAR = 2100
+
+
+def partition_name(year: int, parent: str = FACTS_TABLE) -> str:
+    return f"{parent}_y{year}"
+
+
+def _bounds(year: int) -> str:
+    return f"FOR VALUES FROM ({year}) TO ({year + 1})"
+
+
+# serialises partition creation (the function below) with swaps
+PARTITION_LOCK_SQL = f"SELECT pg_advisory_xact_lock(hashtext('{PARTITION_FUNCTION}'))"
+
+PARTITION_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION {PARTITION_FUNCTION}(p_year INTEGER) RETURNS TEXT LANGUAGE plpgsql AS $$
+DECLARE
+    leaf TEXT := '{FACTS_TABLE}_y' || p_year;
+BEGIN
+    IF p_year IS NULL OR p_year NOT BETWEEN {MIN_PARTITION_YEAR} AND {MAX_PARTITION_YEAR} THEN
+        RETURN '{DEFAULT_PARTITION}';
+    END IF;
+    IF to_regclass(leaf) IS NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext('{PARTITION_FUNCTION}'));   -- = PARTITION_LOCK_SQL
+        IF to_regclass(leaf) IS NULL THEN
+            -- rows of this year written before the partition existed sit in the default one
+            CREATE TEMP TABLE IF NOT EXISTS {FACTS_TABLE}_moved (LIKE {FACTS_TABLE}) ON COMMIT DROP;
+            WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE year_active = p_year RETURNING *)
+            INSERT INTO {FACTS_TABLE}_moved SELECT * FROM moved;
+            EXECUTE format('CREATE TABLE %I PARTITION OF {FACTS_TABLE} FOR VALUES FROM (%s) TO (%s)',
+                           leaf, p_year, p_year + 1);
+            INSERT INTO {FACTS_TABLE} SELECT * FROM {FACTS_TABLE}_moved;
+            TRUNCATE {FACTS_TABLE}_moved;
+        END IF;
+    END IF;
+    RETURN leaf;
+END $$
+"""
+
+
+def partition_statements() -> List[str]:
+    """Migration 008: project_facts → the same table partitioned by year_active."""
+    from vertical_split import DETAILS_COPIES, FACTS_ID_SEQUENCE, FACTS_INDEX_SQL, split_columns, view_statements
+
+    old = f"{FACTS_TABLE}_unpartitioned"
+    copies = [c for c in split_columns()[0] if c[0] in DETAILS_COPIES]
+    names = ", ".join(name for name, _ in copies)
+    return [
+        f"DROP VIEW {TABLE_NAME}",                  # bound to the old table, re-created below
+        # a foreign key needs a unique index on id alone, which a partitioned table cannot have
+        f"ALTER TABLE {DETAILS_TABLE} DROP CONSTRAINT IF EXISTS {DETAILS_TABLE}_id_fkey",
+        # full-text search reads project_details alone instead of probing every partition by id
+        *(f"ALTER TABLE {DETAILS_TABLE} ADD COLUMN IF NOT EXISTS {name} {sql_type}" for name, sql_type in copies),
+        f"UPDATE {DETAILS_TABLE} d SET ({names}) = ({', '.join('f.' + name for name, _ in copies)}) "
+        f"FROM {FACTS_TABLE} f WHERE f.id = d.id",
+        f"ALTER TABLE {FACTS_TABLE} RENAME TO {old}",
+        f"ALTER SEQUENCE {FACTS_ID_SEQUENCE} OWNED BY NONE",
+        f"CREATE TABLE {FACTS_TABLE} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (year_active)",
+        f"ALTER SEQUENCE {FACTS_ID_SEQUENCE} OWNED BY {FACTS_TABLE}.id",
+        f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {FACTS_TABLE} DEFAULT",
+        PARTITION_FUNCTION_SQL,
+        f"SELECT {PARTITION_FUNCTION}(year_active) FROM (SELECT DISTINCT year_active FROM {old}) years",
+        f"INSERT INTO {FACTS_TABLE} SELECT * FROM {old}",
+        f"DROP TABLE {old}",
+        *FACTS_INDEX_SQL,
+        f"CREATE INDEX ix_{FACTS_TABLE}_id ON {FACTS_TABLE} (id)",
+        *view_statements(),
+        f"ANALYZE {FACTS_TABLE}",
+        f"ANALYZE {DETAILS_TABLE}",
+    ]
+
+
+def partition_years(df: pd.DataFrame) -> Set[int]:
+    """Distinct non-null year_active values of a batch, as Postgres will store them."""
+    if df is None or df.empty or "year_active" not in df.columns:
+        return set()
+    years = pd.to_numeric(df["year_active"], errors="coerce").dropna()
+    return {int(round(y)) for y in years.unique()}
+
+
+def ensure_partitions(engine, years: Iterable[int]) -> None:
+    """Create the missing partitions for *years* in a short transaction of its own."""
+    years = sorted(set(years))
+    if not years:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"SELECT {PARTITION_FUNCTION}(y) FROM unnest(CAST(:years AS INTEGER[])) AS y"),
+            {"years": years},
+        )
+
+
+# ---------------------------------------------------------------------------
+# Full rebuild: load into shadow partitions, swap them in at the end
+# ---------------------------------------------------------------------------
+def shadow_statements(years: Iterable[int]) -> List[str]:
+    """A partitioned copy of project_facts with one partition per year (plus default)."""
+    statements = [
+        f"DROP TABLE IF EXISTS {SHADOW_TABLE}",
+        f"CREATE TABLE {SHADOW_TABLE} (LIKE {FACTS_TABLE} INCLUDING DEFAULTS INCLUDING INDEXES) "
+        f"PARTITION BY RANGE (year_active)",
+        f"CREATE TABLE {SHADOW_TABLE}_default PARTITION OF {SHADOW_TABLE} DEFAULT",
+    ]
+    for year in sorted(set(years)):
+        if not MIN_PARTITION_YEAR <= year <= MAX_PARTITION_YEAR:
+            continue
+        leaf = partition_name(year, SHADOW_TABLE)
+        statements += [
+            f"CREATE TABLE {leaf} PARTITION OF {SHADOW_TABLE} {_bounds(year)}",
+            # implies the partition bound, so ATTACH below need not scan the rows
+            f"ALTER TABLE {leaf} ADD CONSTRAINT {leaf}_bound "
+            f"CHECK (year_active IS NOT NULL AND year_active >= {year} AND year_active < {year + 1})",
+        ]
+    return statements
+
+
+def _rename_indexes_sql(table: str, old_prefix: str) -> str:
+    """Give *table*'s indexes the names Postgres would have chosen for *table* itself."""
+    return f"""
+    DO $$
+    DECLARE idx regclass;
+    BEGIN
+        FOR idx IN SELECT indexrelid::regclass FROM pg_index WHERE indrelid = '{table}'::regclass LOOP
+            EXECUTE format('ALTER INDEX %s RENAME TO %I', idx, replace(idx::text, '{old_prefix}', '{table}'));
+        END LOOP;
+    END $$
+    """
+
+
+def swap_statements(live: List[str], years: Iterable[int]) -> List[str]:
+    """
+    Replace the partitions in *live* (project_facts' current ones, see
+    LIVE_PARTITIONS_SQL) by the shadow ones, and drop the details of the
+    replaced rows. Run under PARTITION_LOCK_SQL, in the loading transaction;
+    the exclusive lock on project_facts is held from the first DETACH to the
+    commit, i.e. only for these catalog changes.
+    """
+    statements = [f"DELETE FROM {DETAILS_TABLE} WHERE id IN (SELECT id FROM {FACTS_TABLE})"]
+    statements += [f"ALTER TABLE {FACTS_TABLE} DETACH PARTITION {name}" for name in live]
+    statements += [f"DROP TABLE {name}" for name in live]
+    for year in sorted(set(years)):
+        if not MIN_PARTITION_YEAR <= year <= MAX_PARTITION_YEAR:
+            continue
+        leaf, shadow = partition_name(year), partition_name(year, SHADOW_TABLE)
+        statements += [
+            f"ALTER TABLE {SHADOW_TABLE} DETACH PARTITION {shadow}",
+            f"ALTER TABLE {shadow} RENAME TO {leaf}",
+            _rename_indexes_sql(leaf, shadow),
+            f"ALTER TABLE {FACTS_TABLE} ATTACH PARTITION {leaf} {_bounds(year)}",
+            f"ALTER TABLE {leaf} DROP CONSTRAINT {shadow}_bound",
+        ]
+    # last: attaching the default checks its rows against every other partition once
+    statements += [
+        f"ALTER TABLE {SHADOW_TABLE} DETACH PARTITION {SHADOW_TABLE}_default",
+        f"ALTER TABLE {SHADOW_TABLE}_default RENAME TO {DEFAULT_PARTITION}",
+        _rename_indexes_sql(DEFAULT_PARTITION, f"{SHADOW_TABLE}_default"),
+        f"ALTER TABLE {FACTS_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT",
+        f"DROP TABLE {SHADOW_TABLE}",
+    ]
+    return statements
+
+
+LIVE_PARTITIONS_SQL = f"""
+SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = '{FACTS_TABLE}'::regclass
+"""
@@ -0,0 +1,403 @@
+# --- replay.py ---
+"""
+Record / replay of the scrapers' network traffic, so a source runs offline.
+
+    AID_FIXTURE_DIR/<host>/<key>.json   status + headers of one response
+    AID_FIXTURE_DIR/<host>/<key>.body   its body
+
+The key hashes method, host, path, the sorted query and the request body
+(request_key); the scheme is not part of it.
+
+record   `requests` calls go out as usual and every response is stored;
+         Chrome is started with performance logging, and on every get() /
+         quit() the responses it received since (documents, XHR, downloads)
+         are pulled over CDP and stored.
+replay   `requests` calls are answered from the store (ReplayMiss, a
+         requests.ConnectionError, when a response was not recorded). Chrome
+         resolves every host to a local stub server that answers from the
+         same store over plain HTTP; https:// links in served pages are
+         rewritten to http:// so navigation stays on the stub. time.sleep is
+         capped at MAX_SLEEP and the skipped seconds are counted.
+
+    python replay.py record fcdo --filters '{"country": "Nigeria", "sector": "Health"}'
+    python replay.py run fcdo --filters '{…}' --repeat 3 [--no-ingest]
+
+`run` reports wall time, the stage spans (telemetry.py) and the replay
+counters, i.e. what a scraper costs without the network: sleeps, DOM
+polling, file handling. Chrome itself still runs; driver downloads
+(webdriver-manager) and the chromedriver connection are never recorded.
+
+Pages that build URLs from the clock or random ids miss in replay; the
+misses are counted and logged with their URL.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+logger = logging.getLogger("ingestion")
+
+MODE = os.getenv("AID_REPLAY", "")                      # "record" | "replay" | ""
+FIXTURE_DIR = os.getenv("AID_FIXTURE_DIR", "fixtures")
+MAX_SLEEP = float(os.getenv("AID_REPLAY_MAX_SLEEP", "0.05"))
+# chromedriver downloads + local services; extend with AID_REPLAY_PASSTHROUGH=host,host
+PASSTHROUGH_HOSTS = {"localhost", "127.0.0.1", "googlechromelabs.github.io", "storage.googleapis.com",
+                     *filter(None, os.getenv("AID_REPLAY_PASSTHROUGH", "").split(","))}
+
+# text bodies whose absolute https:// links are rewritten when served to Chrome
+TEXT_TYPES = ("text/", "json", "javascript", "xml")
+# headers that no longer hold for a stored, decoded body served over HTTP
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection",
+                   "strict-transport-security", "content-security-policy", "alt-svc"}
+
+STATS: Counter = Counter()      # hits, misses, recorded, bytes_served, sleeps, sleep_skipped_s
+_lock = threading.Lock()
+_originals: Dict[str, object] = {}
+_patched: List[Tuple[object, str, object]] = []        # (owner, attribute, original or _ABSENT)
+_ABSENT = object()
+_real_sleep = time.sleep
+_server: Optional[ThreadingHTTPServer] = None
+
+
+class ReplayMiss(requests.ConnectionError):
+    """A request that was not recorded; scrapers treat it like a network failure."""
+
+
+# ---------------------------------------------------------------------------
+# Fixture store
+# ---------------------------------------------------------------------------
+def request_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    digest = hashlib.sha1(f"{method.upper()} {parts.hostname}{parts.path or '/'}?{query}".encode())
+    if body:
+        digest.update(body if isinstance(body, bytes) else str(body).encode())
+    return digest.hexdigest()[:24]
+
+
+def _path(url: str, key: str) -> str:
+    return os.path.join(FIXTURE_DIR, urlsplit(url).hostname or "_", key)
+
+
+def save(method: str, url: str, status: int, headers: Dict[str, str], body: bytes,
+         request_body: Optional[bytes] = None) -> None:
+    path = _path(url, request_key(method, url, request_body))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".body", "wb") as f:
+        f.write(body)
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump({"method": method.upper(), "url": url, "status": status, "headers": dict(headers)}, f, indent=1)
+    with _lock:
+        STATS["recorded"] += 1
+
+
+def load(method: str, url: str, request_body: Optional[bytes] = None) -> Optional[Tuple[dict, bytes]]:
+    """(meta, body) of the recorded response, or None (counted as a miss)."""
+    path = _path(url, request_key(method, url, request_body))
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(path + ".body", "rb") as f:
+            body = f.read()
+    except FileNotFoundError:
+        with _lock:
+            STATS["misses"] += 1
+        logger.warning(f"📼 Not recorded: {method} {url}")
+        return None
+    with _lock:
+        STATS["hits"] += 1
+    return meta, body
+
+
+# ---------------------------------------------------------------------------
+# requests
+# ---------------------------------------------------------------------------
+def _send(session, request, **kwargs):
+    if urlsplit(request.url).hostname in PASSTHROUGH_HOSTS:
+        return _originals["send"](session, request, **kwargs)
+    body = request.body.encode() if isinstance(request.body, str) else request.body
+    if MODE == "record":
+        response = _originals["send"](session, request, **kwargs)
+        save(request.method, request.url, response.status_code, response.headers, response.content, body)
+        return response
+    recorded = load(request.method, request.url, body)
+    if recorded is None:
+        raise ReplayMiss(f"not recorded: {request.method} {request.url}", request=request)
+    meta, content = recorded
+    response = requests.Response()
+    response.status_code = meta["status"]
+    response.headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+    response.headers.pop("content-encoding", None)                # stored decoded
+    response._content = content
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = "replayed"
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Chrome
+# ---------------------------------------------------------------------------
+def _options_init(options, *args, **kwargs):
+    _originals["__init__"](options, *args, **kwargs)
+    if MODE == "replay" and _server is not None:
+        port = _server.server_address[1]
+        options.add_argument(f"--host-resolver-rules=MAP * 127.0.0.1:{port}, EXCLUDE localhost")
+        options.add_argument("--disable-features=HttpsUpgrades,HttpsFirstBalancedModeAutoEnable")
+    elif MODE == "record":
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def _driver_get(driver, url: str):
+    if MODE == "replay" and url.startswith("https://"):
+        url = "http://" + url[len("https://"):]
+    _originals["get"](driver, url)
+    if MODE == "record":
+        _capture_quietly(driver)
+
+
+def _driver_quit(driver):
+    if MODE == "record":
+        _capture_quietly(driver)
+    _originals["quit"](driver)
+
+
+def _capture_quietly(driver) -> None:
+    try:
+        capture(driver)
+    except Exception as e:
+        logger.warning(f"📼 Could not capture the browser's responses: {e}")
+
+
+def capture(driver) -> int:
+    """Store the responses *driver* received since the last capture; returns how many."""
+    sent: Dict[str, dict] = {}
+    stored = 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        params = message.get("params", {})
+        if message.get("method") == "Network.requestWillBeSent":
+            redirect = params.get("redirectResponse")
+            previous = sent.get(params["requestId"])
+            if redirect and previous:
+                save(previous["method"], redirect["url"], redirect["status"], redirect.get("headers", {}), b"",
+                     previous.get("body"))
+            request = params["request"]
+            sent[params["requestId"]] = {"method": request["method"],
+                                         "body": (request.get("postData") or "").encode() or None}
+        elif message.get("method") == "Network.responseReceived":
+            response = params["response"]
+            if not response["url"].startswith("http") or urlsplit(response["url"]).hostname in PASSTHROUGH_HOSTS:
+                continue
+            request = sent.get(params["requestId"], {"method": "GET", "body": None})
+            body = _response_body(driver, params["requestId"], response["url"], request["method"])
+            if body is None:
+                continue
+            save(request["method"], response["url"], response["status"], response.get("headers", {}), body,
+                 request["body"])
+            stored += 1
+    return stored
+
+
+def _response_body(driver, request_id: str, url: str, method: str) -> Optional[bytes]:
+    import base64
+
+    try:
+        result = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        return base64.b64decode(result["body"]) if result.get("base64Encoded") else result["body"].encode()
+    except Exception:
+        pass
+    if method != "GET":
+        logger.warning(f"📼 Body no longer available, not recorded: {method} {url}")
+        return None
+    # downloads never reach the renderer: fetch them again with the browser's cookies
+    cookies = {c["name"]: c["value"] for c in driver.get_cookies()}
+    return _originals["send"](requests.Session(), requests.Request("GET", url, cookies=cookies).prepare()).content
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers Chrome from the fixture store; the Host header picks the site."""
+
+    def _serve(self, with_body: bool = True):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        url = f"https://{self.headers.get('Host', '')}{self.path}"
+        recorded = load("GET" if self.command == "HEAD" else self.command, url, body)
+        if recorded is None:
+            self.send_error(404, "not recorded")
+            return
+        meta, content = recorded
+        headers = {k: v for k, v in meta["headers"].items() if k.lower() not in DROPPED_HEADERS}
+        content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+        if any(t in content_type for t in TEXT_TYPES):
+            content = content.replace(b"https://", b"http://")
+        for name in ("location", "Location"):
+            if name in headers:
+                headers[name] = headers[name].replace("https://", "http://", 1)
+        self.send_response(meta["status"])
+        for name, value in headers.items():
+            for line in str(value).split("\n"):           # CDP joins repeated headers with \n
+                self.send_header(name, line)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(content)
+            with _lock:
+                STATS["bytes_served"] += len(content)
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        self._serve()
+
+    def do_HEAD(self):
+        self._serve(with_body=False)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub server for Chrome on a background thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _StubHandler)
+    threading.Thread(target=server.serve_forever, name="replay-stub", daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Sleeps
+# ---------------------------------------------------------------------------
+def _sleep(seconds: float) -> None:
+    """time.sleep capped at MAX_SLEEP in replay: fixed waits for a live site are pure overhead offline."""
+    with _lock:
+        STATS["sleeps"] += 1
+        STATS["sleep_skipped_s"] += max(0.0, seconds - MAX_SLEEP)
+    _real_sleep(min(seconds, MAX_SLEEP))
+
+
+# ---------------------------------------------------------------------------
+# Install / uninstall
+# ---------------------------------------------------------------------------
+def _patch(owner, name: str, replacement) -> None:
+    _originals[name] = getattr(owner, name)
+    _patched.append((owner, name, owner.__dict__.get(name, _ABSENT)))
+    setattr(owner, name, replacement)
+
+
+def install(mode: Optional[str] = None, fixture_dir: Optional[str] = None,
+            passthrough: Optional[Iterable[str]] = None) -> None:
+    """Patch requests, Chrome and (in replay) time.sleep for *mode*; idempotent."""
+    global MODE, FIXTURE_DIR, PASSTHROUGH_HOSTS, _server
+    from selenium.webdriver.chromium.options import ChromiumOptions
+    from selenium.webdriver.chromium.webdriver import ChromiumDriver
+
+    uninstall()
+    MODE = mode or MODE
+    FIXTURE_DIR = fixture_dir or FIXTURE_DIR
+    if passthrough is not None:
+        PASSTHROUGH_HOSTS = set(passthrough)
+    if MODE not in ("record", "replay"):
+        raise ValueError(f"AID_REPLAY must be 'record' or 'replay', not {MODE!r}")
+
+    _patch(requests.Session, "send", _send)
+    _patch(ChromiumOptions, "__init__", _options_init)     # uc.ChromeOptions too: flags must precede launch
+    _patch(ChromiumDriver, "get", _driver_get)
+    _patch(ChromiumDriver, "quit", _driver_quit)
+    if MODE == "replay":
+        _server = serve()
+        _patch(time, "sleep", _sleep)
+    logger.info(f"📼 Replay layer installed: {MODE} ({os.path.abspath(FIXTURE_DIR)})")
+
+
+def uninstall() -> None:
+    global _server
+    while _patched:
+        owner, name, original = _patched.pop()
+        if original is _ABSENT:
+            delattr(owner, name)                    # inherited again
+        else:
+            setattr(owner, name, original)
+    _originals.clear()
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+
+# ---------------------------------------------------------------------------
+# CLI: record a source once, then replay it as a throughput benchmark
+# ---------------------------------------------------------------------------
+def _count_rows(df, since=None):
+    """--no-ingest stand-in for ingest_data(): the batch is counted, not written."""
+    from telemetry import span
+
+    with span("load", rows_in=len(df)):
+        pass
+
+
+def run_source(name: str, filters: dict, ingest: bool = True) -> float:
+    """Run source *name* once under the installed mode; returns wall seconds."""
+    import db_setup_and_ingest_org
+    from source_registry import get_source
+    from telemetry import span
+
+    plugin = get_source(name)
+    if plugin is None:
+        raise ValueError(f"unknown source: {name}")
+    real_ingest = db_setup_and_ingest_org.ingest_data
+    # every module that bound the name itself, not just the one defining it
+    patched = [m for m in list(sys.modules.values()) if getattr(m, "ingest_data", None) is real_ingest]
+    if not ingest:
+        for module in patched:
+            module.ingest_data = _count_rows
+    started = time.perf_counter()
+    try:
+        with span("source", source=name):
+            plugin.run(dict(filters))
+    finally:
+        for module in patched:
+            module.ingest_data = real_ingest
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    import telemetry
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("command", choices=("record", "run"))
+    p.add_argument("source")
+    p.add_argument("--filters", default="{}", help="payload filters as JSON")
+    p.add_argument("--fixtures", default=FIXTURE_DIR)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--no-ingest", action="store_true", help="count parsed rows instead of writing them")
+    a = p.parse_args()
+
+    install("record" if a.command == "record" else "replay", a.fixtures)
+    telemetry.TRACE_FILE = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    try:
+        for i in range(a.repeat if a.command == "run" else 1):
+            STATS.clear()
+            wall = run_source(a.source, json.loads(a.filters), ingest=not a.no_ingest)
+            print(f"\n{a.command} {i + 1}: {wall:.2f}s  " + "  ".join(f"{k}={v:g}" for k, v in sorted(STATS.items())))
+    finally:
+        uninstall()
+
+    print(f"\n{'stage':9} {'spans':>6} {'wall s':>9} {'cpu s':>9} {'rows in':>9} {'rows out':>9}")
+    for (_, stage), t in sorted(telemetry.summarise(telemetry.TRACE_FILE).items(), key=lambda kv: -kv[1]["wall_s"]):
+        print(f"{stage:9} {t['spans']:6.0f} {t['wall_s']:9.2f} {t['cpu_s']:9.2f} {t['rows_in']:9.0f} {t['rows_out']:9.0f}")
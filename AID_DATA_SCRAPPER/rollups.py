@@ -0,0 +1,178 @@
+# --- rollups.py ---
+"""
+Pre-aggregated summary tables for the dashboard endpoints in apis/main.py.
+
+    rollup_year_country        (year_active, country)        → project_count + one SUM per funding column
+    rollup_year_country_donor  (year_active, country, donor) → one SUM per funding column
+
+/summary/year-country reads the first directly, /funding/summary/by-group sums
+the second over donors – a few thousand rows instead of all of project_data.
+
+Both are created by migration 005 and kept current by ingest_data(): after each
+batch only the (year_active, country) keys that batch touched are recomputed
+from project_data, so the rollups stay exact without a full refresh.
+
+A refresh that fails leaves a row in rollup_state (migration 010). While one
+is there the API answers from project_data instead; the next full rebuild
+clears it.
+
+    python rollups.py          # full rebuild (e.g. after manual edits to project_data)
+"""
+
+import logging
+from typing import Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import TABLE_NAME
+
+logger = logging.getLogger("ingestion")
+
+ROLLUP_FUND_COLS = ("total_commitment_usd", "total_disbursed_usd", "funding_amount_usd")
+YEAR_COUNTRY_TABLE = "rollup_year_country"
+YEAR_COUNTRY_DONOR_TABLE = "rollup_year_country_donor"
+ROLLUP_STATE_TABLE = "rollup_state"
+KEYS_PER_STATEMENT = 500
+
+RollupKey = Tuple[Optional[int], Optional[str]]         # (year_active, country)
+
+_FUND_DDL = ",\n    ".join(f"{c} NUMERIC NOT NULL DEFAULT 0" for c in ROLLUP_FUND_COLS)
+_FUND_COLS = ", ".join(ROLLUP_FUND_COLS)
+_FUND_SUMS = ", ".join(f"SUM(COALESCE({c}, 0))" for c in ROLLUP_FUND_COLS)
+
+CREATE_ROLLUP_TABLES_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {YEAR_COUNTRY_TABLE} (
+        year_active    INTEGER,
+        country        TEXT,
+        project_count  BIGINT NOT NULL,
+        {_FUND_DDL}
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{YEAR_COUNTRY_TABLE}_key ON {YEAR_COUNTRY_TABLE} (year_active, country)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {YEAR_COUNTRY_DONOR_TABLE} (
+        year_active  INTEGER,
+        country      TEXT,
+        donor        TEXT,
+        {_FUND_DDL}
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{YEAR_COUNTRY_DONOR_TABLE}_key ON {YEAR_COUNTRY_DONOR_TABLE} (year_active, country)",
+    f"CREATE INDEX IF NOT EXISTS ix_{YEAR_COUNTRY_DONOR_TABLE}_country ON {YEAR_COUNTRY_DONOR_TABLE} (country, year_active)",
+]
+
+
+# one row per failed refresh; the rollups are exact only while the table is empty
+CREATE_ROLLUP_STATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (
+    stale_since  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    error        TEXT
+);
+"""
+
+MARK_STALE_SQL = f"INSERT INTO {ROLLUP_STATE_TABLE} (error) VALUES (:error)"
+
+
+def _insert_sql(where: str = "") -> List[str]:
+    where = f"WHERE {where}" if where else ""
+    return [
+        f"""
+        INSERT INTO {YEAR_COUNTRY_TABLE} (year_active, country, project_count, {_FUND_COLS})
+        SELECT year_active, country, COUNT(*), {_FUND_SUMS}
+        FROM {TABLE_NAME} {where}
+        GROUP BY year_active, country
+        """,
+        f"""
+        INSERT INTO {YEAR_COUNTRY_DONOR_TABLE} (year_active, country, donor, {_FUND_COLS})
+        SELECT year_active, country, donor, {_FUND_SUMS}
+        FROM {TABLE_NAME} {where}
+        GROUP BY year_active, country, donor
+        """,
+    ]
+
+
+FULL_REFRESH_SQL = [f"TRUNCATE {YEAR_COUNTRY_TABLE}, {YEAR_COUNTRY_DONOR_TABLE}"] + _insert_sql()
+
+
+def affected_keys(df: pd.DataFrame) -> Set[RollupKey]:
+    """Distinct (year_active, country) pairs of an ingested batch, as Postgres will store them."""
+    if df is None or df.empty:
+        return set()
+    years = pd.to_numeric(df["year_active"], errors="coerce") if "year_active" in df.columns \
+        else pd.Series(float("nan"), index=df.index)
+    countries = df["country"] if "country" in df.columns else pd.Series(None, index=df.index)
+    return {
+        (None if pd.isna(y) else int(round(y)), None if pd.isna(c) else str(c))
+        for y, c in zip(years, countries)
+    }
+
+
+def _key_predicate(keys: List[RollupKey], params: dict) -> str:
+    """OR of one indexable predicate per key (IS NULL for missing parts)."""
+    terms = []
+    for i, (year, country) in enumerate(keys):
+        parts = []
+        if year is None:
+            parts.append("year_active IS NULL")
+        else:
+            parts.append(f"year_active = :y{i}")
+            params[f"y{i}"] = year
+        if country is None:
+            parts.append("country IS NULL")
+        else:
+            parts.append(f"country = :c{i}")
+            params[f"c{i}"] = country
+        terms.append("(" + " AND ".join(parts) + ")")
+    return " OR ".join(terms)
+
+
+def refresh_rollups(engine, keys: Optional[Iterable[RollupKey]] = None) -> None:
+    """
+    Recompute the rollup rows of *keys* from project_data (all rows when
+    *keys* is None). Runs in one transaction, serialised across workers.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": YEAR_COUNTRY_TABLE})
+        if keys is None:
+            for statement in FULL_REFRESH_SQL:
+                conn.execute(text(statement))
+            conn.execute(text(f"DELETE FROM {ROLLUP_STATE_TABLE}"))
+            logger.info("📊 Rollups rebuilt from scratch")
+            return
+
+        keys = sorted(set(keys), key=lambda k: (k[0] is None, k[0] or 0, k[1] is None, k[1] or ""))
+        for start in range(0, len(keys), KEYS_PER_STATEMENT):
+            chunk, params = keys[start:start + KEYS_PER_STATEMENT], {}
+            where = _key_predicate(chunk, params)
+            for table in (YEAR_COUNTRY_TABLE, YEAR_COUNTRY_DONOR_TABLE):
+                conn.execute(text(f"DELETE FROM {table} WHERE {where}"), params)
+            for statement in _insert_sql(where):
+                conn.execute(text(statement), params)
+    if keys:
+        logger.info(f"📊 Rollups refreshed for {len(keys)} year/country key(s)")
+
+
+def mark_stale(engine, error: Exception) -> None:
+    """Record a failed refresh, so the API stops reading the rollups until a full rebuild."""
+    with engine.begin() as conn:
+        conn.execute(text(MARK_STALE_SQL), {"error": str(error)[:1000]})
+
+
+def refresh_after_ingest(engine, df: pd.DataFrame) -> None:
+    """
+    ingest_data() hook – a failed refresh marks the rollups stale instead of
+    failing the ingest; only if that cannot be recorded either does it raise.
+    """
+    try:
+        refresh_rollups(engine, affected_keys(df))
+    except Exception as e:
+        logger.error(f"❌ Rollup refresh failed, rollups marked stale (run `python rollups.py` to rebuild): {e}")
+        mark_stale(engine, e)
+
+
+if __name__ == "__main__":
+    from db_setup_and_ingest_org import init_database
+
+    refresh_rollups(init_database())
@@ -0,0 +1,251 @@
+# --- schema_contract.py ---
+"""
+Typed column contract for everything written to project_data.
+
+The parsers build their `mapped` frames by hand, so the same column arrives
+as str, float, Int64 or datetime depending on the source. ingest_data() runs
+every batch through enforce() first, which casts each column to the dtype
+given by CREATE_TABLE_SQL, one vectorised pass per column:
+
+    INTEGER    → Int32              BIGINT     → Int64
+    NUMERIC    → float64            DATE       → date32[pyarrow]
+    TIMESTAMP  → datetime64[us]     TEXT / CHARACTER VARYING → string
+
+The columns in LOW_CARDINALITY_COLUMNS (source, donor, country, sector,
+status …) repeat a handful of values over a whole batch: they are carried
+as categoricals with string categories instead, cast once per category,
+and stay dictionary-encoded in the lake (lake.py). The mappers encode them
+as soon as a frame is built (encode_categories).
+
+Blank strings become nulls. A row with a value that cannot be cast (or an
+INTEGER out of range) is not loaded: it goes to project_data_quarantine
+(migration 009) with the offending column names and its raw values, and the
+rest of the batch is ingested.
+
+NUMERIC is float64, as in the lake (lake.py), not Decimal: the API only sums
+and averages these columns.
+"""
+
+import json
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config import TABLE_NAME
+
+logger = logging.getLogger("ingestion")
+
+QUARANTINE_TABLE = f"{TABLE_NAME}_quarantine"
+
+INT32_MAX = 2 ** 31 - 1
+INT64_MAX = 2 ** 63 - 1
+
+# text columns with a few distinct values per batch, whatever its size
+LOW_CARDINALITY_COLUMNS = frozenset({
+    "source", "donor", "donor_name", "donor_id", "country", "country_code", "region",
+    "sector", "subsector", "status", "project_status", "funding_modality", "funding_type",
+})
+
+
+class ColumnSpec(NamedTuple):
+    name: str
+    sql_type: str                   # as written in CREATE_TABLE_SQL
+    dtype: str                      # pandas dtype after coercion
+
+
+def _dtype(sql_type: str, name: str = "") -> str:
+    sql_type = sql_type.upper()
+    if sql_type.startswith("TIMESTAMP"):
+        return "datetime64[us]"
+    return {
+        "INTEGER": "Int32",
+        "BIGINT": "Int64",
+        "NUMERIC": "float64",
+        "DATE": "date32[pyarrow]",
+    }.get(sql_type, "category" if name in LOW_CARDINALITY_COLUMNS else "string")   # TEXT / CHARACTER VARYING
+
+
+_SPEC: Optional[List[ColumnSpec]] = None
+
+
+def column_spec() -> List[ColumnSpec]:
+    """One ColumnSpec per project_data column, in table order (built once, on first use)."""
+    global _SPEC
+    if _SPEC is None:
+        from db_setup_and_ingest_org import CREATE_TABLE_SQL
+        from vertical_split import ddl_columns
+
+        _SPEC = [ColumnSpec(name, sql_type, _dtype(sql_type, name)) for name, sql_type in ddl_columns(CREATE_TABLE_SQL)]
+    return _SPEC
+
+
+CREATE_QUARANTINE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {QUARANTINE_TABLE} (
+    id              BIGSERIAL PRIMARY KEY,
+    quarantined_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    source          CHARACTER VARYING,
+    reason          TEXT NOT NULL,
+    row_data        JSONB NOT NULL
+);
+"""
+
+
+# ---------------------------------------------------------------------------
+# Coercion
+# ---------------------------------------------------------------------------
+def _as_text(value):
+    if isinstance(value, (list, dict)):
+        return str(value)
+    return None if pd.isna(value) else str(value)
+
+
+def _present(values: pd.Series) -> pd.Series:
+    """True where the raw value is neither null nor a blank string."""
+    present = values.notna()
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        present &= ~values.astype(str).str.strip().eq("")
+    return present
+
+
+def _to_timestamps(values: pd.Series) -> pd.Series:
+    """Naive UTC datetime64[us]; ISO 8601 in one pass, anything else re-parsed per value."""
+    stamps = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    retry = stamps.isna() & values.notna()
+    if retry.any():
+        stamps[retry] = pd.to_datetime(values[retry], errors="coerce", utc=True, format="mixed")
+    return stamps.dt.tz_localize(None).astype("datetime64[us]")
+
+
+def _coerce_categorical(values: pd.Series, spec: ColumnSpec) -> pd.Series:
+    """Text column as a categorical with string categories; categorical input is cast per category."""
+    as_text = spec._replace(dtype="string")
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return coerce_column(values, as_text).astype("category")
+    labels = coerce_column(pd.Series(values.cat.categories), as_text)
+    label_codes, categories = pd.factorize(labels)              # blank / null categories → -1
+    codes = values.cat.codes.to_numpy()
+    present = codes >= 0
+    recoded = np.full(len(codes), -1, dtype=np.int64)           # an all-null column has no categories
+    recoded[present] = label_codes[codes[present]]
+    codes = recoded
+    return pd.Series(pd.Categorical.from_codes(codes, pd.Index(categories, dtype="string")), index=values.index)
+
+
+def coerce_column(values: pd.Series, spec: ColumnSpec) -> pd.Series:
+    """*values* cast to spec.dtype; anything that does not cast becomes null."""
+    if spec.dtype == "category":
+        return _coerce_categorical(values, spec)
+    if spec.dtype == "string":
+        if pd.api.types.infer_dtype(values, skipna=True) not in ("string", "empty"):
+            values = values.map(_as_text)
+        return values.astype("string").where(_present(values), pd.NA)
+    if spec.dtype in ("Int32", "Int64"):
+        numbers = pd.to_numeric(values, errors="coerce").round()
+        limit = INT32_MAX if spec.dtype == "Int32" else INT64_MAX
+        return numbers.where(numbers.abs() <= limit).astype(spec.dtype)
+    if spec.dtype == "float64":
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+    stamps = _to_timestamps(values)
+    if spec.dtype == "date32[pyarrow]":
+        import pyarrow as pa
+
+        return stamps.astype(pd.ArrowDtype(pa.date32()))
+    return stamps
+
+
+def coerce(df: pd.DataFrame, complete: bool = False) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    (*df* cast to the contract, per-row rejection reason). Columns outside
+    project_data are dropped; with *complete* missing ones are added as
+    nulls. The reason is "" for good rows, else "invalid <col>, <col>".
+    """
+    columns = {}
+    bad = {}
+    for spec in column_spec():
+        if spec.name not in df.columns:
+            if complete:
+                columns[spec.name] = coerce_column(pd.Series(None, index=df.index, dtype=object), spec)
+            continue
+        raw = df[spec.name]
+        coerced = coerce_column(raw, spec)
+        failed = _present(raw) & coerced.isna()
+        if failed.any():
+            bad[spec.name] = failed
+        columns[spec.name] = coerced
+    frame = pd.DataFrame(columns, index=df.index)
+
+    reasons = pd.Series("", index=df.index, dtype=object)
+    if bad:
+        failed = pd.DataFrame(bad)
+        listed = failed.dot(failed.columns + ", ").str[:-2]
+        reasons = reasons.mask(failed.any(axis=1), "invalid " + listed)
+    return frame, reasons
+
+
+def encode_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Mapping-layer hook: LOW_CARDINALITY_COLUMNS of *df* as categoricals, in place; returns *df*."""
+    for name in LOW_CARDINALITY_COLUMNS.intersection(df.columns):
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            continue
+        try:
+            df[name] = df[name].astype("category")
+        except TypeError:                       # lists / dicts left for the contract to stringify
+            pass
+    return df
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per column of *df* as mapped vs with every categorical decoded to plain strings."""
+    plain = df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    report = pd.DataFrame({
+        "encoded": df.memory_usage(index=False, deep=True),
+        "plain": plain.memory_usage(index=False, deep=True),
+    })
+    report["saved"] = report["plain"] - report["encoded"]
+    return report.sort_values("saved", ascending=False)
+
+
+# ---------------------------------------------------------------------------
+# Ingest hook
+# ---------------------------------------------------------------------------
+def quarantine(engine, rejected: pd.DataFrame, reasons: pd.Series) -> None:
+    """Store rejected raw rows with their reasons in project_data_quarantine (migration 009)."""
+    if rejected.empty:
+        return
+    records = json.loads(rejected.to_json(orient="records", date_format="iso", default_handler=str))
+    sources = rejected["source"] if "source" in rejected.columns else pd.Series(None, index=rejected.index)
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"INSERT INTO {QUARANTINE_TABLE} (source, reason, row_data) "
+                 f"VALUES (:source, :reason, CAST(:row_data AS JSONB))"),
+            [
+                {"source": _as_text(source), "reason": reason, "row_data": json.dumps(record)}
+                for source, reason, record in zip(sources, reasons, records)
+            ],
+        )
+
+
+def enforce(df: pd.DataFrame, engine=None) -> pd.DataFrame:
+    """
+    ingest_data() hook: the loadable rows of *df*, cast to the contract.
+    Rejected rows are logged and, given an *engine*, quarantined; a failure
+    to quarantine is logged and never fails the ingest.
+    """
+    unknown = [c for c in df.columns if c not in {spec.name for spec in column_spec()}]
+    if unknown:
+        logger.warning(f"⚠️ Dropping columns not in {TABLE_NAME}: {unknown}")
+    frame, reasons = coerce(df)
+    rejected = reasons.ne("")
+    if rejected.any():
+        logger.warning(f"🚧 {int(rejected.sum())} rows rejected by the schema contract "
+                       f"(first: {reasons[rejected].iloc[0]})")
+        if engine is not None:
+            try:
+                quarantine(engine, df[rejected], reasons[rejected])
+                logger.info(f"🚧 Quarantined {int(rejected.sum())} rows in {QUARANTINE_TABLE}")
+            except Exception as e:
+                logger.error(f"❌ Could not quarantine rejected rows: {e}")
+    return frame[~rejected].reset_index(drop=True)
@@ -3,9 +3,11 @@ BII (British International Investment) – Investments search‑page scraper
 =======================================================================
 
 * Select filters (country / sector / dates) via Selenium (using **undetected‑chromedriver**).
-* Click the **Search** button, then download the CSV:
-  1. Fast path → `requests` with pre‑solved cookies.
-  2. Fallback → submit the CSV form in the live browser.
+* Click the **Search** button, then download the direct / funds / underlying CSVs:
+  1. Fast path → copy the browser's (pre‑solved) cookies into a `requests`
+     session and POST the three export forms concurrently.
+  2. Fallback → submit the CSV form in the live browser, for any tab whose
+     fast-path export failed (or for all of them with BII_FAST_PATH=0).
 * Archive downloaded file and return its final path.
 
 -----------------------------------------------------------------------
@@ -24,17 +26,17 @@ scrape_bii(filters)
 """
 from __future__ import annotations
 
+import contextvars
 import json
 import logging
 import os
-import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Union
 
 import requests
-import undetected_chromedriver as uc
 from selenium.common.exceptions import ElementClickInterceptedException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -43,11 +45,27 @@ from selenium.common.exceptions import WebDriverException
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.common.keys import Keys
 
+import telemetry
+from telemetry import span
+from browser import apply_profile, prepare_driver, undetected_driver_args
+
 # ---------------------------------------------------------------------
-# CLEAR UC CACHE (avoids mismatched driver versions)
+# UNDETECTED-CHROMEDRIVER (driver binary from the shared cache, browser.py)
 # ---------------------------------------------------------------------
-shutil.rmtree(os.path.expandvars(r"%LOCALAPPDATA%\undetected_chromedriver"), ignore_errors=True)
-uc.Chrome.__del__ = lambda self: None
+_UC_PREPARED = False
+
+def _prepare_uc():
+    """
+    Import undetected-chromedriver – once per process, on the first browser
+    start rather than at module import.
+    """
+    global _UC_PREPARED
+    import undetected_chromedriver as uc
+
+    if not _UC_PREPARED:
+        uc.Chrome.__del__ = lambda self: None
+        _UC_PREPARED = True
+    return uc
 # ---------------------------------------------------------------------
 # CONSTANTS / SELECTORS
 # ---------------------------------------------------------------------
@@ -78,6 +96,15 @@ UNDERLYING_TAB_XPATH  = '//*[@id="tab-underlying-label"]'
 
 TIMEOUT = 15
 
+# export form of each results tab (present in the DOM once the search has run)
+TAB_FORMS = {
+    "direct":     '//*[@id="tab-direct"]/form[1]',
+    "funds":      '//*[@id="tab-funds"]/form[1]',
+    "underlying": '//*[@id="tab-underlying"]/form[1]',
+}
+FAST_PATH = os.getenv("BII_FAST_PATH", "1") == "1"
+FAST_PATH_TIMEOUT = 120   # seconds per export request
+
 # ── retry / rename helpers ─────────────────────────────────────────────
 MAX_DOWNLOAD_RETRIES   = 3
 BROKEN_URL_SIGNATURES = [
@@ -135,7 +162,8 @@ def _submit_search_and_wait(driver):
 # UNDETECTED‑CHROMEDRIVER
 # ---------------------------------------------------------------------
 
-def _get_undetected_driver(version_main: int = 137):
+def _get_undetected_driver():
+    uc = _prepare_uc()
     opts = uc.ChromeOptions()
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_argument("--start-maximized")
@@ -149,8 +177,8 @@ def _get_undetected_driver(version_main: int = 137):
         "profile.default_content_setting_values.automatic_downloads": 1,
     }
     opts.add_experimental_option("prefs", prefs)
-    # opts.add_argument("--headless=new")
-    driver = uc.Chrome(options=opts, version_main=version_main)
+    apply_profile(opts, "bii")
+    driver = prepare_driver(uc.Chrome(options=opts, **undetected_driver_args()))
 
     # extra safety for some Chrome builds
     try:
@@ -297,6 +325,87 @@ def _apply_filters(driver, f):
     time.sleep(1.2)
     # _click_search(driver)
 
+# ---------------------------------------------------------------------
+# DOWNLOAD (FAST PATH: browser cookies → requests)
+# ---------------------------------------------------------------------
+
+# action, method and fields (incl. the submit button) of one export form
+_FORM_JS = """
+var form = arguments[0];
+var button = form.querySelector('button[type=submit], button:not([type]), input[type=submit]');
+var fields = [];
+new FormData(form).forEach(function (value, name) {
+    if (typeof value === 'string') { fields.push([name, value]); }
+});
+if (button && button.name) { fields.push([button.name, button.value || '']); }
+return {action: form.action, method: (form.getAttribute('method') || 'get').toLowerCase(), fields: fields};
+"""
+
+
+def _read_export_form(driver, form_xpath: str) -> dict:
+    return driver.execute_script(_FORM_JS, driver.find_element(By.XPATH, form_xpath))
+
+
+def _browser_session(driver) -> requests.Session:
+    """A requests session carrying the browser's cookies, user agent and referer."""
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": driver.execute_script("return navigator.userAgent"),
+        "Referer": driver.current_url,
+    })
+    for c in driver.get_cookies():
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+    return session
+
+
+def _export_tab(session: requests.Session, form: dict, filters: dict, tab: str) -> Path:
+    """Submit one export form over HTTP; the CSV is written atomically and renamed like a browser download."""
+    with span("download") as s:
+        if form["method"] == "post":
+            r = session.post(form["action"], data=form["fields"], timeout=FAST_PATH_TIMEOUT)
+        else:
+            r = session.get(form["action"], params=form["fields"], timeout=FAST_PATH_TIMEOUT)
+        r.raise_for_status()
+        # a challenge / error page instead of the file → let the browser try
+        if "text/html" in r.headers.get("Content-Type", "") or r.content.lstrip()[:1] == b"<":
+            raise ValueError(f"{tab} export answered with an HTML page, not a CSV")
+        s.add(bytes=len(r.content))
+
+    partial = DOWNLOAD_PATH / f".{tab}_{os.getpid()}.part"
+    partial.write_bytes(r.content)
+    return _rename_and_archive(partial, filters, tab)
+
+
+def _download_tabs_fast(driver, filters: dict) -> Dict[str, Path]:
+    """
+    Export every tab of TAB_FORMS at once over requests, reusing the
+    browser session. Returns {tab: path} for the exports that succeeded.
+    """
+    forms = {}
+    for tab, form_xpath in TAB_FORMS.items():
+        try:
+            forms[tab] = _read_export_form(driver, form_xpath)
+        except Exception as e:
+            logging.warning(f"⚠️ {tab} export form not readable: {e}")
+    if not forms:
+        return {}
+
+    done: Dict[str, Path] = {}
+    with _browser_session(driver) as session, \
+         ThreadPoolExecutor(max_workers=len(forms), thread_name_prefix="bii-export") as pool:
+        # a context copy per task, so the download spans stay under this source's span
+        futures = {
+            tab: pool.submit(contextvars.copy_context().run, _export_tab, session, form, filters, tab)
+            for tab, form in forms.items()
+        }
+        for tab, future in futures.items():
+            try:
+                done[tab] = future.result()
+                logging.info(f"⚡ {tab} CSV exported over requests")
+            except Exception as e:
+                logging.warning(f"⚠️ {tab} fast-path export failed ({e}) → browser fallback")
+    return done
+
 # ---------------------------------------------------------------------
 # DOWNLOAD (BROWSER FALLBACK)
 # ---------------------------------------------------------------------
@@ -445,6 +554,8 @@ def _download_csv_with_retry(
     """
     for attempt in range(1, MAX_DOWNLOAD_RETRIES + 1):
         logging.info(f"⬇️  {tab} CSV attempt {attempt}/{MAX_DOWNLOAD_RETRIES}")
+        if attempt > 1:
+            telemetry.add(retries=1)
 
         
         # Ensure download button is present
@@ -513,6 +624,8 @@ def _download_tab_csv(driver, filters: dict, tab_key: str) -> Path:
     """
     for tab_attempt in range(1, MAX_DOWNLOAD_RETRIES + 1):
         logging.info(f"🔁 Tab '{tab_key}' download attempt {tab_attempt}/{MAX_DOWNLOAD_RETRIES}")
+        if tab_attempt > 1:
+            telemetry.add(retries=1)
 
         try:
             # 1) switch to the requested tab
@@ -572,8 +685,12 @@ def scrape_bii(filters: Dict | str | None = "TEST") -> Path | None:
         # _click_search(driver)
         # ── CSV downloads ───────────────────────────────────────────
         archived: List[Path] = []
+        exported = _download_tabs_fast(driver, f) if FAST_PATH else {}
 
-        for tab_key in ("direct", "funds", "underlying"):
+        for tab_key in TAB_FORMS:
+            if tab_key in exported:
+                archived.append(exported[tab_key])
+                continue
             try:
                 archived.append(_download_tab_csv(driver, f, tab_key))
             except Exception as err:
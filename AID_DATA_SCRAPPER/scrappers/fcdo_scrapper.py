@@ -8,41 +8,16 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from browser import apply_profile, chrome_service, prepare_driver
 from unified_mapping import FILTER_VALUE_FIXES  # now centralized
+from utils.logging_utils import get_logger
 from datetime import datetime
 import logging
 
 
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "fcdo_scrapper_errors.log"
-
-logger = logging.getLogger("fcdo_scrapper_errors")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger = get_logger("fcdo_scrapper_errors", "fcdo_scrapper_errors.log")
 
 
 FILTER_XPATH_OVERRIDES = {
@@ -50,7 +25,12 @@ FILTER_XPATH_OVERRIDES = {
     "Government Department(s)": "//*[@id='searchFilters']/fieldset[2]/div"
 }
 
-def run_fcdo_scraper(filters: dict):
+def run_fcdo_scraper(filters: dict, skip_archived: bool = True):
+    """
+    Collect the IATI.cloud JSON links for *filters* and save them to a text
+    file; returns its path. Links already archived are dropped unless
+    *skip_archived* is False (delta runs re-query them for modified records).
+    """
     # Replace folder name
     download_dir = os.path.abspath("fcdo_downloads")
     os.makedirs(download_dir, exist_ok=True)
@@ -63,7 +43,9 @@ def run_fcdo_scraper(filters: dict):
     options.add_argument('--headless=new')
     options.add_argument('--window-size=1920,1080')
 
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
+    apply_profile(options, "fcdo")
+
+    driver = prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
     wait = WebDriverWait(driver, 20)
 
     json_links = []
@@ -216,7 +198,7 @@ def run_fcdo_scraper(filters: dict):
         for link in json_links:
             f.write(link + "\n")
     archived_links = set()
-    for root, _, files in os.walk(archive_dir):
+    for root, _, files in (os.walk(archive_dir) if skip_archived else ()):
         for file in files:
             file_path = os.path.join(root, file)
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -4,9 +4,8 @@ import os
 import time
 import logging
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from browser import apply_profile, chrome_service, prepare_driver
 from urllib.parse import quote
 import pandas as pd
 from io import StringIO
@@ -18,33 +17,9 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException
 import json
 from datetime import datetime
 import urllib.parse
+from utils.logging_utils import get_logger
 
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "foreign_scraper.log"
-
-logger = logging.getLogger("foreign_scraper")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger = get_logger("foreign_scraper", "foreign_scraper.log")
 
 # Known columns from the dataset
 KNOWN_COLUMNS = [
@@ -117,8 +92,8 @@ def run_foreign_assistance_scraper(filters=None):
         options.add_argument("--window-size=1920,1080")
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
 
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        apply_profile(options, "foreignassistance")
+        driver = prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
         # -------- RETRY LOOP --------
         for attempt, filt in enumerate(_retry_plan(filters), start=1):
             logger.info(f"🔄 Attempt {attempt}: filters ➜ {filt}")
@@ -1,42 +1,23 @@
 import logging
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from browser import apply_profile, chrome_service, prepare_driver
 import time
 import os
-from urllib.parse import urlparse, quote_plus
-import hashlib
+import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, quote_plus, unquote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium.webdriver.common.keys import Keys
+from telemetry import span
+from utils.logging_utils import get_logger
 
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "iati_scraper.log"
-
-logger = logging.getLogger("iati_scraper")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger = get_logger("iati_scraper", "iati_scraper.log")
 
 
 def is_element_clickable(driver, xpath):
@@ -85,6 +66,139 @@ def select_year_field(driver, wait, container_xpath, input_xpath, value):
         logger.error(f"❌ Failed to select year '{value}' at {container_xpath}: {e}")
 
 
+# ---------------------------------------------------------------------------
+# Activity CSVs: links from the browser, files over HTTP
+# ---------------------------------------------------------------------------
+CSV_URL = "https://d-portal.org/q.csv?aid={aid}"
+RESULTS_TABLE_XPATH = '//*[@id="ctrack_div"]/div/div[1]/div[2]/div[5]/div[1]/table'
+ROW_XPATH = RESULTS_TABLE_XPATH + '/tbody/tr[{index}]'
+ACTIVITY_CSV_XPATH = '//*[@id="ctrack_div"]/div/div[1]/div[2]/div[4]/div/div[5]/div[2]/a[6]'
+DOWNLOAD_WORKERS = int(os.getenv("IATI_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_TIMEOUT = 60      # seconds per CSV
+
+# every activity reference in the results table, in row order, one round trip
+_ACTIVITY_LINKS_JS = """
+return Array.prototype.map.call(
+    arguments[0].querySelectorAll('a[href*="aid="], [data-aid]'),
+    function (el) { return el.getAttribute('data-aid') ? 'aid=' + el.getAttribute('data-aid') : el.href; });
+"""
+_AID_RE = re.compile(r"(?:^|[?&#])aid=([^&#]+)")
+
+
+def activity_id(ref):
+    """IATI identifier in a d-portal link or reference ("…?aid=<id>"), or None."""
+    match = _AID_RE.search(ref or "")
+    return unquote(match.group(1)) if match else None
+
+
+def csv_link(aid):
+    """d-portal CSV link of an activity, with the id percent-encoded as the activity panel does."""
+    return CSV_URL.format(aid=quote(aid, safe=""))
+
+
+def activity_csv_filename(aid):
+    """
+    Local name of an activity's CSV, keyed on its id alone. It equals the
+    quote_plus(href) name of earlier runs for the panel's link, reserved
+    characters included ("/" → %2F → %252F), so their archive still matches.
+    """
+    return f"{quote_plus(csv_link(aid))}.csv"
+
+
+def _activity_links_from_table(driver):
+    """{activity id: CSV link} for the activities the results table references."""
+    table = driver.find_element(By.XPATH, RESULTS_TABLE_XPATH)
+    aids = [activity_id(ref) for ref in driver.execute_script(_ACTIVITY_LINKS_JS, table) or []]
+    return {aid: csv_link(aid) for aid in aids if aid}
+
+
+def _activity_links_by_row(driver, wait):
+    """Fallback: open each row and read its CSV link (no download)."""
+    links = {}
+    project_index = 2
+    previous = None
+    while True:
+        try:
+            row = wait.until(EC.presence_of_element_located((By.XPATH, ROW_XPATH.format(index=project_index))))
+        except Exception as loop_error:
+            logger.info(f"Finished or no more rows at index {project_index}: {loop_error}")
+            break
+        try:
+            driver.execute_script("arguments[0].scrollIntoView(true);", row)
+            try:
+                row.click()
+            except Exception:
+                driver.execute_script("arguments[0].click();", row)
+            # the activity panel is ready once its CSV link points at this row's activity
+            wait.until(lambda d: (d.find_element(By.XPATH, ACTIVITY_CSV_XPATH).get_attribute("href") or previous)
+                       != previous)
+            previous = driver.find_element(By.XPATH, ACTIVITY_CSV_XPATH).get_attribute("href")
+            logger.info(f"🔗 CSV link: {previous}")
+            aid = activity_id(previous)
+            if aid:
+                links.setdefault(aid, previous)
+            else:
+                logger.info(f"No activity id in CSV link at row {project_index}: {previous}")
+        except Exception as row_error:
+            logger.info(f"No CSV link at row {project_index}: {row_error}")
+        project_index += 1
+    return links
+
+
+def collect_csv_links(driver, wait):
+    """{activity id: CSV link} for every activity in the "View All" results."""
+    try:
+        wait.until(EC.presence_of_element_located((By.XPATH, ROW_XPATH.format(index=2))))
+        links = _activity_links_from_table(driver)
+    except Exception as e:
+        logger.info(f"Results table has no activity ids ({e}); opening rows one by one")
+        links = {}
+    return links or _activity_links_by_row(driver, wait)
+
+
+def _download_csv(session, aid, href, download_dir):
+    """Fetch one activity CSV and move it into place atomically; returns its path or None."""
+    local_path = os.path.join(download_dir, activity_csv_filename(aid))
+    partial = f"{local_path}.part"
+    try:
+        with span("download") as s:
+            response = session.get(href, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            s.add(bytes=len(response.content))
+        with open(partial, "wb") as f:
+            f.write(response.content)
+        os.replace(partial, local_path)
+        logger.info(f"✅ File downloaded: {local_path}")
+        return local_path
+    except Exception as e:
+        logger.error(f"❌ CSV download failed for {href}: {e}")
+        if os.path.exists(partial):
+            os.remove(partial)
+        return None
+
+
+def download_activity_csvs(links, download_dir, workers=DOWNLOAD_WORKERS):
+    """
+    Download *links* ({activity id: CSV link}) into *download_dir* over one
+    shared requests session, *workers* at a time; returns the paths written,
+    in link order.
+    """
+    if not links:
+        return []
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers,
+                          max_retries=Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504)))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    with session, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="iati-csv") as pool:
+        # a context copy per task, so the download spans stay under this source's span
+        futures = [pool.submit(contextvars.copy_context().run, _download_csv, session, aid, href, download_dir)
+                   for aid, href in links.items()]
+        paths = [f.result() for f in futures]
+    written = [p for p in paths if p]
+    logger.info(f"📥 {len(written)}/{len(links)} activity CSVs downloaded ({workers} workers)")
+    return written
+
 
 def run_iati_scraper(filters):
     base_url = "https://d-portal.org/ctrack.html#view=search"
@@ -108,7 +222,9 @@ def run_iati_scraper(filters):
     }
     options.add_experimental_option("prefs", prefs)
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    apply_profile(options, "iati")
+
+    driver = prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
     wait = WebDriverWait(driver, 10)
 
     try:
@@ -218,88 +334,12 @@ def run_iati_scraper(filters):
             # except:
             #     logger.info("'View All' button not found or already applied")
 
-        csv_files = []
-        project_index = 2
-        while True:
-            try:
-                # driver.get(main_url)
-                # time.sleep(5)
-
-                row_xpath = f'//*[@id="ctrack_div"]/div/div[1]/div[2]/div[5]/div[1]/table/tbody/tr[{project_index}]'
-                row = wait.until(EC.presence_of_element_located((By.XPATH, row_xpath)))
-                driver.execute_script("arguments[0].scrollIntoView(true);", row)
-                time.sleep(1)
-
-                try:
-                    wait.until(EC.element_to_be_clickable((By.XPATH, row_xpath)))
-                    row.click()
-                    logger.info(f"Clicked row {project_index}")
-                except Exception as click_error:
-                    logger.info(f"Element not clickable at index {project_index}, retrying with JS: {click_error}")
-                    try:
-                        driver.execute_script("arguments[0].click();", row)
-                        logger.info(f"Clicked row {project_index} using JavaScript")
-                    except Exception as js_error:
-                        logger.info(f"JavaScript click also failed at index {project_index}: {js_error}")
-                        project_index += 1
-                        continue
-
-                time.sleep(4)
-
-                try:
-                    csv_xpath = '//*[@id="ctrack_div"]/div/div[1]/div[2]/div[4]/div/div[5]/div[2]/a[6]'
-                    csv_link = wait.until(EC.presence_of_element_located((By.XPATH, csv_xpath)))
-                    driver.execute_script("arguments[0].scrollIntoView(true);", csv_link)
-                    
-
-                    href = csv_link.get_attribute("href")
-                    logger.info(f"🔗 CSV link: {href}")
-
-                    # Extract original filename and clean up link-based name
-                    original_filename = os.path.basename(urlparse(href).path)
-
-                    # Use a hash or encoded form of the full URL to name the file uniquely
-                    safe_name = quote_plus(href)  # URL-safe filename version of the href
-                    filename = f"{safe_name}.csv"
-
-                    local_path = os.path.join(download_dir, filename)
-
-                    try:
-                        csv_link.click()
-                    except Exception as e:
-                        driver.execute_script("arguments[0].click();", csv_link)
-                        logger.info(f"Clicked CSV with JS fallback for row {project_index}")
-
-                    # Wait for actual download
-                    downloaded_file = os.path.join(download_dir, original_filename)
-                    wait_time = 0
-                    while not os.path.exists(downloaded_file) and wait_time < 30:
-                        time.sleep(1)
-                        wait_time += 1
-
-                    if os.path.exists(downloaded_file):
-                        os.rename(downloaded_file, local_path)
-                        csv_files.append(local_path)
-                        logger.info(f"✅ File downloaded and renamed to: {local_path}")
-                    else:
-                        logger.error(f"❌ File not found after click: {downloaded_file}")
-                        # Optional: clean up any partials
-                        partial = local_path + ".crdownload"
-                        if os.path.exists(partial):
-                            os.remove(partial)
-                            logger.info(f"🧹 Removed incomplete download: {partial}")
-                    # break
-                except Exception as download_error:
-                    logger.info(f"Failed to download CSV at row {project_index}: {download_error}")
-
-                project_index += 1
-
-            except Exception as loop_error:
-                logger.info(f"Finished or no more rows at index {project_index}: {loop_error}")
-                break
-
-        logger.info(f"All CSVs downloaded to: {download_dir}")
-        # return csv_files
+        csv_links = collect_csv_links(driver, wait)
+        logger.info(f"🔗 {len(csv_links)} activity CSV links collected")
 
     finally:
         driver.quit()
+
+    csv_files = download_activity_csvs(csv_links, download_dir)
+    logger.info(f"All CSVs downloaded to: {download_dir}")
+    return csv_files
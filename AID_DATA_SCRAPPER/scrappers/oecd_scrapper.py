@@ -1,6 +1,5 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException
@@ -13,33 +12,11 @@ from selenium.webdriver.common.action_chains import ActionChains
 import logging
 import re
 import shutil
+from utils.logging_utils import get_logger
+import telemetry
+from browser import apply_profile, chrome_service, prepare_driver
 
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "oecd_scraper.log"
-
-logger = logging.getLogger("oecd_scraper")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger = get_logger("oecd_scraper", "oecd_scraper.log")
 
 DOWNLOAD_DIR = os.path.join(os.getcwd(), "oecd_downloads")
 ARCHIVE_DIR  = os.path.join(DOWNLOAD_DIR, "archive")        # NEW
@@ -82,7 +59,14 @@ def load_country_lookup():
             lookup[name] = raw  # full text with code
     return lookup
 
-COUNTRY_LOOKUP = load_country_lookup()
+_COUNTRY_LOOKUP = None
+
+def get_country_lookup():
+    """Parse utils/oecd.txt on first use instead of at import time."""
+    global _COUNTRY_LOOKUP
+    if _COUNTRY_LOOKUP is None:
+        _COUNTRY_LOOKUP = load_country_lookup()
+    return _COUNTRY_LOOKUP
 
 def with_retry(func, *args, attempts: int = 3, delay: int = 2, **kwargs):
     """
@@ -95,6 +79,7 @@ def with_retry(func, *args, attempts: int = 3, delay: int = 2, **kwargs):
             logger.warning(f"[RETRY] {func.__name__} failed on attempt {i}/{attempts}: {type(e).__name__}: {e.msg if hasattr(e, 'msg') else str(e).splitlines()[0]}")
             if i == attempts:         # give up on the last attempt
                 raise
+            telemetry.add(retries=1)
             time.sleep(delay)
 
 
@@ -108,7 +93,8 @@ def _normalize(fname: str) -> str:
 def setup_driver():
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
-    return webdriver.Chrome(service=Service(), options=options)
+    apply_profile(options, "oecd")
+    return prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
 
 
 def click_element(driver, xpath, timeout=20):
@@ -299,7 +285,7 @@ def select_countries(driver, countries):
     # 2️⃣ for each requested country, re-fetch the <li>/<button> list every time -------------
     for country in countries:
         try:
-            actual_name = COUNTRY_LOOKUP.get(country.strip().lower())
+            actual_name = get_country_lookup().get(country.strip().lower())
             if not actual_name:
                 logger.warning(f"[WARN] ❌ No mapping found for country '{country}'. Skipping.")
                 continue
@@ -325,7 +311,8 @@ def setup_driver():
     options.add_argument("--log-level=3")
     options.add_experimental_option("prefs", prefs)
     options.add_argument("--start-maximized")
-    return webdriver.Chrome(service=Service(), options=options)
+    apply_profile(options, "oecd")
+    return prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
 
 def _wait_for_download(before: set, timeout: int = 30) -> str:
     """
@@ -13,34 +13,11 @@ import os
 # Add parent directory to sys.path (run-time import hack)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from db_setup_and_ingest_org import ingest_data
-
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "sdgs_scraper.log"
-
-logger = logging.getLogger("sdgs_scraper")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+import db_setup_and_ingest_org
+from utils.logging_utils import get_logger
+from telemetry import span
+
+logger = get_logger("sdgs_scraper", "sdgs_scraper.log")
 
 # CONFIG – tweak if you keep downloads elsewhere
 DOWNLOAD_DIR = Path(os.path.abspath("sdgs_downloads"))
@@ -69,8 +46,10 @@ def run_sdg_scraper(indicator: str,
 
     try:
         # Increase timeout from 60s to 120s (or more)
-        r = requests.get(req.url, timeout=120)
-        r.raise_for_status()
+        with span("download") as s:
+            r = requests.get(req.url, timeout=120)
+            r.raise_for_status()
+            s.add(bytes=len(r.content))
         payload = r.json()
     except ReadTimeout:
         logger.info("⏱️ SDG API request timed out. Try a smaller year range or wait and retry.")
@@ -130,7 +109,7 @@ def run_sdg_scraper(indicator: str,
     # 3️⃣  Ingest and archive
     if not df.empty:
         try:
-            ingest_data(df)
+            db_setup_and_ingest_org.ingest_data(df)   # looked up per call: replay --no-ingest swaps it
             logger.info("📥 Ingestion complete")
             shutil.move(str(file_path), ARCHIVE_DIR / file_path.name)
             logger.info(f"📦 Moved to archive → {ARCHIVE_DIR / file_path.name}")
@@ -8,33 +8,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import logging
 from datetime import datetime
+from browser import apply_profile, chrome_service, prepare_driver
+from utils.logging_utils import get_logger
 
-class NoTracebackFormatter(logging.Formatter):
-    # strip any traceback delivered via exc_info
-    def formatException(self, exc_info):
-        return ""                      # completely omit traceback
-    def format(self, record):
-        record.exc_info = None         # safety-belt
-        return super().format(record)
-
-LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
-log_file = "ghed_scraper.log"
-
-logger = logging.getLogger("ghed_scraper")
-logger.setLevel(logging.INFO)
-logger.propagate = False              # don’t pass records to root logger
-
-# clean stream handler ------------------------------------------------------
-stream_h = logging.StreamHandler()
-stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-logger.addHandler(stream_h)
-
-# clean file handler --------------------------------------------------------
-if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
-           for h in logger.handlers):
-    file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-    file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
-    logger.addHandler(file_h)
+logger = get_logger("ghed_scraper", "ghed_scraper.log")
 
 def run_who_ghed_scraper(country: str, start_year: int, end_year: int, download_dir: str) -> Optional[str]:
     download_dir = os.path.abspath(download_dir)
@@ -54,7 +31,9 @@ def run_who_ghed_scraper(country: str, start_year: int, end_year: int, download_
         "safebrowsing.enabled": True
     })
 
-    driver = webdriver.Chrome(options=options)
+    apply_profile(options, "ghed")
+
+    driver = prepare_driver(webdriver.Chrome(service=chrome_service(), options=options))
     wait = WebDriverWait(driver, 30)
     logger.info(f"💡 Effective download directory: {download_dir}")
     driver.get("https://apps.who.int/nha/database/Select/Indicators/en")
@@ -0,0 +1,314 @@
+# --- source_registry.py ---
+"""
+Source plugins for the /get-data dispatcher.
+
+Each source registers one runner – translate filters → scrape → parse/ingest –
+together with the capabilities the dispatcher schedules with:
+
+* needs_browser          – starts Chrome (runs in the small browser pool)
+* expected_seconds       – rough wall-clock cost of one run (cheap sources go first)
+* rate_limit_per_minute  – max runs started per minute against the upstream
+* cacheable              – an identical run inside the cache TTL can be skipped
+
+Scrapers and parsers are imported inside each runner, so registering a source
+costs nothing until a payload asks for it. Runners wrap their browser part in
+a "scrape" span (telemetry.py); download / parse / coerce / load spans are
+opened by the parsers and ingest_data().
+
+Adding a source
+---------------
+Decorate a runner in this file, or in any module listed in the
+``AID_SOURCE_PLUGINS`` environment variable (comma-separated import paths):
+
+    @register_source("mysource", needs_browser=False, expected_seconds=20, cacheable=True)
+    def run_mysource(filters: dict) -> None:
+        from scrappers.my_scraper import run_my_scraper
+        run_my_scraper(filters)
+"""
+
+import importlib
+import logging
+import os
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+from telemetry import span
+from unified_mapping import FILTER_KEY_MAPPING, FILTER_VALUE_FIXES
+from utils.logging_utils import get_logger
+
+logger_wb = get_logger("world_bank_scraper", "world_bank_scraper.log")
+
+
+@dataclass(frozen=True)
+class SourcePlugin:
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    needs_browser: bool = False
+    expected_seconds: int = 60
+    rate_limit_per_minute: Optional[int] = None
+    cacheable: bool = False
+
+    def describe(self) -> Dict[str, Any]:
+        """Capabilities as plain JSON (everything except the runner)."""
+        info = asdict(self)
+        info.pop("run")
+        return info
+
+
+SOURCE_REGISTRY: Dict[str, SourcePlugin] = {}
+
+
+def register_source(name: str, **capabilities):
+    """Decorator: register *fn* as the runner for source *name*."""
+    def decorator(fn):
+        SOURCE_REGISTRY[name] = SourcePlugin(name=name, run=fn, **capabilities)
+        return fn
+    return decorator
+
+
+def get_source(name: str) -> Optional[SourcePlugin]:
+    return SOURCE_REGISTRY.get(name)
+
+
+def load_external_plugins(env_var: str = "AID_SOURCE_PLUGINS") -> None:
+    """Import extra plugin modules so their @register_source calls run."""
+    for module in filter(None, (m.strip() for m in os.getenv(env_var, "").split(","))):
+        importlib.import_module(module)
+
+
+# ---------------------------------------------------------------------------
+# Filter translation helpers
+# ---------------------------------------------------------------------------
+def normalize_country_filter(filters: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """
+    Replaces full country names with corresponding country codes based on FILTER_VALUE_FIXES.
+    """
+    country_val = filters.get("country")
+    if not country_val:
+        return filters
+
+    source_mapping = FILTER_VALUE_FIXES.get(source.upper(), {}).get("Country", {})
+    reverse_map = {v.lower(): k for k, v in source_mapping.items()}
+
+    match = reverse_map.get(country_val.lower())
+    if match:
+        filters["country"] = match
+    return filters
+
+def translate_filters(general_filters: Dict[str, Any], source: str) -> Dict[str, Any]:
+    general_filters = normalize_country_filter(general_filters.copy(), source)
+
+    mapped = {}
+    for k, v in general_filters.items():
+        mapped_key = FILTER_KEY_MAPPING.get(source, {}).get(k, k)
+        mapped[mapped_key] = v
+    return mapped
+
+def translate_foreign_assistance_filters(filters: dict | None) -> dict:
+    """
+    Convert generic keys (country, sector, …) to the Foreign-Assistance
+    column names using unified_mapping.FILTER_KEY_MAPPING.
+    Keys that are already source-specific pass straight through.
+    """
+    if not filters:
+        return {}
+    translated = {}
+    for key, val in filters.items():
+        # generic → source-specific
+        mapped_key = FILTER_KEY_MAPPING.get(key, {}).get("foreignassistance", key)
+        # handle year ranges cleanly
+        if key in ("start_year", "end_year"):
+            mapped_key = "Fiscal Year"
+        translated.setdefault(mapped_key, [])
+        # keep lists if caller already provided one
+        if isinstance(val, (list, tuple)):
+            translated[mapped_key].extend(val)
+        else:
+            translated[mapped_key].append(val)
+    # collapse single-value lists
+    for k in list(translated):
+        if len(translated[k]) == 1:
+            translated[k] = translated[k][0]
+    return translated
+
+
+def load_fcdo_filter_mappings(filepath: str = "utils/fcdo_filters.txt") -> Dict[str, Dict[str, str]]:
+    mappings = {}
+    current_key = None
+    try:
+        with open(filepath, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.endswith(":"):
+                    current_key = line[:-1].strip()
+                    mappings[current_key] = {}
+                elif current_key and ":" in line:
+                    label, code = map(str.strip, line.split(":", 1))
+                    mappings[current_key][label] = code
+    except FileNotFoundError:
+        print("⚠️ fcdo_filters.txt not found.")
+    return mappings
+
+def apply_fcdo_value_mapping(user_filters: Dict[str, Any], mapping: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    mapped_filters = {}
+    for k, v in user_filters.items():
+        if k in mapping and v in mapping[k]:
+            mapped_filters[f"{k}_code"] = mapping[k][v]
+        else:
+            mapped_filters[k] = v  # fallback
+    return mapped_filters
+
+def load_iati_filters(path="utils/iati_filters.txt"):
+    filters = {}
+    current_group = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith("-"):
+                current_group = line
+                filters[current_group] = {}
+            else:
+                try:
+                    name, code = line[1:].strip().rsplit("(", 1)
+                    name = name.strip()
+                    code = code.strip(")")
+                    filters[current_group][code] = name
+                except:
+                    continue  # skip malformed lines
+    return filters
+
+def get_iati_code_by_name(filters_dict, group_name, value_name):
+    group = filters_dict.get(group_name)
+    if not group:
+        return None
+    for code, label in group.items():
+        if label.lower() == value_name.lower():
+            return code
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Built-in sources
+# ---------------------------------------------------------------------------
+@register_source("fcdo", needs_browser=True, expected_seconds=900)
+def run_fcdo(filters: Dict[str, Any]) -> None:
+    from scrappers.fcdo_scrapper import run_fcdo_scraper
+    from db_setup_and_ingest_org import init_database, parse_fcdo_jsons
+    from watermarks import get_watermark, watermark_key
+
+    fcdo_mappings = load_fcdo_filter_mappings()
+    source_filters = apply_fcdo_value_mapping(filters, fcdo_mappings)
+    key = watermark_key("fcdo", filters)
+    # with a watermark, archived links are re-queried for the activities modified since;
+    # without one (first run for these filters) they are in project_data already
+    first_run = get_watermark(init_database(), key) is None
+    with span("scrape"):
+        fcdo_jsons = run_fcdo_scraper(source_filters, skip_archived=first_run)
+    parse_fcdo_jsons(fcdo_jsons, watermark_key=key)
+
+
+@register_source("iati", needs_browser=True, expected_seconds=1200)
+def run_iati(filters: Dict[str, Any]) -> None:
+    from scrappers.iati_scrapper import run_iati_scraper
+    from db_setup_and_ingest_org import parse_iati_csvs
+    from watermarks import watermark_key
+
+    key = watermark_key("iati", filters)          # before the scraper drops filters
+    with span("scrape"):
+        run_iati_scraper(filters)
+    parse_iati_csvs(watermark_key=key)
+
+
+@register_source("worldbank", expected_seconds=10, rate_limit_per_minute=30, cacheable=True)
+def run_worldbank(filters: Dict[str, Any]) -> None:
+    from db_setup_and_ingest_org import parse_worldbank_projects
+    from utils import wb_utils
+    from watermarks import watermark_key
+
+    try:
+        country = filters["country"]
+        logger_wb.info(f"🌐 Requesting World Bank project data for: {country}")
+        # 1. Resolve country ISO2 from name
+        country_iso2 = wb_utils.get_iso2_from_country(country)
+
+        # 2. Resolve indicator code from sector (topic)
+        indicator_code = wb_utils.get_indicator_code_from_topic(filters["sector"])
+    except (wb_utils.CountryNotFoundError, wb_utils.TopicNotFoundError) as e:
+        logging.error(str(e))
+        raise
+
+    # 3. Time range
+    start_year = filters.get("start_year")
+    end_year   = filters.get("end_year")
+    date_range = f"{start_year}:{end_year}" if start_year and end_year else ""
+
+    # 4. Fetch, map and ingest
+    parse_worldbank_projects(country_iso2, indicator_code, date_range,
+                             watermark_key=watermark_key("worldbank", filters))
+
+
+@register_source("foreignassistance", needs_browser=True, expected_seconds=180)
+def run_foreign_assistance(filters: Dict[str, Any]) -> None:
+    from db_setup_and_ingest_org import parse_foreign_assistance_data
+
+    parse_foreign_assistance_data(translate_foreign_assistance_filters(filters))
+
+
+@register_source("ghed", needs_browser=True, expected_seconds=180, cacheable=True)
+def run_ghed(filters: Dict[str, Any]) -> None:
+    from db_setup_and_ingest_org import parse_who_ghed_data
+
+    parse_who_ghed_data(filters.get("country"), filters.get("start_year"), filters.get("end_year"))
+
+
+@register_source("sdg", expected_seconds=60, rate_limit_per_minute=10, cacheable=True)
+def run_sdg(filters: Dict[str, Any]) -> None:
+    from scrappers.sdgs_scraper import run_sdg_scraper
+    from utils.sdg_geo_lookup import get_sdg_geo_lookup
+
+    sdg_geo_lookup = get_sdg_geo_lookup()
+    sdg_filters = translate_filters(filters, "sdg")
+    indicator = sdg_filters.get("indicator")
+
+    # Attempt to resolve area_code
+    area_code = sdg_filters.get("areaCode")
+    if isinstance(area_code, str) and not area_code.isdigit():
+        area_code = sdg_geo_lookup.get(area_code.strip().lower())
+
+    if not area_code:
+        country_name = (filters.get("country") or "").strip().lower()
+        area_code = sdg_geo_lookup.get(country_name)
+
+    if not area_code:
+        raise ValueError(f"Could not resolve SDG area code for country: {filters.get('country')}")
+
+    run_sdg_scraper(indicator, int(area_code), filters.get("start_year"), filters.get("end_year"))
+
+
+@register_source("oecd", needs_browser=True, expected_seconds=900, cacheable=True)
+def run_oecd(filters: Dict[str, Any]) -> None:
+    from scrappers.oecd_scrapper import run_oecd_scraper
+    from db_setup_and_ingest_org import parse_oecd_csvs
+
+    with span("scrape"):
+        run_oecd_scraper(translate_filters(filters, "oecd"))
+    parse_oecd_csvs()
+
+
+@register_source("bii", needs_browser=True, expected_seconds=300)
+def run_bii(filters: Dict[str, Any]) -> None:
+    from scrappers.bii_scraper import scrape_bii
+    from db_setup_and_ingest_org import parse_bii_csvs
+
+    # 1. Run Selenium / cookies scraper ("TEST" ⇒ built-in demo filters)
+    with span("scrape"):
+        scrape_bii(filters)
+    # 2. Ingest freshly downloaded CSVs
+    parse_bii_csvs()
+
+
+load_external_plugins()
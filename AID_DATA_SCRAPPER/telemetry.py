@@ -0,0 +1,307 @@
+# --- telemetry.py ---
+"""
+Spans and metrics for the ingestion pipeline.
+
+Every stage of a source run is wrapped in a span:
+
+    payload   one /get-data request (scrape_run_id)          dispatcher.dispatch
+    source    one source of that payload                      dispatcher._run_plugin
+    scrape    browser / Selenium part of a runner             source_registry
+    page      one driver.get() of a scraper                   browser.prepare_driver
+    download  one HTTP fetch                                  parse_* in db_setup_and_ingest_org
+    parse     read + map a file / response to the schema      parse_* in db_setup_and_ingest_org
+    coerce    schema contract (schema_contract.enforce)       ingest_data
+    load      write to project_data                           ingest_data
+
+    with span("parse", rows_in=len(raw)) as s:
+        mapped = map_csv_to_standard(raw)
+        s.add(rows_out=len(mapped))
+
+A span records wall and CPU time (of its thread), rows in/out, bytes and
+retries, and inherits `source` / `scrape_run_id` from its parent. Finished
+spans go to:
+
+* the in-process metrics, served in Prometheus text format at GET /metrics
+  of the ingestion API (main.py);
+* OpenTelemetry, when opentelemetry-api is installed (a no-op unless an SDK
+  is configured; with the SDK + OTLP exporter installed and
+  OTEL_EXPORTER_OTLP_ENDPOINT set, configure_tracing() exports to it);
+* AID_TRACE_FILE, one JSON line per span – the local stand-in for a
+  collector:
+
+    AID_TRACE_FILE=traces.jsonl uvicorn main:app
+    python telemetry.py summary traces.jsonl [--run <scrape_run_id>]
+
+Worker threads do not inherit context variables: submit work with
+contextvars.copy_context().run so spans started there keep their parent.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import traceback
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+TRACE_FILE = os.getenv("AID_TRACE_FILE", "")
+METRIC_PREFIX = "aid_ingest"
+# seconds; a Chrome scrape takes minutes, a DB load milliseconds
+DURATION_BUCKETS = (0.01, 0.05, 0.25, 1, 5, 30, 120, 600, 1800)
+COUNTERS = ("rows_in", "rows_out", "bytes", "retries")
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("aid_span", default=None)
+_lock = threading.Lock()
+_tracer = None
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+# ---------------------------------------------------------------------------
+# Metrics (Prometheus text exposition, no client library needed)
+# ---------------------------------------------------------------------------
+MetricKey = Tuple[str, str, str]        # (source, stage, status)
+
+_runs: Dict[MetricKey, int] = defaultdict(int)
+_seconds: Dict[MetricKey, float] = defaultdict(float)
+_cpu_seconds: Dict[MetricKey, float] = defaultdict(float)
+_counts: Dict[Tuple[str, str, str], float] = defaultdict(float)      # (source, stage, counter)
+_buckets: Dict[Tuple[str, str], list] = {}                           # (source, stage) → cumulative counts
+
+
+def _observe(span: "Span") -> None:
+    key = (span.source, span.name, span.status)
+    with _lock:
+        _runs[key] += 1
+        _seconds[key] += span.wall
+        _cpu_seconds[key] += span.cpu
+        for counter in COUNTERS:
+            if span.counts.get(counter):
+                _counts[(span.source, span.name, counter)] += span.counts[counter]
+        buckets = _buckets.setdefault((span.source, span.name), [0] * (len(DURATION_BUCKETS) + 1))
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if span.wall <= bound:
+                buckets[i] += 1
+        buckets[-1] += 1                                             # +Inf
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text() -> str:
+    """Current metrics in the Prometheus text format (version 0.0.4)."""
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_stage_runs_total Finished pipeline stages.",
+        f"# TYPE {p}_stage_runs_total counter",
+    ]
+    with _lock:
+        for (source, stage, status), n in sorted(_runs.items()):
+            lines.append(f"{p}_stage_runs_total{_labels(source=source, stage=stage, status=status)} {n}")
+        lines += [f"# HELP {p}_stage_seconds_total Wall-clock seconds spent in a stage.",
+                  f"# TYPE {p}_stage_seconds_total counter"]
+        for (source, stage, status), s in sorted(_seconds.items()):
+            lines.append(f"{p}_stage_seconds_total{_labels(source=source, stage=stage, status=status)} {s:.6f}")
+        lines += [f"# HELP {p}_stage_cpu_seconds_total CPU seconds of the stage's thread.",
+                  f"# TYPE {p}_stage_cpu_seconds_total counter"]
+        for (source, stage, status), s in sorted(_cpu_seconds.items()):
+            lines.append(f"{p}_stage_cpu_seconds_total{_labels(source=source, stage=stage, status=status)} {s:.6f}")
+        for counter in COUNTERS:
+            lines += [f"# HELP {p}_{counter}_total {counter.replace('_', ' ').capitalize()} per stage.",
+                      f"# TYPE {p}_{counter}_total counter"]
+            for (source, stage, name), v in sorted(_counts.items()):
+                if name == counter:
+                    lines.append(f"{p}_{counter}_total{_labels(source=source, stage=stage)} {v:g}")
+        lines += [f"# HELP {p}_stage_duration_seconds Wall-clock duration of a stage.",
+                  f"# TYPE {p}_stage_duration_seconds histogram"]
+        for (source, stage), buckets in sorted(_buckets.items()):
+            for bound, n in zip([*map(str, DURATION_BUCKETS), "+Inf"], buckets):
+                lines.append(f"{p}_stage_duration_seconds_bucket{_labels(source=source, stage=stage, le=bound)} {n}")
+            total = sum(s for (src, stg, _), s in _seconds.items() if (src, stg) == (source, stage))
+            lines.append(f"{p}_stage_duration_seconds_sum{_labels(source=source, stage=stage)} {total:.6f}")
+            lines.append(f"{p}_stage_duration_seconds_count{_labels(source=source, stage=stage)} {buckets[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    with _lock:
+        for table in (_runs, _seconds, _cpu_seconds, _counts, _buckets):
+            table.clear()
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------------
+def configure_tracing() -> None:
+    """Export spans over OTLP when the OpenTelemetry SDK and exporter are installed and configured."""
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": "aid-ingestion"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+def _get_tracer():
+    global _tracer
+    if _tracer is None:
+        with _lock:
+            if _tracer is None:
+                try:
+                    from opentelemetry import trace
+                except ImportError:
+                    _tracer = False
+                else:
+                    configure_tracing()
+                    _tracer = trace.get_tracer("aid_data_scrapper")
+    return _tracer or None
+
+
+class Span:
+    """One timed stage; use span() rather than creating it directly."""
+
+    def __init__(self, name: str, parent: Optional["Span"], source: Optional[str],
+                 scrape_run_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.source = source or (parent.source if parent else "-")
+        self.scrape_run_id = scrape_run_id or (parent.scrape_run_id if parent else None)
+        self.counts: Dict[str, float] = {k: attributes.pop(k) for k in COUNTERS if k in attributes}
+        self.attributes = attributes
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.stacktrace: Optional[str] = None
+        self.started_at = time.time()
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def add(self, **counts: float) -> "Span":
+        """Add to this span's counters (rows_in, rows_out, bytes, retries)."""
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + (value or 0)
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name, "source": self.source, "scrape_run_id": self.scrape_run_id,
+            "start": self.started_at, "wall_s": round(self.wall, 6), "cpu_s": round(self.cpu, 6),
+            **self.counts, **self.attributes,
+            "status": self.status, "error": self.error, "stacktrace": self.stacktrace,
+        }
+
+
+class span:
+    """
+    Context manager timing one pipeline stage. Keyword arguments named like
+    COUNTERS start those counters; any others become span attributes.
+    """
+
+    def __init__(self, name: str, source: Optional[str] = None, scrape_run_id: Optional[str] = None,
+                 **attributes: Any):
+        self.span = Span(name, _current.get(), source, scrape_run_id, attributes)
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        tracer = _get_tracer()
+        self._otel = tracer.start_as_current_span(self.span.name) if tracer else None
+        if self._otel is not None:
+            self._otel_span = self._otel.__enter__()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        s = self.span
+        s.wall = time.perf_counter() - self._wall
+        s.cpu = time.thread_time() - self._cpu
+        if exc_type is not None:
+            s.status = "error"
+            s.error = f"{exc_type.__name__}: {exc}"
+            s.stacktrace = "".join(traceback.format_exception(exc_type, exc, tb))
+        if self._otel is not None:
+            self._otel_span.set_attributes({
+                "aid.source": s.source, "aid.scrape_run_id": s.scrape_run_id or "",
+                "aid.cpu_seconds": s.cpu, **{f"aid.{k}": v for k, v in s.counts.items()},
+                **{f"aid.{k}": str(v) for k, v in s.attributes.items()},
+            })
+            self._otel.__exit__(exc_type, exc, tb)              # records the exception itself
+        _current.reset(self._token)
+        _observe(s)
+        _write(s)
+        return False
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def add(**counts: float) -> None:
+    """Add to the counters of the innermost open span (no-op outside any span)."""
+    s = _current.get()
+    if s is not None:
+        s.add(**counts)
+
+
+def _write(s: Span) -> None:
+    if not TRACE_FILE:
+        return
+    line = json.dumps(s.as_dict(), default=str)
+    with _lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+# ---------------------------------------------------------------------------
+# Local collector stand-in: summarise a trace file
+# ---------------------------------------------------------------------------
+def summarise(path: str, scrape_run_id: Optional[str] = None) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """{(source, stage): totals} over the spans in *path*, optionally one payload only."""
+    totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            s = json.loads(line)
+            if scrape_run_id and s.get("scrape_run_id") != scrape_run_id:
+                continue
+            t = totals[(s["source"], s["name"])]
+            t["spans"] += 1
+            t["errors"] += s["status"] != "ok"
+            for key in ("wall_s", "cpu_s", *COUNTERS):
+                t[key] += s.get(key) or 0
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("summary", help="wall / CPU / rows per source and stage")
+    s.add_argument("path", nargs="?", default=TRACE_FILE or "traces.jsonl")
+    s.add_argument("--run", help="only this scrape_run_id")
+    a = p.parse_args()
+
+    rows = sorted(summarise(a.path, a.run).items(), key=lambda kv: -kv[1]["wall_s"])
+    print(f"{'source':18} {'stage':9} {'spans':>6} {'wall s':>9} {'cpu s':>9} {'rows in':>9} "
+          f"{'rows out':>9} {'MB':>8} {'retries':>7} {'errors':>6}")
+    for (source, stage), t in rows:
+        print(f"{source:18} {stage:9} {t['spans']:6.0f} {t['wall_s']:9.2f} {t['cpu_s']:9.2f} "
+              f"{t['rows_in']:9.0f} {t['rows_out']:9.0f} {t['bytes'] / 1e6:8.2f} {t['retries']:7.0f} "
+              f"{t['errors']:6.0f}")
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from utils import bench
+
+
+def test_scale_repeats_rows_with_unique_ids():
+    df = pd.DataFrame({"id": ["a", "b"], "value": [1, 2]})
+    scaled = bench.scale(df, 5, "id")
+    assert scaled["value"].tolist() == [1, 2, 1, 2, 1]
+    assert scaled["id"].is_unique
+
+
+def test_every_case_runs_on_a_small_batch():
+    cases = bench.cases()
+    assert "ingest_postgres" not in cases            # only with --db
+    for name, case in cases.items():
+        result = bench.measure(case, 20, repeat=1)
+        assert result["seconds"] > 0 and result["peak_mb"] >= 0, name
+
+
+def test_regressions_compare_with_the_latest_saved_run(tmp_path):
+    path = str(tmp_path / "bench_results.json")
+    bench.save_run({"map_csv@10": {"seconds": 2.0}, "map_oecd@10": {"seconds": 1.0}}, path)
+    bench.save_run({"map_csv@10": {"seconds": 1.0}}, path)
+    history = bench.load_results(path)
+    current = {"map_csv@10": {"seconds": 1.2}, "map_oecd@10": {"seconds": 1.1}, "map_json@10": {"seconds": 9.0}}
+    assert bench.regressions(current, history, 1.15) == [("map_csv@10", 1.2)]
@@ -0,0 +1,84 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from scrappers import bii_scraper
+
+
+class _Bii(BaseHTTPRequestHandler):
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        time.sleep(0.1)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        if "cf_clearance=solved" not in (self.headers.get("Cookie") or ""):
+            body, ctype = b"<html>Just a moment...</html>", "text/html"
+        elif self.path == "/export/underlying":
+            body, ctype = b"<!doctype html><p>error</p>", "text/html; charset=utf-8"
+        else:
+            body, ctype = f"Name,Country\n{form['export'][0]},{form['country'][0]}\n".encode(), "text/csv"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Driver:
+    """Search results page: three export forms and a solved challenge cookie."""
+
+    current_url = "https://www.bii.co.uk/en/our-impact/search-results/"
+
+    def __init__(self, base):
+        self.base = base
+
+    def find_element(self, by, xpath):
+        return xpath.split('"')[1].replace("tab-", "")
+
+    def execute_script(self, script, tab=None):
+        if tab is None:
+            return "Mozilla/5.0 Chrome/137"
+        return {"action": f"{self.base}/export/{tab}", "method": "post",
+                "fields": [["country", "Nigeria"], ["export", tab]]}
+
+    def get_cookies(self):
+        return [{"name": "cf_clearance", "value": "solved", "domain": "127.0.0.1", "path": "/"}]
+
+
+@pytest.fixture
+def bii(tmp_path, monkeypatch):
+    monkeypatch.setattr(bii_scraper, "DOWNLOAD_PATH", tmp_path)
+    monkeypatch.setattr(bii_scraper, "ARCHIVE_PATH", tmp_path / "archive")
+    _Bii.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Bii)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield _Driver(f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+def test_exports_run_concurrently_with_browser_cookies(bii, tmp_path):
+    filters = {"country": "Nigeria", "sector": "Health"}
+    done = bii_scraper._download_tabs_fast(bii, filters)
+
+    assert set(done) == {"direct", "funds"}                  # underlying answered HTML → browser fallback
+    assert _Bii.peak == 3
+    written = {p.name.split("_")[2]: p for p in tmp_path.glob("*.csv")}
+    assert set(written) == {"direct", "funds"} and all(p.name.startswith("nigeria_health_") for p in written.values())
+    assert written["funds"].read_text() == "Name,Country\nfunds,Nigeria\n"
+    assert not list(tmp_path.glob("*.part"))
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+import browser
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser, "DRIVER_CACHE_DIR", str(tmp_path / "drivers"))
+    monkeypatch.setenv("AID_CHROME_VERSION", "137.0.7151.69")
+    monkeypatch.delenv("AID_CHROMEDRIVER", raising=False)
+    browser.reset()
+    yield tmp_path
+    browser.reset()
+
+
+def _fake_driver(tmp_path):
+    path = tmp_path / "downloaded-chromedriver"
+    path.write_bytes(b"\x7fELF fake driver")
+    return str(path)
+
+
+def test_driver_is_downloaded_once_then_served_from_the_cache(cache, monkeypatch):
+    downloads = []
+    monkeypatch.setattr(browser, "_download", lambda: downloads.append(1) or _fake_driver(cache))
+
+    path = browser.chromedriver_path()
+    assert path == os.path.join(str(cache / "drivers"), "137", browser.DRIVER_NAME)
+    assert open(path, "rb").read() == b"\x7fELF fake driver" and os.access(path, os.X_OK)
+
+    browser.reset()                                     # a new process: cache hit, no network
+    assert browser.chromedriver_path() == path
+    assert downloads == [1]
+
+
+def test_offline_never_downloads(cache, monkeypatch):
+    monkeypatch.setattr(browser, "OFFLINE", True)
+    monkeypatch.setattr(browser, "_download", lambda: pytest.fail("downloaded while offline"))
+    with pytest.raises(browser.DriverUnavailable):
+        browser.chromedriver_path()
+
+    browser.provision(_fake_driver(cache))              # `python browser.py provision --from ...`
+    assert os.path.exists(browser.chromedriver_path())
+
+
+def test_undetected_copy_is_separate_and_reused(cache, monkeypatch):
+    browser.provision(_fake_driver(cache))
+    args = browser.undetected_driver_args()
+    assert args["version_main"] == 137
+    assert args["driver_executable_path"] != browser.chromedriver_path()
+
+    with open(args["driver_executable_path"], "ab") as f:   # uc patches its copy in place
+        f.write(b" patched")
+    browser.reset()
+    assert open(browser.undetected_driver_path(), "rb").read().endswith(b" patched")
+    assert not open(browser.chromedriver_path(), "rb").read().endswith(b" patched")
+
+
+class _Options:
+    """The part of selenium's ChromeOptions the profile touches."""
+
+    def __init__(self):
+        self.arguments, self.experimental_options, self.page_load_strategy = [], {}, "normal"
+
+    def add_argument(self, argument):
+        self.arguments.append(argument)
+
+    def add_experimental_option(self, name, value):
+        self.experimental_options[name] = value
+
+
+class _Driver:
+    def __init__(self):
+        self.cdp, self.visited = [], []
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def execute_script(self, script):
+        return 12345
+
+
+def test_fast_profile_keeps_scraper_prefs_and_blocks_resources(monkeypatch, tmp_path):
+    monkeypatch.setattr(browser, "PROFILE", "fast")
+    monkeypatch.setattr(browser, "HEADLESS", True)
+    monkeypatch.setattr(browser, "BROWSER_CACHE_DIR", str(tmp_path))
+    options = _Options()
+    options.add_argument("--window-size=1920x1080")                  # malformed: Chrome ignores it
+    options.add_experimental_option("prefs", {"download.default_directory": "/downloads"})
+
+    browser.apply_profile(options, "oecd")
+    assert {"--headless=new", "--window-size=1920,1080", "--disable-extensions",
+            f"--disk-cache-dir={tmp_path / 'oecd'}"} <= set(options.arguments)
+    assert options.page_load_strategy == "eager"
+    assert options.experimental_options["prefs"] == {
+        "download.default_directory": "/downloads", "profile.managed_default_content_settings.images": 2}
+
+    driver = browser.prepare_driver(_Driver())
+    assert driver.cdp[-1] == ("Network.setBlockedURLs", {"urls": list(browser.BLOCKED_URLS)})
+
+
+def test_full_profile_leaves_options_alone_but_still_times_pages(monkeypatch, tmp_path):
+    import telemetry
+
+    monkeypatch.setattr(browser, "PROFILE", "full")
+    monkeypatch.setattr(telemetry, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    options = _Options()
+    assert browser.apply_profile(options, "bii").arguments == []
+
+    driver = browser.prepare_driver(_Driver())
+    driver.get("https://www.bii.co.uk/en/our-impact/search-results/")
+    assert driver.cdp == [] and driver.visited == ["https://www.bii.co.uk/en/our-impact/search-results/"]
+    assert '"name": "page"' in (tmp_path / "traces.jsonl").read_text()
+    assert telemetry.summarise(str(tmp_path / "traces.jsonl"))[("-", "page")]["bytes"] == 12345
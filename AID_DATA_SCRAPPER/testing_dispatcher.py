@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+import dispatcher
+from source_registry import SOURCE_REGISTRY, SourcePlugin
+
+
+@pytest.fixture
+def fake_sources(monkeypatch):
+    calls = []
+    plugins = {
+        "slow_browser": SourcePlugin("slow_browser", run=lambda f: calls.append("slow_browser"),
+                                     needs_browser=True, expected_seconds=900),
+        "fast_browser": SourcePlugin("fast_browser", run=lambda f: calls.append("fast_browser"),
+                                     needs_browser=True, expected_seconds=60),
+        "api": SourcePlugin("api", run=lambda f: calls.append("api"), cacheable=True),
+    }
+    monkeypatch.setattr(dispatcher, "get_source", plugins.get)
+    monkeypatch.setattr(dispatcher, "_completed_runs", {})
+    return calls
+
+
+def test_builtin_sources_are_registered():
+    for name in ("fcdo", "iati", "worldbank", "foreignassistance", "ghed", "sdg", "oecd", "bii"):
+        assert name in SOURCE_REGISTRY
+
+
+def test_plan_splits_by_browser_and_orders_by_cost(fake_sources):
+    browser, api, unknown = dispatcher.plan(["slow_browser", "api", "fast_browser", "nope"])
+    assert [p.name for p in browser] == ["fast_browser", "slow_browser"]
+    assert [p.name for p in api] == ["api"]
+    assert unknown == ["nope"]
+
+
+def test_cacheable_source_is_skipped_on_repeat(fake_sources):
+    first = dispatcher.dispatch(["api"], {"country": "Nigeria"})
+    second = dispatcher.dispatch(["api"], {"country": "Nigeria"})
+    forced = dispatcher.dispatch(["api"], {"country": "Nigeria"}, use_cache=False)
+    assert first["api"]["status"] == "ok"
+    assert second["api"]["status"] == "cached"
+    assert forced["api"]["status"] == "ok"
+    assert fake_sources == ["api", "api"]
+
+
+def test_failing_source_does_not_stop_the_payload(fake_sources, monkeypatch):
+    def boom(filters):
+        raise RuntimeError("site down")
+    broken = SourcePlugin("broken", run=boom, needs_browser=True)
+    monkeypatch.setattr(dispatcher, "get_source", {"broken": broken, "api": dispatcher.get_source("api")}.get)
+    results = dispatcher.dispatch(["broken", "api"], {})
+    assert results["broken"] == {"status": "error", "error": "site down", "seconds": 0.0}
+    assert results["api"]["status"] == "ok"
+
+
+def _concurrently(*payloads):
+    threads = [threading.Thread(target=dispatcher.dispatch, args=payload) for payload in payloads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_identical_concurrent_payloads_run_a_source_once(fake_sources, monkeypatch):
+    slow = SourcePlugin("api", run=lambda f: time.sleep(0.1) or fake_sources.append("api"), cacheable=True)
+    monkeypatch.setattr(dispatcher, "get_source", {"api": slow}.get)
+    _concurrently(*[(["api"], {"country": "Nigeria"})] * 3)
+    assert fake_sources == ["api"]
+
+
+def test_browser_slots_and_source_folders_are_shared_across_payloads(monkeypatch):
+    running, peak, lock = {}, {"all": 0, "iati": 0}, threading.Lock()
+
+    def browser_source(name):
+        def scrape(filters):
+            with lock:
+                running[name] = running.get(name, 0) + 1
+                peak["all"] = max(peak["all"], sum(running.values()))
+                peak["iati"] = max(peak["iati"], running.get("iati", 0))
+            time.sleep(0.1)
+            with lock:
+                running[name] -= 1
+        return SourcePlugin(name, run=scrape, needs_browser=True)
+
+    monkeypatch.setattr(dispatcher, "get_source", {n: browser_source(n) for n in ("iati", "oecd", "bii")}.get)
+    monkeypatch.setattr(dispatcher, "_browser_slots", threading.BoundedSemaphore(2))
+    _concurrently((["iati"], {}), (["oecd"], {}), (["bii"], {}), (["iati"], {"country": "Kenya"}))
+    assert peak == {"all": 2, "iati": 1}
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from utils import ghed_excel
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    return ghed_excel.write_synthetic_workbook(str(tmp_path / "ghed.xlsx"), rows=50, extra_columns=5)
+
+
+def test_stream_reader_only_returns_mapped_columns(workbook):
+    raw = ghed_excel.read_with_openpyxl_stream(workbook)
+    assert len(raw) == 50
+    assert set(raw.columns) <= set(ghed_excel.GHED_COLUMN_MAPPING)
+    assert not any(c.startswith("indicator_") for c in raw.columns)
+
+
+def test_to_standard_types(workbook):
+    df = ghed_excel.to_standard(ghed_excel.read_with_openpyxl_stream(workbook))
+    assert df["year_active"].dtype == "Int64"
+    assert df["beneficiary_count"].dtype == "Int64"
+    assert pd.api.types.is_float_dtype(df["total_commitment_usd"])
+    assert df.loc[1, "country_code"] == "C001"
+
+
+def test_fast_path_matches_legacy_values(workbook):
+    legacy = ghed_excel.to_standard(ghed_excel.read_legacy(workbook))
+    fast = ghed_excel.to_standard(ghed_excel.read_data_sheet(workbook))
+    pd.testing.assert_frame_equal(fast.reset_index(drop=True), legacy.reset_index(drop=True))
+
+
+def test_calamine_matches_stream(workbook):
+    pytest.importorskip("python_calamine")
+    a = ghed_excel.to_standard(ghed_excel.read_with_calamine(workbook))
+    b = ghed_excel.to_standard(ghed_excel.read_with_openpyxl_stream(workbook))
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_cache_hit_skips_parsing(workbook, tmp_path, monkeypatch):
+    cache = str(tmp_path / "cache")
+    first = ghed_excel.load_ghed_frame(workbook, cache)
+
+    def no_parse(path):
+        raise AssertionError("workbook parsed again")
+    monkeypatch.setattr(ghed_excel, "read_data_sheet", no_parse)
+    second = ghed_excel.load_ghed_frame(workbook, cache)
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), second.reset_index(drop=True))
+
+
+def test_mapping_change_misses_the_cache(tmp_path, monkeypatch):
+    workbook = tmp_path / "ghed.xlsx"
+    workbook.write_bytes(b"same download")
+    cache = str(tmp_path / "cache")
+    monkeypatch.setattr(ghed_excel, "read_data_sheet", lambda path: pd.DataFrame({"code": ["NGA"], "year": [2020]}))
+    ghed_excel.load_ghed_frame(str(workbook), cache)
+
+    monkeypatch.setattr(ghed_excel, "GHED_FRAME_VERSION", ghed_excel.GHED_FRAME_VERSION + 1)
+    monkeypatch.setattr(ghed_excel, "read_data_sheet", lambda path: pd.DataFrame({"code": ["KEN"], "year": [2021]}))
+    assert ghed_excel.load_ghed_frame(str(workbook), cache)["country_code"].tolist() == ["KEN"]
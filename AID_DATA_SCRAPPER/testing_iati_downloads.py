@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote_plus
+
+import pytest
+
+from scrappers import iati_scrapper
+
+
+class _DPortal(BaseHTTPRequestHandler):
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.in_flight -= 1
+        if "missing" in self.path:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f"iati-identifier\n{self.path.split('aid=')[1]}\n".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def d_portal():
+    _DPortal.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DPortal)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/q.csv?aid="
+    server.shutdown()
+    server.server_close()
+
+
+def test_csvs_download_concurrently_and_atomically(d_portal, tmp_path):
+    links = {aid: f"{d_portal}{aid}" for aid in [f"GB-{i}" for i in range(12)] + ["missing"]}
+    paths = iati_scrapper.download_activity_csvs(links, str(tmp_path), workers=4)
+
+    # named after the activity id, not the (local) link it was fetched from
+    assert paths == [os.path.join(str(tmp_path), iati_scrapper.activity_csv_filename(aid))
+                     for aid in list(links)[:-1]]
+    assert open(paths[3]).read() == "iati-identifier\nGB-3\n"
+    assert 1 < _DPortal.peak <= 4
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in paths)   # no .part left
+
+
+class _TableDriver:
+    def __init__(self, refs):
+        self.refs = refs
+
+    def find_element(self, by, xpath):
+        return "table"
+
+    def execute_script(self, script, table):
+        return self.refs
+
+
+def test_activity_ids_become_csv_links():
+    driver = _TableDriver(["https://d-portal.org/ctrack.html#view=act&aid=US-GOV-1-72062018F00006",
+                           "aid=DAC-1601-INV-049397", "https://d-portal.org/q.xml?aid=DAC-1601-INV-049397",
+                           "https://d-portal.org/ctrack.html#view=main"])
+    assert iati_scrapper._activity_links_from_table(driver) == {
+        "US-GOV-1-72062018F00006": "https://d-portal.org/q.csv?aid=US-GOV-1-72062018F00006",
+        "DAC-1601-INV-049397": "https://d-portal.org/q.csv?aid=DAC-1601-INV-049397",
+    }
+
+
+def test_table_and_row_links_share_the_archived_filename():
+    # the activity panel's CSV link, as earlier runs saved it: quote_plus(href).csv
+    panel_href = "https://d-portal.org/q.csv?aid=XM-DAC-41114-PROJECT-00123%2FA"
+    aid = iati_scrapper.activity_id(panel_href)
+    built = iati_scrapper._activity_links_from_table(_TableDriver(["aid=XM-DAC-41114-PROJECT-00123/A"]))
+
+    assert aid == "XM-DAC-41114-PROJECT-00123/A" and built == {aid: panel_href}
+    assert iati_scrapper.activity_csv_filename(aid) == f"{quote_plus(panel_href)}.csv"
+    assert "%252F" in iati_scrapper.activity_csv_filename(aid)
+    assert iati_scrapper.activity_csv_filename("US-GOV-1-72062018F00006") == \
+        f"{quote_plus('https://d-portal.org/q.csv?aid=US-GOV-1-72062018F00006')}.csv"
@@ -0,0 +1,32 @@
+import os
+
+from utils.import_time import measure_import
+
+# Cold-start budget for `import main` (cumulative, milliseconds). FastAPI
+# itself accounts for most of it; override on slow CI machines.
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+# Heavy per-source dependencies that must only load when a payload needs them
+LAZY_MODULES = (
+    "pandas",
+    "selenium",
+    "undetected_chromedriver",
+    "webdriver_manager",
+    "db_setup_and_ingest_org",
+    "scrappers.bii_scraper",
+    "scrappers.oecd_scrapper",
+)
+
+
+def test_main_import_does_not_load_scrapers():
+    timings = measure_import("main")
+    loaded = [m for m in LAZY_MODULES if m in timings]
+    assert not loaded, f"imported eagerly by main: {loaded}"
+
+
+def test_main_import_within_budget():
+    # best of three: the first run may still be compiling .pyc files
+    cumulative_ms = min(measure_import("main")["main"][1] for _ in range(3)) / 1000
+    assert cumulative_ms <= IMPORT_BUDGET_MS, (
+        f"import main took {cumulative_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+    )
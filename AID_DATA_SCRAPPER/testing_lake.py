@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import lake
+
+
+def _batch():
+    return pd.DataFrame({
+        "project_id": ["A-1", "A-2", "B-1"],
+        "source": ["IATI", "IATI", "FCDO"],
+        "country": ["Nigeria", "Nigeria", None],
+        "year_active": [2019, "2020", None],
+        "funding_amount_usd": ["1500.5", 200, None],
+        "start_date": ["2019-01-01", None, "2020-06-30"],
+        "last_updated": ["2024-01-01T10:00:00Z", None, "2024-02-01"],
+        "not_a_project_data_column": 1,
+    })
+
+
+def test_conform_matches_project_data_schema():
+    table = lake.conform(_batch())
+    assert table.schema == lake.get_schema()
+    assert table.schema.field("year_active").type == pa.int32()
+    assert table.schema.field("sector").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("source").type == pa.string()                 # partition key
+    assert table.column("year_active").to_pylist() == [2019, 2020, None]
+    assert table.column("funding_amount_usd").to_pylist() == [1500.5, 200.0, None]
+    assert "not_a_project_data_column" not in table.schema.names
+
+
+def test_write_batch_partitions_and_reads_back(tmp_path):
+    files = lake.write_batch(_batch(), str(tmp_path))
+    assert len(files) == 3
+    assert os.path.isdir(tmp_path / "source=IATI" / "country=Nigeria" / "year_active=2019")
+
+    back = lake.read_lake(str(tmp_path)).sort_values("project_id").reset_index(drop=True)
+    assert list(back["project_id"]) == ["A-1", "A-2", "B-1"]
+    assert list(back["source"]) == ["IATI", "IATI", "FCDO"]
+    assert back.loc[2, "country"] is None or pd.isna(back.loc[2, "country"])
+    assert lake.stats(str(tmp_path)) == {"IATI": 2, "FCDO": 1}
+
+
+def test_scan_filters_by_source(tmp_path):
+    lake.write_batch(_batch(), str(tmp_path))
+    rows = sum(b.num_rows for b in lake.scan(str(tmp_path), sources=["FCDO"]))
+    assert rows == 1
+    assert list(lake.scan(str(tmp_path / "missing"))) == []
+
+
+def test_drop_projects_removes_superseded_versions_only(tmp_path):
+    lake.write_batch(_batch(), str(tmp_path))
+    newer = pd.DataFrame({"project_id": ["A-1", "B-1"], "source": ["IATI", "IATI"]})     # B-1 is FCDO's
+
+    assert lake.drop_projects(newer, str(tmp_path)) == 1
+    back = lake.read_lake(str(tmp_path))
+    assert sorted(back["project_id"]) == ["A-2", "B-1"]
+    assert not os.path.isdir(tmp_path / "source=IATI" / "country=Nigeria" / "year_active=2019") or \
+        not os.listdir(tmp_path / "source=IATI" / "country=Nigeria" / "year_active=2019")
+
+
+def test_truncate_is_refused_until_the_lake_is_backfilled(tmp_path):
+    lake.write_batch(_batch(), str(tmp_path))
+    with pytest.raises(lake.LakeIncomplete):
+        lake.rebuild_project_data(None, str(tmp_path), truncate=True)
+    with pytest.raises(lake.LakeIncomplete):
+        lake.rebuild_project_data(None, str(tmp_path), sources=["IATI"], truncate=True)
+
+
+def test_backfill_replaces_the_lake_with_project_data(tmp_path):
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    lake.conform(_batch()).to_pandas().assign(id=[1, 2, 3]).to_sql("project_data", engine, index=False)
+    lake_dir = str(tmp_path / "lake")
+    lake.write_batch(_batch().assign(project_id=["X-1", "X-2", "X-3"]), lake_dir)   # replaced, not merged
+
+    assert lake.backfill(engine, lake_dir) == 3
+    assert sorted(lake.read_lake(lake_dir)["project_id"]) == ["A-1", "A-2", "B-1"]
+    assert lake.is_backfilled(lake_dir) and sorted(os.listdir(tmp_path)) == ["db.sqlite", "lake"]
+
+
+def test_failed_landing_clears_the_backfill_mark(tmp_path, monkeypatch):
+    monkeypatch.setattr(lake, "LAKE_DIR", str(tmp_path))
+    open(tmp_path / lake.BACKFILL_MARKER, "w").close()
+    monkeypatch.setattr(lake, "write_batch", lambda df: 1 / 0)
+    lake.land(_batch())
+    assert not lake.is_backfilled(str(tmp_path))
@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+
+from db_setup_and_ingest_org import map_oecd_to_standard, read_oecd_csv
+from schema_contract import coerce
+
+CSV = """STRUCTURE,STRUCTURE_ID,REF_AREA,Reference area,FREQ,TIME_PERIOD,MEASURE,OBS_VALUE,AGE,SEX,UNMAPPED
+DATAFLOW,OECD.DCD:DF_CRS(1.0),NGA,Nigeria,A,2015,M1,1.5,Y0T14,F,x
+DATAFLOW,OECD.DCD:DF_CRS(1.0),NGA,Nigeria,Q,2016-Q2,M1,2,,M,x
+DATAFLOW,OECD.DCD:DF_CRS(1.0),GHA,Ghana,A,,M2,,Y15T64,,x
+DATAFLOW,OECD.DCD:DF_CRS(1.0),GHA,Ghana,M,2019-03,M2,..,,,x
+"""
+
+
+def test_sdmx_columns_are_read_as_categoricals():
+    df = read_oecd_csv(io.StringIO(CSV))
+    assert "UNMAPPED" not in df.columns
+    assert isinstance(df["REF_AREA"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["OBS_VALUE"].dtype, pd.CategoricalDtype)
+
+
+def test_dimensions_join_and_periods_parse_per_distinct_value():
+    mapped = map_oecd_to_standard(read_oecd_csv(io.StringIO(CSV)))
+    assert mapped["beneficiary_disaggregation"].tolist()[:3] == ["Y0T14 F", "M", "Y15T64"]
+    assert pd.isna(mapped["beneficiary_disaggregation"][3])
+    assert mapped["year_active"].tolist() == [2015, 2016, pd.NA, 2019]
+    assert mapped["outcome_indicator_value"].dtype == "float64"          # ".." (not available) → NaN
+    assert mapped["source"].eq("OECD").all()
+
+    frame, reasons = coerce(mapped, complete=True)
+    assert reasons.eq("").all()
+    assert frame["country_code"].tolist() == ["NGA", "NGA", "GHA", "GHA"]
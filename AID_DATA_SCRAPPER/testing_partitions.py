@@ -0,0 +1,25 @@
+import pandas as pd
+
+from partitions import DEFAULT_PARTITION, SHADOW_TABLE, partition_years, shadow_statements, swap_statements
+
+
+def test_partition_years_match_stored_values():
+    df = pd.DataFrame({"year_active": [2020, "2021", None, 2020.0, "n/a"]})
+    assert partition_years(df) == {2020, 2021}
+    assert partition_years(pd.DataFrame({"donor": ["A"]})) == set()
+
+
+def test_shadow_partitions_carry_their_bounds():
+    statements = "\n".join(shadow_statements([2021, 2020, 2021, 1066]))
+    assert f"{SHADOW_TABLE}_y2020 PARTITION OF {SHADOW_TABLE} FOR VALUES FROM (2020) TO (2021)" in statements
+    assert "year_active >= 2021 AND year_active < 2022" in statements
+    assert "y1066" not in statements                # implausible years stay in the default partition
+
+
+def test_swap_detaches_every_live_partition_before_attaching():
+    statements = swap_statements(["project_facts_y2019", DEFAULT_PARTITION], [2020])
+    detach_live = [i for i, s in enumerate(statements) if s.startswith("ALTER TABLE project_facts DETACH")]
+    attach = [i for i, s in enumerate(statements) if "ATTACH PARTITION" in s]
+    assert len(detach_live) == 2 and max(detach_live) < min(attach)
+    assert "ALTER TABLE project_facts ATTACH PARTITION project_facts_y2020 FOR VALUES FROM (2020) TO (2021)" in statements
+    assert statements[-2] == f"ALTER TABLE project_facts ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
@@ -0,0 +1,114 @@
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import replay
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = f"payload for {self.path}".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    replay.STATS.clear()
+    yield str(tmp_path)
+    replay.uninstall()
+
+
+def test_requests_are_recorded_then_replayed_offline(fixtures):
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{upstream.server_address[1]}/data"
+
+    replay.install("record", fixtures, passthrough=())
+    assert requests.get(url, params={"b": 2, "a": 1}).text == "payload for /data?b=2&a=1"
+    upstream.shutdown()
+    upstream.server_close()
+
+    replay.install("replay", fixtures, passthrough=())
+    response = requests.get(url, params={"a": 1, "b": 2})          # same request, other query order
+    assert response.status_code == 200 and response.text == "payload for /data?b=2&a=1"
+    with pytest.raises(requests.ConnectionError):
+        requests.get(url, params={"a": 3})
+    assert (replay.STATS["recorded"], replay.STATS["hits"], replay.STATS["misses"]) == (1, 1, 1)
+
+
+def test_stub_server_answers_chrome_by_host_over_http(fixtures):
+    page = b'<a href="https://devtracker.example.org/projects/GB-1">GB-1</a>'
+    replay.install("replay", fixtures)
+    replay.save("GET", "https://devtracker.example.org/department/FCDO?x=1",
+                200, {"Content-Type": "text/html", "Content-Encoding": "gzip"}, page)
+
+    port = replay._server.server_address[1]
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/department/FCDO?x=1",
+                                     headers={"Host": "devtracker.example.org"})
+    with urllib.request.urlopen(request) as response:
+        assert response.headers.get("Content-Encoding") is None
+        assert response.read() == page.replace(b"https://", b"http://")
+    with pytest.raises(urllib.error.HTTPError) as missing:
+        urllib.request.urlopen(urllib.request.Request(f"http://127.0.0.1:{port}/other",
+                                                      headers={"Host": "devtracker.example.org"}))
+    assert missing.value.code == 404
+
+
+def test_replay_caps_sleeps_and_counts_the_rest(fixtures):
+    replay.install("replay", fixtures)
+    started = time.perf_counter()
+    time.sleep(3)
+    assert time.perf_counter() - started < 1
+    assert replay.STATS["sleep_skipped_s"] == pytest.approx(3 - replay.MAX_SLEEP)
+    replay.uninstall()
+    assert time.sleep is replay._real_sleep
+
+
+def test_no_ingest_also_covers_scrapers_that_import_ingest_data(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    import db_setup_and_ingest_org
+    import source_registry
+    from scrappers import sdgs_scraper                        # imported before the run, e.g. by the API
+
+    class _Response:
+        content = b"{}"
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": [{"value": "1.5", "timePeriodStart": 2020, "geoAreaCode": 566,
+                              "geoAreaName": "Nigeria", "indicator": ["3.1.1"]}]}
+
+    class _Plugin:
+        def run(self, filters):
+            df = sdgs_scraper.run_sdg_scraper("3.1.1", 566, 2020, 2020)
+            sys.modules["by_name"].ingest_data(df)
+
+    def write(*args, **kwargs):
+        pytest.fail("wrote to the DB")
+
+    monkeypatch.setattr(db_setup_and_ingest_org, "ingest_data", write)
+    monkeypatch.setitem(sys.modules, "by_name", types.SimpleNamespace(ingest_data=write))  # `from db_... import`
+    monkeypatch.setattr(source_registry, "get_source", lambda name: _Plugin())
+    monkeypatch.setattr(requests, "get", lambda *a, **kw: _Response())
+    monkeypatch.setattr(sdgs_scraper, "DOWNLOAD_DIR", tmp_path)
+    monkeypatch.setattr(sdgs_scraper, "ARCHIVE_DIR", tmp_path / "archive")
+    (tmp_path / "archive").mkdir()
+
+    replay.run_source("sdg", {}, ingest=False)
+    assert len(list((tmp_path / "archive").glob("sdg_3.1.1_566_2020_2020_*.csv"))) == 1
+    assert db_setup_and_ingest_org.ingest_data is write and sys.modules["by_name"].ingest_data is write
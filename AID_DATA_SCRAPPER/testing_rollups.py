@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+import rollups
+from rollups import _key_predicate, affected_keys
+
+
+def test_affected_keys_match_stored_values():
+    df = pd.DataFrame({
+        "year_active": [2020, "2021", None, 2020.0, "n/a"],
+        "country": ["Kenya", "Chad", "Kenya", "Kenya", None],
+    })
+    assert affected_keys(df) == {(2020, "Kenya"), (2021, "Chad"), (None, "Kenya"), (None, None)}
+
+
+def test_affected_keys_without_key_columns():
+    assert affected_keys(pd.DataFrame({"donor": ["A", "B"]})) == {(None, None)}
+    assert affected_keys(pd.DataFrame()) == set()
+
+
+def test_key_predicate_uses_is_null_for_missing_parts():
+    params = {}
+    where = _key_predicate([(2020, "Kenya"), (None, "Chad"), (2019, None)], params)
+    assert where == ("(year_active = :y0 AND country = :c0) OR "
+                     "(year_active IS NULL AND country = :c1) OR "
+                     "(year_active = :y2 AND country IS NULL)")
+    assert params == {"y0": 2020, "c0": "Kenya", "c1": "Chad", "y2": 2019}
+
+
+class _Engine:
+    """Records what each transaction executes; *fail* statements raise."""
+
+    def __init__(self, *fail):
+        self.fail, self.executed = fail, []
+
+    def begin(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        if any(f in str(statement) for f in self.fail):
+            raise RuntimeError("deadlock detected")
+        self.executed.append((str(statement), params))
+
+
+def test_failed_refresh_marks_the_rollups_stale():
+    engine = _Engine("pg_advisory_xact_lock")
+    rollups.refresh_after_ingest(engine, pd.DataFrame({"year_active": [2020], "country": ["Kenya"]}))
+    assert engine.executed == [(rollups.MARK_STALE_SQL, {"error": "deadlock detected"})]
+
+
+def test_refresh_fails_the_ingest_when_staleness_cannot_be_recorded():
+    with pytest.raises(RuntimeError):
+        rollups.refresh_after_ingest(_Engine("pg_advisory_xact_lock", "rollup_state"),
+                                     pd.DataFrame({"year_active": [2020], "country": ["Kenya"]}))
+
+
+def test_only_a_full_rebuild_clears_the_stale_mark():
+    keyed, full = _Engine(), _Engine()
+    rollups.refresh_rollups(keyed, [(2020, "Kenya")])
+    rollups.refresh_rollups(full)
+    assert not any("rollup_state" in sql for sql, _ in keyed.executed)
+    assert full.executed[-1][0] == "DELETE FROM rollup_state"
@@ -0,0 +1,100 @@
+import csv
+import datetime
+import io
+
+import pandas as pd
+
+from schema_contract import coerce, column_spec, encode_categories, enforce, memory_report
+
+
+def _batch():
+    return pd.DataFrame({
+        "project_id": ["A-1", "A-2", "A-3"],
+        "year_active": ["2020", 2021.0, "n/a"],
+        "latitude": ["9.05", " ", "north"],
+        "start_date": ["2020-01-01", "02/03/2021", None],
+        "last_updated": ["2024-01-01T10:00:00Z", None, "2024-02-01"],
+        "women_reached_pct": [12.5, None, "40%"],
+        "not_a_project_data_column": 1,
+    })
+
+
+def test_spec_follows_create_table_sql():
+    spec = {c.name: c.dtype for c in column_spec()}
+    assert spec["year_active"] == "Int32"
+    assert spec["number_reached"] == "Int64"
+    assert spec["latitude"] == "float64"
+    assert spec["start_date"] == "date32[pyarrow]"
+    assert spec["last_updated"] == "datetime64[us]"
+    assert spec["women_reached_pct"] == "string"
+    assert spec["sector"] == "category"
+
+
+def test_coerce_casts_every_column_in_one_pass():
+    frame, reasons = coerce(_batch())
+    assert str(frame["year_active"].dtype) == "Int32"
+    assert frame["year_active"].tolist()[:2] == [2020, 2021]
+    assert frame["latitude"].iloc[0] == 9.05 and pd.isna(frame["latitude"].iloc[1])     # blank → null
+    assert frame["start_date"].tolist()[:2] == [datetime.date(2020, 1, 1), datetime.date(2021, 2, 3)]
+    assert frame["last_updated"].iloc[0] == pd.Timestamp("2024-01-01 10:00")
+    assert frame["women_reached_pct"].tolist()[0] == "12.5"
+    assert "not_a_project_data_column" not in frame.columns
+    assert reasons.tolist() == ["", "", "invalid year_active, latitude"]
+
+
+def test_enforce_drops_rejected_rows_only():
+    out = enforce(_batch())
+    assert out["project_id"].tolist() == ["A-1", "A-2"]
+    big = enforce(pd.DataFrame({"project_id": ["B"], "year_active": [2 ** 40]}))
+    assert big.empty                                   # INTEGER out of range
+
+
+def test_low_cardinality_columns_stay_categorical():
+    mapped = encode_categories(pd.DataFrame({
+        "project_id": ["A-1", "A-2", "A-3", "A-4"],
+        "sector": ["Health", " ", "Health", None],
+        "country": [["Nigeria"], None, None, None],               # not hashable: left to the contract
+        "region": [None, None, None, None],                        # df.get() of a missing IATI column
+    }))
+    assert isinstance(mapped["sector"].dtype, pd.CategoricalDtype)
+    assert not isinstance(mapped["project_id"].dtype, pd.CategoricalDtype)
+
+    frame, _ = coerce(mapped)
+    assert list(frame["sector"].cat.categories) == ["Health"]        # blank category dropped
+    assert frame["sector"].isna().tolist() == [False, True, False, True]
+    assert isinstance(frame["country"].dtype, pd.CategoricalDtype)
+    assert frame["region"].isna().all() and list(frame["region"].cat.categories) == []
+    assert str(frame["project_id"].dtype) == "string"
+
+    report = memory_report(frame)
+    assert report.at["sector", "plain"] > report.at["sector", "encoded"]
+
+
+def test_coerced_batch_copies_into_the_stage_with_nulls_as_empty_fields():
+    import db_setup_and_ingest_org as db
+
+    copied = {}
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def copy_expert(self, sql, buf):
+            copied.update(sql=sql, rows=list(csv.reader(io.StringIO(buf.read()))))
+
+    class _Conn:
+        class connection:
+            cursor = _Cursor
+
+    frame, _ = coerce(encode_categories(_batch().assign(sector=["Health", None, "Health"])))
+    db._copy_to_stage(_Conn(), frame)
+
+    header, *rows = copied["rows"]
+    assert copied["sql"].startswith("COPY project_data_stage (") and '"project_id"' in copied["sql"]
+    assert len(rows) == 3 and len(header) == len(frame.columns)
+    first = dict(zip(header, rows[0]))
+    assert (first["year_active"], first["start_date"], first["sector"]) == ("2020", "2020-01-01", "Health")
+    assert dict(zip(header, rows[1]))["sector"] == "" and dict(zip(header, rows[2]))["year_active"] == ""
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import dispatcher
+import telemetry
+from source_registry import SourcePlugin
+from telemetry import span
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(telemetry, "TRACE_FILE", str(path))
+    telemetry.reset_metrics()
+    yield path
+    telemetry.reset_metrics()
+
+
+def _spans(path):
+    return {s["name"]: s for s in map(json.loads, path.read_text().splitlines())}
+
+
+def test_spans_inherit_source_and_run_id(trace_file):
+    with span("source", source="iati", scrape_run_id="run-1"):
+        with span("parse", rows_in=10, bytes=2048) as s:
+            s.add(rows_out=8)
+        with pytest.raises(ValueError):
+            with span("load"):
+                raise ValueError("bad row")
+
+    spans = _spans(trace_file)
+    assert spans["parse"]["source"] == "iati" and spans["parse"]["scrape_run_id"] == "run-1"
+    assert spans["parse"]["parent_id"] == spans["source"]["span_id"]
+    assert spans["parse"]["trace_id"] == spans["source"]["trace_id"]
+    assert (spans["parse"]["rows_in"], spans["parse"]["rows_out"], spans["parse"]["bytes"]) == (10, 8, 2048)
+    assert spans["load"]["status"] == "error" and "ValueError: bad row" in spans["load"]["stacktrace"]
+
+
+def test_dispatch_parents_worker_spans_to_the_payload(trace_file, monkeypatch):
+    def run(filters):
+        with span("download") as s:
+            s.add(bytes=100)
+            telemetry.add(retries=1)
+
+    plugin = SourcePlugin("fake", run=run, needs_browser=True)
+    monkeypatch.setattr(dispatcher, "get_source", {"fake": plugin}.get)
+    assert dispatcher.dispatch(["fake"], {}, scrape_run_id="run-2")["fake"]["status"] == "ok"
+
+    spans = _spans(trace_file)
+    assert spans["source"]["parent_id"] == spans["payload"]["span_id"]
+    assert spans["download"]["source"] == "fake" and spans["download"]["scrape_run_id"] == "run-2"
+    assert telemetry.summarise(str(trace_file), "run-2")[("fake", "download")]["retries"] == 1
+
+
+def test_prometheus_text_per_source_and_stage(trace_file):
+    with span("parse", source="oecd", rows_in=5):
+        pass
+    text = telemetry.prometheus_text()
+    assert 'aid_ingest_stage_runs_total{source="oecd",stage="parse",status="ok"} 1' in text
+    assert 'aid_ingest_rows_in_total{source="oecd",stage="parse"} 5' in text
+    assert 'aid_ingest_stage_duration_seconds_bucket{source="oecd",stage="parse",le="+Inf"} 1' in text
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from watermarks import WatermarkRun, rows_changed_since, solr_since_filter, watermark_key
+
+
+def test_watermark_key_ignores_filter_order():
+    a = watermark_key("fcdo", {"country": "Kenya", "sector": "Health"})
+    b = watermark_key("fcdo", {"sector": "Health", "country": "Kenya"})
+    assert a == b
+    assert a[1] != watermark_key("fcdo", {"country": "Uganda", "sector": "Health"})[1]
+
+
+def test_rows_changed_since_keeps_only_newer_rows():
+    df = pd.DataFrame({
+        "project_id": ["old", "new", "undated"],
+        "last_updated": ["2024-01-01", "2024-06-01T10:00:00Z", None],
+    })
+    kept = rows_changed_since(df, pd.Timestamp("2024-03-01"))
+    assert list(kept["project_id"]) == ["new"]          # undated rows were stored by the earlier run
+    assert rows_changed_since(df, None) is df
+
+
+def test_solr_since_filter():
+    assert solr_since_filter(None) == ""
+    fq = solr_since_filter(pd.Timestamp("2024-03-01 12:30:00"))
+    assert fq == "&fq=last_updated_datetime%3A%7B2024-03-01T12%3A30%3A00Z%20TO%20%2A%5D"
+
+
+def test_run_without_key_never_touches_the_database():
+    def no_engine():
+        raise AssertionError("engine requested without a watermark key")
+
+    with WatermarkRun(None, no_engine) as wm:
+        wm.observe(pd.DataFrame({"last_updated": [pd.Timestamp("2024-01-01")]}))
+    assert wm.since is None
+    assert wm.newest == pd.Timestamp("2024-01-01")
+
+
+def test_failed_item_keeps_the_watermark(monkeypatch):
+    import watermarks
+
+    advanced = []
+    monkeypatch.setattr(watermarks, "get_watermark", lambda engine, key: pd.Timestamp("2024-01-01"))
+    monkeypatch.setattr(watermarks, "advance_watermark", lambda engine, key, newest: advanced.append(newest))
+    key = watermark_key("iati", {"country": "Kenya"})
+
+    with WatermarkRun(key, lambda: "engine") as wm:
+        wm.observe(pd.DataFrame({"last_updated": [pd.Timestamp("2024-06-01")]}))
+        wm.failed = True                                  # another file failed to parse
+    assert advanced == []
+
+    with WatermarkRun(key, lambda: "engine") as wm:
+        wm.observe(pd.DataFrame({"last_updated": [pd.Timestamp("2024-06-01")]}))
+    assert advanced == [pd.Timestamp("2024-06-01")]
+
+
+def test_first_keyed_worldbank_run_skips_archived_projects_and_seeds_the_watermark(tmp_path, monkeypatch):
+    import db_setup_and_ingest_org as db
+    import watermarks
+
+    archive = tmp_path / "world_bank_downloads" / "archive"
+    archive.mkdir(parents=True)
+    pd.DataFrame({"project_id": ["P1"], "last_updated": ["2024-05-01"]}).to_csv(archive / "NG_none_20240501_000000.csv")
+    monkeypatch.chdir(tmp_path)
+
+    class _Response:
+        content = b"{}"
+
+        def json(self):
+            return {"projects": {"P1": {"id": "P1", "countryname": ["Nigeria"], "countrycode": ["NG"],
+                                        "mjtheme_namecode": [], "sector1": {}, "boardapprovaldate": "2019-01-01",
+                                        "closingdate": "2025-01-01", "p2a_updated_date": "2024-05-01"}}}
+
+    advanced = []
+    monkeypatch.setattr(db.requests, "get", lambda url: _Response())
+    monkeypatch.setattr(db, "init_database", lambda: "engine")
+    monkeypatch.setattr(db, "ingest_data", lambda df, since=None: pytest.fail("archived projects re-ingested"))
+    monkeypatch.setattr(watermarks, "get_watermark", lambda engine, key: None)
+    monkeypatch.setattr(watermarks, "advance_watermark", lambda engine, key, newest: advanced.append(newest))
+
+    db.parse_worldbank_projects("NG", None, "", watermark_key=watermark_key("worldbank", {"country": "Nigeria"}))
+    assert advanced == [pd.Timestamp("2024-05-01")]
+    assert not list((tmp_path / "world_bank_downloads").glob("*.csv"))
+
+
+def test_worldbank_update_later_on_the_watermark_day_is_ingested(monkeypatch, tmp_path):
+    import db_setup_and_ingest_org as db
+    import watermarks
+
+    monkeypatch.chdir(tmp_path)
+
+    class _Response:
+        content = b"{}"
+
+        def json(self):
+            return {"projects": {"P1": {"id": "P1", "countryname": ["Nigeria"], "countrycode": ["NG"],
+                                        "mjtheme_namecode": [], "sector1": {}, "boardapprovaldate": "2019-01-01",
+                                        "closingdate": "2025-01-01", "p2a_updated_date": "2024-05-01 16:45:00"}}}
+
+    ingested = []
+    monkeypatch.setattr(db.requests, "get", lambda url: _Response())
+    monkeypatch.setattr(db, "init_database", lambda: "engine")
+    monkeypatch.setattr(db, "ingest_data", lambda df, since=None: ingested.append(rows_changed_since(df, since)))
+    monkeypatch.setattr(watermarks, "get_watermark", lambda engine, key: pd.Timestamp("2024-05-01 09:00:00"))
+    monkeypatch.setattr(watermarks, "advance_watermark", lambda engine, key, newest: None)
+
+    db.parse_worldbank_projects("NG", None, "", watermark_key=watermark_key("worldbank", {"country": "Nigeria"}))
+    assert list(ingested[0]["project_id"]) == ["P1"]
@@ -0,0 +1,379 @@
+# utils/bench.py
+"""
+Benchmarks for the mapping and ingest hot paths.
+
+Inputs are the archived downloads in the repo, repeated (with unique ids) up
+to the requested row count:
+
+    map_csv_to_standard      synthetic IATI activity CSV (no IATI sample is archived)
+    map_json_to_standard     one IATI.cloud Solr doc per FCDO link (fcdo_downloads/archive/*.txt)
+    map_bii_*_to_target      bii_downloads/archive/*_{direct,funds,underlying}_*.csv
+    map_oecd_to_standard     synthetic OECD SDMX export (categorical dimensions, joined AGE + SEX)
+    map_foreign_assistance   foreign_assistance_downloads/archive/*.csv
+    ingest_sqlite            the mapped Foreign Assistance rows through the schema
+                             contract + to_sql into a temporary SQLite file
+    ingest_postgres          the same rows through ingest_data() (--db only); they are
+                             written as source BENCH and deleted after every run
+
+Each case reports the best of --repeat wall-clock runs, rows/s and the peak
+Python heap (tracemalloc, measured in a separate run so it does not skew the
+timing). --save appends the run to bench_results.json; every run is compared
+with the last saved one, and --fail-over 1.25 exits non-zero when a case got
+more than 25 % slower:
+
+    python -m utils.bench run --rows 10000,100000
+    python -m utils.bench run --rows 1000000 --cases map_csv,map_oecd --save
+    python -m utils.bench run --db postgresql+psycopg2://postgres@localhost/aid_bench --cases ingest_postgres
+    python -m utils.bench history
+    python -m utils.bench memory --rows 1000000       # mapped frames: categoricals vs plain strings
+"""
+
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(BASE_DIR, "bench_results.json")
+BENCH_SOURCE = "BENCH"                  # `source` of the rows the ingest case writes (deleted afterwards)
+
+
+def _archive(pattern: str) -> str:
+    matches = sorted(glob.glob(os.path.join(BASE_DIR, pattern)))
+    if not matches:
+        raise FileNotFoundError(pattern)
+    return matches[0]
+
+
+def scale(df: pd.DataFrame, rows: int, id_column: Optional[str] = None) -> pd.DataFrame:
+    """*df* repeated to *rows* rows; *id_column* gets a -<copy> suffix so ids stay unique."""
+    out = df.iloc[np.resize(np.arange(len(df)), rows)].reset_index(drop=True)
+    if id_column and id_column in out.columns:
+        copy = (np.arange(rows) // len(df)).astype(str)
+        out[id_column] = out[id_column].astype(str) + "-" + copy
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+def iati_csv(rows: int) -> pd.DataFrame:
+    """IATI activity CSV as exported by the IATI scraper (the columns map_csv_to_standard reads)."""
+    i = np.arange(rows)
+    return pd.DataFrame({
+        "/iati-identifier": [f"XM-DAC-{n}" for n in i],
+        "/title/narrative": [f"Primary health care support phase {n % 7}" for n in i],
+        "/reporting-org/narrative": "UNICEF",
+        "/reporting-org@ref": "XM-DAC-41122",
+        "/participating-org/narrative": "Ministry of Health",
+        "/participating-org@ref": "NG-GOV-1",
+        "/recipient-country@code": "NG",
+        "/recipient-country/narrative": "Nigeria",
+        "/recipient-region/narrative": None,
+        "/location/administrative@code": "NG-KN",
+        "/location/point/pos": [f"{9 + n % 5}.{n % 97} {7 + n % 3}.{n % 89}" for n in i],
+        "/activity-date@type": 1 + (i % 4),
+        "/activity-date@iso-date": [f"20{10 + n % 14}-0{1 + n % 9}-15" for n in i],
+        "/activity-status@code": 2,
+        "/budget/value": (i % 1000) * 1500.0,
+        "/transaction/transaction-type@code": np.where(i % 2, 3, 11),
+        "/transaction/value": (i % 500) * 250.0,
+        "/default-aid-type@code": "C01",
+        "/sector/narrative": "Basic health care",
+        "/description/narrative": "Strengthening primary health care delivery in northern states. " * 3,
+        "/document-link@url": "https://example.org/doc.pdf",
+        "/result/document-link@url": None,
+        "@last-updated-datetime": "2024-05-01T10:00:00Z",
+    })
+
+
+def fcdo_responses(rows: int) -> List[dict]:
+    """One IATI.cloud Solr response per FCDO activity link, shaped like `fl=*` results."""
+    ids = []
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, "fcdo_downloads", "archive", "*.txt"))):
+        with open(path) as f:
+            ids += [line.split("iati_identifier:")[1].split("&")[0] for line in f if "iati_identifier:" in line]
+    ids = ids or ["GB-GOV-1-300000"]
+    responses = []
+    for n in range(rows):
+        doc = {
+            "iati_identifier": f"{ids[n % len(ids)]}-{n // len(ids)}",
+            "title_narrative_first": ["Health systems strengthening programme"],
+            "reporting_org_narrative": ["UK - Foreign, Commonwealth and Development Office"],
+            "reporting-org.ref": "GB-GOV-1",
+            "participating_org": [{"role": 4, "narrative": "UNICEF"}, {"role": 1, "narrative": "FCDO"}],
+            "recipient-country.code": ["NG"],
+            "recipient-country.name": ["Nigeria"],
+            "activity_date_iso_date": ["2016-04-01T00:00:00Z", "2022-03-31T00:00:00Z"],
+            "activity-status.code": ["2"],
+            "description_narrative": ["Improving maternal and child health outcomes. " * 4],
+            "sector_code": ["12220", "12240"],
+            "sector_narrative": ["Basic health care", "Basic nutrition"],
+            "activity_plus_child_aggregation_commitment_value_usd": [1250000.0],
+            "activity_plus_child_aggregation_disbursement_value_usd": [980000.0],
+            "activity_plus_child_aggregation_budget_value_usd": [1100000.0],
+            "document_link_url": ["https://example.org/logframe.pdf", "https://example.org/review.pdf"],
+            "document_link_title_narrative": ["Logical framework", "Annual review 2021"],
+            "related_activity_ref": ["GB-GOV-1-300495-101"],
+            "policy_marker_narrative": ["Gender equality", "Climate change - adaptation"],
+            "last_updated_datetime": "2024-02-01T12:00:00Z",
+        }
+        responses.append({"response": {"docs": [doc]}})
+    return responses
+
+
+def oecd_csv(rows: int) -> pd.DataFrame:
+    """OECD SDMX CSV export as read_oecd_csv() returns it (every column map_oecd_to_standard reads)."""
+    from db_setup_and_ingest_org import OECD_CATEGORICAL, OECD_COLUMN_MAPPING
+
+    i = np.arange(rows)
+    df = pd.DataFrame({column: [f"{column[:3]}{n % 50}" for n in i] for column in OECD_COLUMN_MAPPING})
+    df["TIME_PERIOD"] = (2000 + i % 24).astype(str)
+    df["OBS_VALUE"] = i * 0.5
+    df["STRUCTURE_ID"] = [f"OECD.DCD:DSD_CRS@DF_CRS({n})" for n in i]
+    return df.astype({c: "category" for c in OECD_CATEGORICAL})
+
+
+# ---------------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------------
+class Case(NamedTuple):
+    prepare: Callable[[int], object]            # rows → input (not timed)
+    run: Callable[[object], object]             # input → result (timed)
+    max_rows: int                               # larger row counts are skipped unless --no-cap
+    cleanup: Optional[Callable[[object], None]] = None   # after every run (not timed)
+
+
+def _map_each(responses: List[dict]) -> pd.DataFrame:
+    from db_setup_and_ingest_org import map_json_to_standard
+
+    return pd.concat([map_json_to_standard(r) for r in responses], ignore_index=True)
+
+
+def _bii(kind: str) -> Case:
+    import db_setup_and_ingest_org as db
+
+    mapper = {"direct": db.map_bii_direct_to_target, "funds": db.map_bii_fund_to_target,
+              "underlying": db.map_bii_underlying_to_target}[kind]
+    id_column = "Fund ID" if kind == "underlying" else "Project number"
+    return Case(lambda rows: scale(pd.read_csv(_archive(f"bii_downloads/archive/*_{kind}_*.csv")), rows, id_column),
+                mapper, 10 ** 6)
+
+
+def foreign_assistance(rows: int) -> pd.DataFrame:
+    return scale(pd.read_csv(_archive("foreign_assistance_downloads/archive/*.csv")), rows, "Activity ID")
+
+
+def cases(db_url: Optional[str] = None) -> Dict[str, Case]:
+    import db_setup_and_ingest_org as db
+
+    return {
+        "map_csv": Case(iati_csv, db.map_csv_to_standard, 10 ** 6),
+        "map_json": Case(fcdo_responses, _map_each, 10 ** 4),         # one DataFrame per doc, ~1.5 ms each
+        "map_bii_direct": _bii("direct"),
+        "map_bii_funds": _bii("funds"),
+        "map_bii_underlying": _bii("underlying"),
+        "map_oecd": Case(oecd_csv, db.map_oecd_to_standard, 10 ** 6),
+        "map_foreign_assistance": Case(foreign_assistance, db.map_foreign_assistance_to_standard, 10 ** 6),
+        "ingest_sqlite": Case(_ingest_input, _ingest_sqlite, 10 ** 5),
+        **({"ingest_postgres": Case(_ingest_input, lambda df: _ingest_postgres(df, db_url), 10 ** 6,
+                                    lambda df: _delete_bench_rows(df, db_url))} if db_url else {}),
+    }
+
+
+def _ingest_input(rows: int) -> pd.DataFrame:
+    from db_setup_and_ingest_org import map_foreign_assistance_to_standard
+
+    mapped = map_foreign_assistance_to_standard(foreign_assistance(rows))
+    mapped["source"] = BENCH_SOURCE
+    return mapped
+
+
+def _ingest_postgres(df: pd.DataFrame, db_url: str) -> None:
+    """The real ingest_data() (contract, partitions, rollups, versions); lake landing off."""
+    import db_setup_and_ingest_org as db
+    import lake
+
+    db.DB_URL, lake_enabled, lake.LAKE_ENABLED = db_url, lake.LAKE_ENABLED, False
+    try:
+        db.ingest_data(df)
+    finally:
+        lake.LAKE_ENABLED = lake_enabled
+
+
+def _delete_bench_rows(df: pd.DataFrame, db_url: str) -> None:
+    import db_setup_and_ingest_org as db
+    from rollups import refresh_after_ingest
+    from vertical_split import DELETE_SOURCES_SQL
+
+    db.DB_URL = db_url
+    engine = db.init_database()
+    with engine.begin() as conn:
+        for statement in DELETE_SOURCES_SQL:
+            conn.exec_driver_sql(statement, ([BENCH_SOURCE],))
+    refresh_after_ingest(engine, df)              # the rollup keys the benchmark rows touched
+
+
+def _ingest_sqlite(df: pd.DataFrame) -> None:
+    """What ingest_data() does per batch without PostgreSQL: schema contract + to_sql."""
+    import sqlite3
+
+    from db_setup_and_ingest_org import CREATE_TABLE_SQL
+    from schema_contract import enforce
+
+    with tempfile.TemporaryDirectory() as tmp, sqlite3.connect(os.path.join(tmp, "bench.db")) as conn:
+        conn.execute(CREATE_TABLE_SQL)
+        enforce(df).to_sql("project_data", conn, if_exists="append", index=False, chunksize=10_000)
+
+
+def measure(case: Case, rows: int, repeat: int) -> Dict[str, float]:
+    data = case.prepare(rows)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case.run(data)
+        timings.append(time.perf_counter() - started)
+        if case.cleanup:
+            case.cleanup(data)
+    tracemalloc.start()
+    try:
+        case.run(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        if case.cleanup:
+            case.cleanup(data)
+    best = min(timings)
+    return {"seconds": round(best, 6), "rows_per_s": round(rows / best), "peak_mb": round(peak / 2 ** 20, 2)}
+
+
+def memory(rows: int) -> Dict[str, Tuple[float, float, List[str]]]:
+    """Per mapper: (encoded MB, plain MB, columns saving most) of its mapped frame at *rows* rows."""
+    from schema_contract import memory_report
+
+    out = {}
+    for name, case in cases().items():
+        if not name.startswith("map_") or rows > case.max_rows:
+            continue
+        report = memory_report(case.run(case.prepare(rows)))
+        top = [c for c in report.index[:3] if report.at[c, "saved"] > 0]
+        out[name] = (report["encoded"].sum() / 2 ** 20, report["plain"].sum() / 2 ** 20, top)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+def load_results(path: str = RESULTS_FILE) -> dict:
+    if not os.path.exists(path):
+        return {"runs": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_run(results: Dict[str, dict], path: str = RESULTS_FILE) -> None:
+    history = load_results(path)
+    history["runs"].append({
+        "at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": results,
+    })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def baseline(key: str, history: dict) -> Optional[dict]:
+    """The latest saved result for *key* (`case@rows`)."""
+    for run in reversed(history["runs"]):
+        if key in run["results"]:
+            return run["results"][key]
+    return None
+
+
+def regressions(results: Dict[str, dict], history: dict, fail_over: float) -> List[Tuple[str, float]]:
+    """(key, slowdown) of every case more than *fail_over* times slower than its baseline."""
+    slower = []
+    for key, r in results.items():
+        base = baseline(key, history)
+        if base and r["seconds"] / base["seconds"] > fail_over:
+            slower.append((key, r["seconds"] / base["seconds"]))
+    return slower
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import warnings
+
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--rows", default="10000", help="comma-separated row counts, e.g. 10000,100000,1000000")
+    r.add_argument("--cases", help="comma-separated case names (default: all)")
+    r.add_argument("--db", help="PostgreSQL URL for the ingest case (default: SQLite)")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--no-cap", action="store_true", help="run every case at every row count")
+    r.add_argument("--save", action="store_true", help=f"append the results to {os.path.basename(RESULTS_FILE)}")
+    r.add_argument("--results", default=RESULTS_FILE)
+    r.add_argument("--fail-over", type=float, help="exit 1 if a case is this many times slower than its baseline")
+    h = sub.add_parser("history")
+    h.add_argument("--results", default=RESULTS_FILE)
+    m = sub.add_parser("memory")
+    m.add_argument("--rows", type=int, default=100_000)
+    a = p.parse_args()
+
+    if a.command == "history":
+        for run in load_results(a.results)["runs"]:
+            print(f"{run['at']}  {run['commit'] or '-':9} " +
+                  "  ".join(f"{k} {v['seconds'] * 1000:.0f}ms" for k, v in run["results"].items()))
+        sys.exit(0)
+
+    warnings.simplefilter("ignore")        # the mappers' date-format warnings
+    os.chdir(BASE_DIR)                     # parsers resolve lookup files relative to the project
+    if a.command == "memory":
+        print(f"{'mapped frame':24} {'rows':>9} {'encoded MB':>11} {'plain MB':>9} {'saved':>6}  most saved")
+        for name, (encoded, plain, top) in memory(a.rows).items():
+            print(f"{name:24} {a.rows:9d} {encoded:11.1f} {plain:9.1f} {1 - encoded / plain:6.0%}  {', '.join(top)}")
+        sys.exit(0)
+    history = load_results(a.results)
+    all_cases = cases(a.db)
+    names = a.cases.split(",") if a.cases else list(all_cases)
+    results = {}
+    print(f"{'case':24} {'rows':>9} {'ms':>10} {'rows/s':>11} {'peak MB':>8} {'vs saved':>9}")
+    for rows in (int(n) for n in a.rows.split(",")):
+        for name in names:
+            case = all_cases[name]
+            if rows > case.max_rows and not a.no_cap:
+                print(f"{name:24} {rows:9d} {'skipped (> ' + str(case.max_rows) + ' rows, --no-cap)':>40}")
+                continue
+            key = f"{name}@{rows}"
+            results[key] = m = measure(case, rows, a.repeat)
+            base = baseline(key, history)
+            delta = f"{(m['seconds'] / base['seconds'] - 1) * 100:+8.0f}%" if base else f"{'-':>9}"
+            print(f"{name:24} {rows:9d} {m['seconds'] * 1000:10.1f} {m['rows_per_s']:11d} {m['peak_mb']:8.1f} {delta}")
+
+    slower = regressions(results, history, a.fail_over) if a.fail_over else []
+    if a.save:
+        save_run(results, a.results)
+    for key, ratio in slower:
+        print(f"❌ {key}: {ratio:.2f}x slower than the saved baseline")
+    sys.exit(1 if slower else 0)
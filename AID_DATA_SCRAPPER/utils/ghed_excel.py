@@ -0,0 +1,232 @@
+# utils/ghed_excel.py
+"""
+Fast reader for the WHO GHED workbook.
+
+The old path loaded every cell of every column as a string with
+``pd.read_excel(..., engine="openpyxl", dtype=str)`` and re-cast a dozen
+columns afterwards. Here only the "Data" sheet and the mapped columns are
+read, with native numeric types:
+
+* python-calamine (Rust) through pandas, when it is installed;
+* otherwise openpyxl in read-only mode, streaming rows.
+
+The converted frame is cached as Parquet under the file's SHA-256 plus a
+digest of the mapping (GHED_FRAME_VERSION and the column constants), so the
+same download is never parsed twice and a mapping change never reuses a
+stale frame.
+
+    python -m utils.ghed_excel bench ghed_downloads/archive/<file>.xlsx
+    python -m utils.ghed_excel bench --synthetic 20000
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils.logging_utils import get_logger
+
+logger = get_logger("ingestion", "ingestion.log")
+
+GHED_SHEET = "Data"
+GHED_CACHE_DIR = os.getenv("GHED_CACHE_DIR", os.path.join("ghed_downloads", "cache"))
+GHED_FRAME_VERSION = 2      # bump whenever to_standard() changes what it returns
+
+# GHED column → project_data column
+GHED_COLUMN_MAPPING = {
+    "code": "country_code",
+    "region": "region",
+    "location": "subnational_area",
+    "year": "year_active",
+    "che": "total_commitment_usd",
+    "gghed": "total_disbursed_usd",
+    "che_pc_usd": "cost_per_beneficiary",
+    "che_gdp": "impact_per_usd",
+    "gghed_che": "leverage_ratio",
+    "pvtd": "beneficiary_count",
+    "gghed_gdp": "impact_score",
+    "ext": "funding_amount_usd",
+    "gghed_pc_usd": "avg_impact_score",
+    "pvtd_pc_usd": "percent_outcomes_achieved",
+    "oop_pc_usd": "impact_per_dollar",
+    "ext_pc_usd": "avg_outcomes_achieved",
+    "source": "WHO"
+}
+
+GHED_NUMERIC_COLUMNS = [
+    "total_commitment_usd", "total_disbursed_usd", "cost_per_beneficiary",
+    "impact_per_usd", "leverage_ratio", "beneficiary_count", "impact_score",
+    "funding_amount_usd", "avg_impact_score", "percent_outcomes_achieved",
+    "impact_per_dollar", "avg_outcomes_achieved"
+]
+
+
+def _wanted(header) -> bool:
+    return header is not None and str(header).strip() in GHED_COLUMN_MAPPING
+
+
+# ---------------------------------------------------------------------------
+# Readers – each returns the raw GHED columns that are mapped, nothing else
+# ---------------------------------------------------------------------------
+def read_with_calamine(path: str) -> pd.DataFrame:
+    import python_calamine  # noqa: F401  – fail early when the engine is missing
+
+    return pd.read_excel(path, sheet_name=GHED_SHEET, engine="calamine", usecols=_wanted)
+
+
+def read_with_openpyxl_stream(path: str) -> pd.DataFrame:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[GHED_SHEET].iter_rows(values_only=True)
+        header = next(rows, ())
+        keep = [(i, str(h).strip()) for i, h in enumerate(header) if _wanted(h)]
+        data = [[row[i] if i < len(row) else None for i, _ in keep] for row in rows]
+    finally:
+        wb.close()
+    return pd.DataFrame(data, columns=[name for _, name in keep])
+
+
+def read_data_sheet(path: str) -> pd.DataFrame:
+    try:
+        return read_with_calamine(path)
+    except ImportError:
+        return read_with_openpyxl_stream(path)
+
+
+# ---------------------------------------------------------------------------
+# Mapping + cache
+# ---------------------------------------------------------------------------
+def to_standard(raw: pd.DataFrame) -> pd.DataFrame:
+    """Rename GHED columns to project_data names and fix the numeric types."""
+    df = raw.rename(columns=lambda c: str(c).strip()).rename(columns=GHED_COLUMN_MAPPING)
+    df = df[[col for col in GHED_COLUMN_MAPPING.values() if col in df.columns]].copy()
+
+    for col in GHED_NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    if "beneficiary_count" in df.columns:
+        df["beneficiary_count"] = df["beneficiary_count"].round().astype("Int64")
+    if "year_active" in df.columns:
+        df["year_active"] = pd.to_numeric(df["year_active"], errors="coerce").astype("Int64")
+    for col in ("country_code", "region", "subnational_area"):
+        if col in df.columns:
+            df[col] = df[col].astype("string")
+
+    return df.dropna(subset=["country_code", "year_active"], how="any")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path: str) -> str:
+    """Cache file stem: digest of the mapping that builds the frame, then the workbook's SHA-256."""
+    mapping = json.dumps([GHED_FRAME_VERSION, GHED_COLUMN_MAPPING, GHED_NUMERIC_COLUMNS], sort_keys=True)
+    return f"{hashlib.sha256(mapping.encode()).hexdigest()[:12]}-{file_sha256(path)}"
+
+
+def load_ghed_frame(path: str, cache_dir: Optional[str] = GHED_CACHE_DIR) -> pd.DataFrame:
+    """
+    GHED workbook → mapped project_data frame. Results are cached by file
+    and mapping hash (cache_key) in *cache_dir* (pass None to disable).
+    """
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{cache_key(path)}.parquet")
+        if os.path.exists(cache_path):
+            logger.info(f"♻️ GHED cache hit: {cache_path}")
+            return pd.read_parquet(cache_path)
+
+    df = to_standard(read_data_sheet(path))
+
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            df.to_parquet(cache_path, index=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not cache GHED frame: {e}")
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+def read_legacy(path: str) -> pd.DataFrame:
+    """The original path (every column, dtype=str) – kept for benchmarks."""
+    df = pd.read_excel(path, sheet_name=GHED_SHEET, engine="openpyxl", dtype=str)
+    return df.loc[:, ~df.columns.str.contains('^Unnamed', case=False)]
+
+
+def write_synthetic_workbook(path: str, rows: int = 5000, extra_columns: int = 60) -> str:
+    """GHED-shaped workbook: the mapped columns plus *extra_columns* unmapped indicators."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(GHED_SHEET)
+    mapped = [c for c in GHED_COLUMN_MAPPING if c != "source"]
+    extras = [f"indicator_{i}" for i in range(extra_columns)]
+    ws.append(mapped + extras)
+    for r in range(rows):
+        text = {"code": f"C{r % 190:03d}", "region": "AFR", "location": f"Country {r % 190}", "year": 2000 + r % 22}
+        ws.append([text.get(c, r * 1.5) for c in mapped] + [r * 0.1] * extra_columns)
+    wb.save(path)
+    return path
+
+
+def benchmark(path: str, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-*repeat* seconds for each reader available here."""
+    readers: Dict[str, Callable[[], pd.DataFrame]] = {
+        "legacy (openpyxl, dtype=str)": lambda: read_legacy(path),
+        "openpyxl read-only stream": lambda: read_with_openpyxl_stream(path),
+    }
+    try:
+        import python_calamine  # noqa: F401
+        readers["calamine"] = lambda: read_with_calamine(path)
+    except ImportError:
+        pass
+
+    results = {}
+    for name, reader in readers.items():
+        timings: List[float] = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            reader()
+            timings.append(time.perf_counter() - started)
+        results[name] = min(timings)
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as cache_dir:
+        load_ghed_frame(path, cache_dir)
+        started = time.perf_counter()
+        load_ghed_frame(path, cache_dir)
+        results["cache hit (hash + parquet)"] = time.perf_counter() - started
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench")
+    b.add_argument("path", nargs="?")
+    b.add_argument("--synthetic", type=int, metavar="ROWS", help="benchmark a generated GHED-shaped workbook")
+    b.add_argument("--repeat", type=int, default=3)
+    a = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = a.path or write_synthetic_workbook(os.path.join(tmp, "ghed.xlsx"), a.synthetic or 5000)
+        results = benchmark(path, a.repeat)
+    baseline = results["legacy (openpyxl, dtype=str)"]
+    for name, seconds in results.items():
+        print(f"{seconds * 1000:10.1f} ms  {baseline / seconds:6.1f}x  {name}")
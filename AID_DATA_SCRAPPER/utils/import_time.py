@@ -0,0 +1,50 @@
+# utils/import_time.py
+"""
+Measure module import cost with ``python -X importtime``.
+
+    python -m utils.import_time main            # top 25 imports of the API
+    python -m utils.import_time main --top 50
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str, cwd: str = BASE_DIR) -> Dict[str, Tuple[int, int]]:
+    """
+    Import *module* in a fresh interpreter and return
+    {imported module → (self µs, cumulative µs)}.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser()
+    p.add_argument("module", nargs="?", default="main")
+    p.add_argument("--top", type=int, default=25)
+    a = p.parse_args()
+
+    timings = measure_import(a.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, (self_us, cum_us) in sorted(timings.items(), key=lambda kv: -kv[1][1])[:a.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    print(f"\n⏱️ import {a.module}: {timings[a.module][1] / 1000:.1f} ms")
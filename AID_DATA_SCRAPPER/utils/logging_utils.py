@@ -0,0 +1,41 @@
+# utils/logging_utils.py
+
+import logging
+
+LOG_FMT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class NoTracebackFormatter(logging.Formatter):
+    # strip any traceback delivered via exc_info
+    def formatException(self, exc_info):
+        return ""                      # completely omit traceback
+    def format(self, record):
+        record.exc_info = None         # safety-belt
+        return super().format(record)
+
+
+def get_logger(name: str, log_file: str) -> logging.Logger:
+    """
+    Return the named logger with one clean stream handler and one clean
+    file handler attached. Safe to call from every module that shares the
+    logger: handlers are only added once, and the log file is not opened
+    until the first record is written (keeps module import cheap).
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False              # don’t pass records to root logger
+
+    # clean stream handler --------------------------------------------------
+    if not any(type(h) is logging.StreamHandler for h in logger.handlers):
+        stream_h = logging.StreamHandler()
+        stream_h.setFormatter(NoTracebackFormatter(LOG_FMT))
+        logger.addHandler(stream_h)
+
+    # clean file handler ----------------------------------------------------
+    if not any(isinstance(h, logging.FileHandler) and h.baseFilename.endswith(log_file)
+               for h in logger.handlers):
+        file_h = logging.FileHandler(log_file, mode="a", encoding="utf-8", delay=True)
+        file_h.setFormatter(NoTracebackFormatter(LOG_FMT))
+        logger.addHandler(file_h)
+
+    return logger
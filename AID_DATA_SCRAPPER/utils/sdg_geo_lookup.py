@@ -3,8 +3,12 @@
 import json
 import os
 
+# ------------------- Caching Layer -------------------
+_SDG_GEO_LOOKUP = None
+
+
 def load_sdg_country_codes():
-    path = os.path.join(os.path.dirname(__file__), "..\lookup_files\sdg_geocodes.txt")
+    path = os.path.join(os.path.dirname(__file__), "..", "lookup_files", "sdg_geocodes.txt")
     with open(path, "r", encoding="utf-8") as f:
         geo_list = json.load(f)
     return {
@@ -12,4 +16,17 @@ def load_sdg_country_codes():
         for item in geo_list
     }
 
-SDG_GEO_LOOKUP = load_sdg_country_codes()
+
+def get_sdg_geo_lookup() -> dict:
+    """Return the {country name → SDG area code} map, loading it on first use."""
+    global _SDG_GEO_LOOKUP
+    if _SDG_GEO_LOOKUP is None:
+        _SDG_GEO_LOOKUP = load_sdg_country_codes()
+    return _SDG_GEO_LOOKUP
+
+
+def __getattr__(name):
+    # keep `from utils.sdg_geo_lookup import SDG_GEO_LOOKUP` working
+    if name == "SDG_GEO_LOOKUP":
+        return get_sdg_geo_lookup()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,207 @@
+# --- vertical_split.py ---
+"""
+Hot / cold vertical split of project_data (migration 007).
+
+    project_facts    id + keys, dates, amounts, country/donor/source …   (narrow: what the aggregates scan)
+    project_details  id + narratives, documents, indicators, tags …     (wide TEXT, only when a row has any)
+    project_data     VIEW  facts LEFT JOIN details USING id              (same columns, same order as before)
+
+Existing queries keep using project_data. A query that only touches hot
+columns never reads project_details: Postgres drops the LEFT JOIN on the
+details primary key. Writes through the view (INSERT, UPDATE, DELETE) are
+routed by INSTEAD OF triggers; ingest batches and lake rebuilds (lake.py)
+COPY into a staging table and split set-wise with flush_stage_sql().
+
+Which column goes where is derived from CREATE_TABLE_SQL: every typed
+column (numbers, dates, timestamps, VARCHAR ids) plus HOT_TEXT_COLUMNS is
+hot, the remaining TEXT is cold. project_details also keeps copies of
+DETAILS_COPIES, so full-text search (apis/main.py) reads it alone and never
+joins back into the year-partitioned project_facts (partitions.py).
+"""
+
+import re
+from typing import List, Tuple
+
+from config import TABLE_NAME
+
+FACTS_TABLE = "project_facts"
+DETAILS_TABLE = "project_details"
+STAGE_TABLE = "project_data_stage"
+FACTS_ID_SEQUENCE = f"{FACTS_TABLE}_id_seq"
+
+# short TEXT columns the API filters / groups on
+HOT_TEXT_COLUMNS = ("country", "region", "donor", "sector", "project_status")
+
+# same index names as migrations 002-004, now on the table that holds the columns
+FACTS_INDEX_SQL = [
+    f"CREATE INDEX ix_{TABLE_NAME}_year_country ON {FACTS_TABLE} (year_active, country)",
+    f"CREATE INDEX ix_{TABLE_NAME}_country_year ON {FACTS_TABLE} (country, year_active)",
+    f"CREATE INDEX ix_{TABLE_NAME}_donor ON {FACTS_TABLE} (donor)",
+    f"CREATE INDEX ix_{TABLE_NAME}_keyset ON {FACTS_TABLE} "
+    f"((-COALESCE(year_active, 0)), (COALESCE(country, '')), (COALESCE(project_id, '')), id)",
+]
+
+# hot columns also kept on project_details: what the full-text search returns / filters on
+DETAILS_COPIES = ("project_id", "country", "year_active")
+
+Column = Tuple[str, str]                # (name, SQL type)
+
+
+def ddl_columns(create_sql: str) -> List[Column]:
+    """(name, type) of every column of a CREATE TABLE statement, in order."""
+    body = create_sql[create_sql.index("(") + 1:create_sql.rindex(")")]
+    columns = []
+    for line in body.splitlines():
+        match = re.match(r"\s*(\w+)\s+([A-Z ]+?)\s*,?\s*$", line)
+        if match:
+            columns.append((match.group(1), match.group(2)))
+    return columns
+
+
+def split_columns() -> Tuple[List[Column], List[Column]]:
+    """(hot, cold) columns of project_data."""
+    from db_setup_and_ingest_org import CREATE_TABLE_SQL
+
+    columns = ddl_columns(CREATE_TABLE_SQL)
+    hot = [c for c in columns if c[1] != "TEXT" or c[0] in HOT_TEXT_COLUMNS]
+    cold = [c for c in columns if c not in hot]
+    return hot, cold
+
+
+def details_columns() -> List[Column]:
+    """Columns written to project_details besides id: the DETAILS_COPIES, then the cold ones."""
+    hot, cold = split_columns()
+    return [c for c in hot if c[0] in DETAILS_COPIES] + cold
+
+
+def _names(columns: List[Column], prefix: str = "") -> str:
+    return ", ".join(prefix + name for name, _ in columns)
+
+
+def _ddl(columns: List[Column]) -> str:
+    return ",\n    ".join(f"{name} {sql_type}" for name, sql_type in columns)
+
+
+def _any_not_null(columns: List[Column], prefix: str = "") -> str:
+    # ROW(...) IS NULL ⇔ every field is NULL; no argument limit unlike num_nonnulls()
+    return f"NOT (ROW({_names(columns, prefix)}) IS NULL)"
+
+
+def _view_sql(hot: List[Column], cold: List[Column]) -> str:
+    from db_setup_and_ingest_org import CREATE_TABLE_SQL
+
+    hot_names = {name for name, _ in hot}
+    select = [("f." if name in hot_names else "d.") + name for name, _ in ddl_columns(CREATE_TABLE_SQL)]
+    return f"""
+    CREATE VIEW {TABLE_NAME} AS
+    SELECT {", ".join(select)}, f.id, d.search_tsv
+    FROM {FACTS_TABLE} f
+    LEFT JOIN {DETAILS_TABLE} d ON d.id = f.id
+    """
+
+
+def _trigger_sql(hot: List[Column], cold: List[Column]) -> List[str]:
+    assign_hot = ", ".join(f"{name} = NEW.{name}" for name, _ in hot)
+    details = details_columns()
+    assign_details = ", ".join(f"{name} = EXCLUDED.{name}" for name, _ in details)
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {TABLE_NAME}_write() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM {DETAILS_TABLE} WHERE id = OLD.id;
+                DELETE FROM {FACTS_TABLE} WHERE id = OLD.id;
+                RETURN OLD;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {FACTS_TABLE} (id, {_names(hot)})
+                VALUES (COALESCE(NEW.id, nextval('{FACTS_ID_SEQUENCE}')), {_names(hot, "NEW.")})
+                RETURNING id INTO NEW.id;
+            ELSE
+                UPDATE {FACTS_TABLE} SET {assign_hot} WHERE id = OLD.id;
+                NEW.id := OLD.id;
+            END IF;
+            IF {_any_not_null(cold, "NEW.")} THEN
+                INSERT INTO {DETAILS_TABLE} (id, {_names(details)})
+                VALUES (NEW.id, {_names(details, "NEW.")})
+                ON CONFLICT (id) DO UPDATE SET {assign_details};
+            ELSIF TG_OP = 'UPDATE' THEN
+                DELETE FROM {DETAILS_TABLE} WHERE id = NEW.id;
+            END IF;
+            RETURN NEW;
+        END $$
+        """,
+        f"""
+        CREATE TRIGGER {TABLE_NAME}_write INSTEAD OF INSERT OR UPDATE OR DELETE ON {TABLE_NAME}
+        FOR EACH ROW EXECUTE FUNCTION {TABLE_NAME}_write()
+        """,
+    ]
+
+
+def view_statements() -> List[str]:
+    """The project_data view and its write trigger (re-created whenever project_facts is replaced)."""
+    hot, cold = split_columns()
+    return [_view_sql(hot, cold), *_trigger_sql(hot, cold)]
+
+
+def split_statements() -> List[str]:
+    """Migration 007: wide project_data table → facts + details + compatibility view."""
+    from migrations import SEARCH_CONFIG
+
+    hot, cold = split_columns()
+    return [
+        f"CREATE TABLE {FACTS_TABLE} (\n    id BIGSERIAL PRIMARY KEY,\n    {_ddl(hot)}\n)",
+        f"INSERT INTO {FACTS_TABLE} (id, {_names(hot)}) SELECT id, {_names(hot)} FROM {TABLE_NAME}",
+        f"SELECT setval('{FACTS_ID_SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) FROM {FACTS_TABLE}",
+        f"""
+        CREATE TABLE {DETAILS_TABLE} (
+            id BIGINT PRIMARY KEY REFERENCES {FACTS_TABLE} (id) ON DELETE CASCADE,
+            {_ddl(details_columns())},
+            search_tsv tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_title, '')), 'A') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(project_description, '')), 'B')
+            ) STORED
+        )
+        """,
+        f"""
+        INSERT INTO {DETAILS_TABLE} (id, {_names(details_columns())})
+        SELECT id, {_names(details_columns())} FROM {TABLE_NAME} WHERE {_any_not_null(cold)}
+        """,
+        f"DROP TABLE {TABLE_NAME}",
+        *FACTS_INDEX_SQL,
+        f"CREATE INDEX ix_{TABLE_NAME}_search ON {DETAILS_TABLE} USING GIN (search_tsv)",
+        *view_statements(),
+        f"ANALYZE {FACTS_TABLE}",
+        f"ANALYZE {DETAILS_TABLE}",
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Bulk loads (ingest_data, lake.py): COPY into a staging table, then split set-wise
+# ---------------------------------------------------------------------------
+def create_stage_sql() -> List[str]:
+    """Temp table shaped like project_data whose id defaults to the next facts id."""
+    return [
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (LIKE {TABLE_NAME}) ON COMMIT DROP",
+        f"ALTER TABLE {STAGE_TABLE} ALTER COLUMN id SET DEFAULT nextval('{FACTS_ID_SEQUENCE}')",
+    ]
+
+
+def flush_stage_sql(facts_table: str = FACTS_TABLE) -> List[str]:
+    """Move the staged rows into facts (or a stand-in for it) + details and empty the stage."""
+    hot, cold = split_columns()
+    return [
+        f"INSERT INTO {facts_table} (id, {_names(hot)}) SELECT id, {_names(hot)} FROM {STAGE_TABLE}",
+        f"""
+        INSERT INTO {DETAILS_TABLE} (id, {_names(details_columns())})
+        SELECT id, {_names(details_columns())} FROM {STAGE_TABLE} WHERE {_any_not_null(cold)}
+        """,
+        f"TRUNCATE {STAGE_TABLE}",
+    ]
+
+
+TRUNCATE_SQL = f"TRUNCATE {FACTS_TABLE}, {DETAILS_TABLE}"
+DELETE_SOURCES_SQL = [
+    f"DELETE FROM {DETAILS_TABLE} WHERE id IN (SELECT id FROM {FACTS_TABLE} WHERE source = ANY(%s))",
+    f"DELETE FROM {FACTS_TABLE} WHERE source = ANY(%s)",
+]
@@ -0,0 +1,168 @@
+# --- watermarks.py ---
+"""
+Incremental (delta) harvesting.
+
+For every (source, filter signature) we remember the newest `last_updated`
+already ingested. The next run only asks for – or, where the upstream has no
+such filter, only ingests – records changed after that watermark.
+
+    with WatermarkRun(watermark_key("fcdo", filters), init_database) as wm:
+        url = ... + solr_since_filter(wm.since)       # upstream supports it
+        wm.observe(ingest_data(mapped, since=wm.since))
+
+A delta batch replaces the stored versions of its projects: ingest_data
+deletes the rows with the same (source, project_id) before loading it
+(delete_superseded), and the lake drops them too.
+
+The watermark only advances when the whole run finishes without raising and
+no item of it was marked failed (`wm.failed = True` where a file / activity
+error is logged and skipped), so a crashed or partial harvest is simply
+repeated from the old watermark.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import TABLE_NAME
+
+WATERMARK_TABLE = "ingest_watermarks"
+
+CREATE_WATERMARK_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+    source            CHARACTER VARYING NOT NULL,
+    filter_signature  CHARACTER VARYING NOT NULL,
+    filters           TEXT,
+    last_updated      TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_at        TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    PRIMARY KEY (source, filter_signature)
+);
+"""
+
+WatermarkKey = Tuple[str, str, str]     # (source, filter signature, canonical filters JSON)
+
+
+def watermark_key(source: str, filters: Dict[str, Any]) -> WatermarkKey:
+    canonical = json.dumps(filters or {}, sort_keys=True, default=str)
+    return source, hashlib.sha1(canonical.encode("utf-8")).hexdigest(), canonical
+
+
+def ensure_watermark_table(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_WATERMARK_TABLE_SQL))
+
+
+def get_watermark(engine, key: WatermarkKey) -> Optional[pd.Timestamp]:
+    source, signature, _ = key
+    with engine.connect() as conn:
+        value = conn.execute(
+            text(f"SELECT last_updated FROM {WATERMARK_TABLE} "
+                 "WHERE source = :source AND filter_signature = :sig"),
+            {"source": source, "sig": signature},
+        ).scalar()
+    return pd.Timestamp(value) if value is not None else None
+
+
+def advance_watermark(engine, key: WatermarkKey, newest) -> None:
+    """Move the watermark forward to *newest* (never backwards)."""
+    source, signature, canonical = key
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"""
+                INSERT INTO {WATERMARK_TABLE} (source, filter_signature, filters, last_updated)
+                VALUES (:source, :sig, :filters, :newest)
+                ON CONFLICT (source, filter_signature) DO UPDATE
+                SET last_updated = GREATEST({WATERMARK_TABLE}.last_updated, EXCLUDED.last_updated),
+                    updated_at   = now();
+            """),
+            {"source": source, "sig": signature, "filters": canonical,
+             "newest": pd.Timestamp(newest).to_pydatetime()},
+        )
+
+
+def _as_naive_utc(values: pd.Series) -> pd.Series:
+    try:
+        # sources mix "2024-01-01" and "2024-06-01T10:00:00Z"; pandas 2 otherwise
+        # infers one format from the first value and nulls the others
+        stamps = pd.to_datetime(values, errors="coerce", utc=True, format="mixed")
+    except (TypeError, ValueError):       # pandas < 2 parses each value anyway
+        stamps = pd.to_datetime(values, errors="coerce", utc=True)
+    return stamps.dt.tz_localize(None)
+
+
+def rows_changed_since(df: pd.DataFrame, since: Optional[pd.Timestamp], col: str = "last_updated") -> pd.DataFrame:
+    """
+    Keep rows modified after *since*. Rows without a modification date are
+    dropped: a watermark means the earlier harvest already stored them, and
+    keeping them would append them again on every run.
+    """
+    if since is None or df.empty or col not in df.columns:
+        return df
+    stamps = _as_naive_utc(df[col])
+    return df[stamps > since]
+
+
+def delete_superseded(conn, df: pd.DataFrame, table: str = TABLE_NAME) -> pd.DataFrame:
+    """
+    Delete the stored rows of the projects in *df* (same source and
+    project_id), which a delta batch replaces. Run it in the load's
+    transaction. Returns source / country / year_active of the deleted rows,
+    for the rollup and data-version refresh.
+    """
+    frames = [pd.DataFrame(columns=["source", "country", "year_active"])]
+    if df.empty or not {"source", "project_id"} <= set(df.columns):
+        return frames[0]
+    keys = df[["source", "project_id"]].dropna().astype(str).drop_duplicates()
+    for source, ids in keys.groupby("source")["project_id"]:
+        params = {"source": source, "ids": list(ids)}
+        where = "WHERE source = :source AND project_id = ANY(:ids)"
+        frames.append(pd.read_sql(text(f"SELECT source, country, year_active FROM {table} {where}"), conn, params=params))
+        conn.execute(text(f"DELETE FROM {table} {where}"), params)
+    return pd.concat(frames, ignore_index=True)
+
+
+def solr_since_filter(since: Optional[pd.Timestamp], field: str = "last_updated_datetime") -> str:
+    """`&fq=` clause for IATI.cloud Solr queries: only docs modified after *since*."""
+    if since is None:
+        return ""
+    return "&fq=" + quote(f"{field}:{{{since.strftime('%Y-%m-%dT%H:%M:%SZ')} TO *]")
+
+
+class WatermarkRun:
+    """
+    One harvest against a watermark. `since` is the stored watermark (None on
+    the first run or when no key is given); `observe()` every ingested frame
+    and the newest `last_updated` seen is stored on a clean exit. Set
+    `failed` when an item is skipped after an error: advancing past it would
+    filter it out of every later run.
+    """
+
+    def __init__(self, key: Optional[WatermarkKey], engine_factory: Callable[[], Any]):
+        self.key = key
+        self._engine_factory = engine_factory
+        self._engine = None
+        self.since: Optional[pd.Timestamp] = None
+        self.newest: Optional[pd.Timestamp] = None
+        self.failed = False
+
+    def __enter__(self):
+        if self.key is not None:
+            self._engine = self._engine_factory()
+            self.since = get_watermark(self._engine, self.key)
+        return self
+
+    def observe(self, df: Optional[pd.DataFrame], col: str = "last_updated") -> None:
+        if df is None or df.empty or col not in df.columns:
+            return
+        newest = _as_naive_utc(df[col]).max()
+        if pd.notna(newest) and (self.newest is None or newest > self.newest):
+            self.newest = newest
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.key is not None and exc_type is None and self.newest is not None and not self.failed:
+            advance_watermark(self._engine, self.key, self.newest)
+        return False